@@ -0,0 +1,152 @@
+import threading
+import time
+import numpy as np
+from util import get_logger
+
+logger = get_logger()
+
+
+class RecognitionError(RuntimeError):
+    """识别失败或超时：无法确认窗口中是否含敏感词，调用方应按命中处理"""
+
+
+def result_text(res):
+    """从 model.generate 的返回值中取出去掉空格的识别文本"""
+    if isinstance(res, list) and len(res) > 0 and 'text' in res[0]:
+        return res[0]['text'].replace(' ', '')
+    return ""
+
+
+class StreamingRecognizer:
+    """
+    Paraformer 流式识别封装
+
+    在块之间保留 FunASR 的编码器/解码器 cache，按模型原生的块长度送入音频，
+    只在检测到语音停顿或流结束时以 is_final=True 收尾并重置 cache。
+
+    Args:
+        model: funasr.AutoModel（paraformer-zh-streaming）
+        chunk_size: FunASR chunk_size，[0, 10, 5] 表示 600 ms 块、300 ms 前瞻
+        encoder_chunk_look_back: 编码器自注意力回看的块数
+        decoder_chunk_look_back: 解码器交叉注意力回看的块数
+        sample_rate: 输入采样率
+        pause_duration: 连续静音超过该时长（秒）视为一句话结束
+        silence_rms: 低于该 RMS 的块视为静音
+    """
+    # chunk_size 的单位是 60 ms 的帧
+    FRAME_SECONDS = 0.06
+
+    def __init__(self, model, chunk_size=(0, 10, 5), encoder_chunk_look_back=4, decoder_chunk_look_back=1,
+                 sample_rate=16000, pause_duration=0.6, silence_rms=0.01):
+        self.model = model
+        self.chunk_size = list(chunk_size)
+        self.encoder_chunk_look_back = encoder_chunk_look_back
+        self.decoder_chunk_look_back = decoder_chunk_look_back
+        self.chunk_samples = int(chunk_size[1] * self.FRAME_SECONDS * sample_rate)
+        self.sample_rate = sample_rate
+        self.pause_samples = int(pause_duration * sample_rate)
+        self.silence_rms = silence_rms
+        self.cache = {}
+        self._silent_samples = 0
+        self._has_speech = False
+
+    def _generate(self, samples, is_final):
+        res = self.model.generate(input=samples, cache=self.cache, is_final=is_final,
+                                  chunk_size=self.chunk_size,
+                                  encoder_chunk_look_back=self.encoder_chunk_look_back,
+                                  decoder_chunk_look_back=self.decoder_chunk_look_back)
+        if is_final:
+            self.cache = {}
+            self._has_speech = False
+        return result_text(res)
+
+    def feed(self, samples):
+        """
+        送入一个块的音频（长度应为 chunk_samples），返回该块新增的识别文本
+        """
+        rms = float(np.sqrt(np.mean(np.square(samples)))) if len(samples) else 0.0
+        if rms < self.silence_rms:
+            self._silent_samples += len(samples)
+        else:
+            self._silent_samples = 0
+            self._has_speech = True
+        # 语音之后出现足够长的停顿，在该块上收尾，输出剩余文字
+        is_final = self._has_speech and self._silent_samples >= self.pause_samples
+        return self._generate(samples, is_final)
+
+    def finalize(self):
+        """流结束时调用，输出解码器中剩余的文字"""
+        if not self._has_speech:
+            self.cache = {}
+            return ""
+        return self._generate(np.zeros(0, dtype=np.float32), True)
+
+
+def warm_up(model, sample_rate=16000, seconds=1.2, chunk_size=(0, 10, 5)):
+    """
+    用一段低电平噪声分别以独立窗口和流式块各识别一次，触发 CUDA/ONNX 的图编译、
+    显存分配和线程池创建，使第一个真实窗口的耗时与之后一致。返回耗时（秒）
+    """
+    start = time.monotonic()
+    samples = (np.random.default_rng(0).standard_normal(int(seconds * sample_rate)) * 0.01).astype(np.float32)
+    try:
+        model.generate(input=samples, is_final=True)
+        if getattr(model, "streaming", True):
+            chunk = samples[:int(chunk_size[1] * StreamingRecognizer.FRAME_SECONDS * sample_rate)]
+            model.generate(input=chunk, cache={}, is_final=True, chunk_size=list(chunk_size),
+                           encoder_chunk_look_back=4, decoder_chunk_look_back=1)
+    except Exception as e:
+        logger.warning(f"ASR warm-up failed: {e}")
+    elapsed = time.monotonic() - start
+    logger.info(f"ASR warm-up finished in {elapsed:.2f}s")
+    return elapsed
+
+
+class InferenceWorker(threading.Thread):
+    """
+    独立的语音识别线程
+
+    从有界队列 in_queue 取出 (pts, samples)，识别后把
+    (pts, text, queued_t, start_t, end_t, skipped) 放入 out_queue。
+    收到 None 时向 out_queue 转发 None 并退出。
+
+    samples 为 None 表示 VAD 判定为非语音的窗口，不做识别、skipped 为 True；
+    语音刚结束时调用 finish 收尾当前句子，text 为该句剩余的文字。
+    识别失败或超时时 text 为 None，合并线程据此消音，而不是当作没有敏感词放行。
+
+    Args:
+        recognize: 输入音频返回识别文本的可调用对象
+        in_queue: 待识别窗口队列，元素为 (pts, samples, queued_t)
+        out_queue: 识别结果队列
+        finish: 句子结束时调用、返回剩余文本的可调用对象，例如 StreamingRecognizer.finalize
+    """
+
+    def __init__(self, recognize, in_queue, out_queue, finish=None):
+        super().__init__(name="InferenceWorker", daemon=True)
+        self.recognize = recognize
+        self.finish = finish
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+
+    def run(self):
+        in_speech = False
+        while True:
+            item = self.in_queue.get()
+            if item is None:
+                self.out_queue.put(None)
+                break
+            pts, samples, queued_t = item
+            start_t = time.monotonic()
+            skipped = samples is None
+            try:
+                if not skipped:
+                    text = self.recognize(samples)
+                elif in_speech and self.finish is not None:
+                    text = self.finish()
+                else:
+                    text = ""
+            except Exception as e:
+                logger.error(f"Speech recognition failed: {e}")
+                text = None
+            in_speech = not skipped
+            self.out_queue.put((pts, text, queued_t, start_t, time.monotonic(), skipped))
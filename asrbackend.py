@@ -0,0 +1,217 @@
+"""
+语音识别后端
+
+init_model 按配置或硬件检测创建以下后端之一。各后端都提供与 funasr.AutoModel 相同的
+generate(input=..., cache=..., is_final=...) 接口并返回 [{"text": ...}]，
+StreamingRecognizer、asrserver 的批量识别等上层代码不需要区分后端：
+
+- "funasr": FunASR AutoModel（torch），有 CUDA 时优先使用
+- "onnx": ONNX Runtime 上的 int8 量化 Paraformer 流式模型（funasr_onnx），纯 CPU 部署时优先使用，
+  模型目录中需有 model_quant.onnx / decoder_quant.onnx（python download_model.py --onnx 导出）
+- "whisper": faster-whisper（CTranslate2 int8），只支持独立窗口识别
+
+后端依赖都在创建时才导入，未安装的后端不影响其他后端使用。
+"""
+import importlib.util
+import os
+import numpy as np
+from util import get_logger, resource_path
+
+logger = get_logger()
+
+# "auto" 时按顺序尝试的后端：有 CUDA 时用 FunASR，否则优先量化的 CPU 后端
+AUTO_GPU_ORDER = ("funasr", "onnx", "whisper")
+AUTO_CPU_ORDER = ("onnx", "whisper", "funasr")
+# 各后端依赖的模块，用于在导入前判断是否可用
+BACKEND_MODULES = {
+    "funasr": ("funasr", "torch"),
+    "onnx": ("funasr_onnx", "onnxruntime"),
+    "whisper": ("faster_whisper",),
+}
+# 未指定 model_dir 时的默认模型；whisper 目录不存在时按模型名从网络下载
+DEFAULT_MODEL_DIRS = {"funasr": "model", "onnx": "model", "whisper": "model-whisper"}
+DEFAULT_WHISPER_MODEL = "small"
+# CPU 推理线程数，过多的线程在采集、发送进程同时运行时反而变慢
+cpu_threads = min(4, os.cpu_count() or 1)
+
+
+def backend_available(name):
+    return all(importlib.util.find_spec(module) is not None for module in BACKEND_MODULES[name])
+
+
+def cuda_available():
+    if importlib.util.find_spec("torch") is None:
+        return False
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except Exception as e:
+        logger.warning(f"CUDA detection failed: {e}")
+        return False
+
+
+def _pred_text(pred):
+    """funasr_onnx 的 preds 在不同版本中为文本或 (文本, tokens)"""
+    if isinstance(pred, (list, tuple)):
+        pred = pred[0] if pred else ""
+    return str(pred or "")
+
+
+class ASRBackend:
+    """
+    识别后端基类
+
+    子类实现 _transcribe（独立窗口）和（支持流式时）_stream；列表输入逐个识别，
+    批量计算更快的后端可以覆盖 generate。
+
+    Attributes:
+        name: 后端名称
+        device: 实际使用的设备
+        streaming: 是否支持块间保留 cache 的流式识别
+        fixed_chunk_size: 流式块长度是否在创建时确定（为 True 时 create_backend 传入 chunk_size）
+    """
+    name = ""
+    streaming = False
+    fixed_chunk_size = False
+
+    def __init__(self, device="cpu"):
+        self.device = device
+
+    def generate(self, input=None, cache=None, is_final=True, **kwargs):
+        if isinstance(input, list):
+            return [{"text": self._transcribe(np.asarray(samples, dtype=np.float32))} for samples in input]
+        samples = np.asarray(input, dtype=np.float32)
+        if cache is not None and self.streaming:
+            return [{"text": self._stream(samples, cache, is_final)}]
+        if len(samples) == 0:
+            return [{"text": ""}]
+        return [{"text": self._transcribe(samples)}]
+
+    def _transcribe(self, samples):
+        raise NotImplementedError
+
+    def _stream(self, samples, cache, is_final):
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"{type(self).__name__}(device={self.device!r})"
+
+
+class FunASRBackend(ASRBackend):
+    """FunASR AutoModel，generate 直接转发，支持流式 cache 和批量输入"""
+    name = "funasr"
+    streaming = True
+
+    def __init__(self, model_dir, device="cpu", threads=None, **options):
+        super().__init__(device)
+        from funasr import AutoModel
+        options.setdefault("ncpu", threads or cpu_threads)
+        self.model = AutoModel(model=model_dir, model_revision="v2.0.4", disable_update=True, device=device,
+                               disable_pbar=False, **options)
+
+    def generate(self, input=None, **kwargs):
+        return self.model.generate(input=input, **kwargs)
+
+
+class ParaformerONNXBackend(ASRBackend):
+    """
+    ONNX Runtime 上的 int8 量化 Paraformer 流式模型
+
+    funasr_onnx 的块长度在创建时确定，chunk_size 为 StreamingRecognizer 使用的 (0, 块, 前瞻)，
+    由 create_backend 按 asr_chunk_ms 传入；funasr_onnx 的第一项是编码器左侧上下文的帧数，固定为
+    LEFT_CONTEXT。独立窗口识别使用新的 cache 并立即收尾。
+    """
+    name = "onnx"
+    streaming = True
+    fixed_chunk_size = True
+    LEFT_CONTEXT = 5
+
+    def __init__(self, model_dir, device="cpu", threads=None, chunk_size=(0, 10, 5), quantize=True, **options):
+        super().__init__("cpu" if device.startswith("cpu") else device)
+        from funasr_onnx.paraformer_online_bin import Paraformer
+        device_id = -1 if self.device == "cpu" else int(self.device.partition(":")[2] or 0)
+        self.chunk_size = [self.LEFT_CONTEXT, chunk_size[1], chunk_size[2]]
+        self.model = Paraformer(model_dir, batch_size=1, chunk_size=self.chunk_size, device_id=device_id,
+                                quantize=quantize, intra_op_num_threads=threads or cpu_threads, **options)
+
+    def _stream(self, samples, cache, is_final):
+        res = self.model(audio_in=samples, param_dict={"cache": cache, "is_final": is_final})
+        text = "".join(_pred_text(item.get("preds")) for item in res or [])
+        if is_final:
+            cache.clear()
+        return text
+
+    def _transcribe(self, samples):
+        return self._stream(samples, {}, True)
+
+
+class FasterWhisperBackend(ASRBackend):
+    """
+    faster-whisper（CTranslate2），CPU 上默认 int8 计算
+
+    Whisper 没有块间 cache，只用于 window 模式；贪心解码、不带上文，
+    使每个窗口的耗时稳定。initial_prompt 让模型输出简体中文。
+    """
+    name = "whisper"
+    streaming = False
+
+    def __init__(self, model_dir, device="cpu", threads=None, compute_type=None, language="zh",
+                 initial_prompt="以下是普通话的句子。", beam_size=1, **options):
+        super().__init__(device)
+        from faster_whisper import WhisperModel
+        if not os.path.isdir(model_dir):
+            logger.info(f"Whisper model directory {model_dir} not found, using model {DEFAULT_WHISPER_MODEL}")
+            model_dir = DEFAULT_WHISPER_MODEL
+        whisper_device, _, index = device.partition(":")
+        self.model = WhisperModel(model_dir, device=whisper_device, device_index=int(index or 0),
+                                  compute_type=compute_type or ("int8" if whisper_device == "cpu" else "float16"),
+                                  cpu_threads=threads or cpu_threads, **options)
+        self.language = language
+        self.initial_prompt = initial_prompt
+        self.beam_size = beam_size
+
+    def _transcribe(self, samples):
+        segments, _ = self.model.transcribe(samples, language=self.language, beam_size=self.beam_size,
+                                            initial_prompt=self.initial_prompt,
+                                            condition_on_previous_text=False, vad_filter=False)
+        return "".join(segment.text for segment in segments).replace(" ", "")
+
+
+BACKENDS = {backend.name: backend for backend in (FunASRBackend, ParaformerONNXBackend, FasterWhisperBackend)}
+
+
+def create_backend(backend="auto", model_dir=None, device=None, chunk_size=None, **options):
+    """
+    创建识别后端
+
+    Args:
+        backend: "funasr"、"onnx"、"whisper"，或 "auto" 按硬件和已安装的依赖选择，
+            依次尝试直到有一个加载成功
+        model_dir: 模型目录，为 None 时使用 DEFAULT_MODEL_DIRS 中的默认目录
+        device: "cpu"、"cuda:0" 等，为 None 时有 CUDA 则用 GPU
+        chunk_size: 流式识别的 FunASR chunk_size，传给创建时就要确定块长度的后端（fixed_chunk_size）
+        options: 传给具体后端，例如 threads、compute_type
+
+    Returns:
+        ASRBackend，全部失败时为 None
+    """
+    gpu = device.startswith("cuda") if device else cuda_available()
+    device = device or ("cuda:0" if gpu else "cpu")
+    if backend == "auto":
+        candidates = [name for name in (AUTO_GPU_ORDER if gpu else AUTO_CPU_ORDER) if backend_available(name)]
+        logger.info(f"Auto-selecting ASR backend for {device}, candidates: {candidates}")
+    else:
+        candidates = [backend]
+    for name in candidates:
+        path = model_dir or resource_path(DEFAULT_MODEL_DIRS[name])
+        try:
+            backend_options = dict(options)
+            if chunk_size is not None and BACKENDS[name].fixed_chunk_size:
+                backend_options["chunk_size"] = chunk_size
+            model = BACKENDS[name](path, device=device, **backend_options)
+        except Exception as e:
+            logger.error(f"Failed to initialize ASR backend {name} from {path}: {e}")
+            continue
+        logger.info(f"ASR backend {name} initialized on {model.device} from {path}")
+        return model
+    return None
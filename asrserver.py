@@ -0,0 +1,239 @@
+import os
+import queue
+import time
+from multiprocessing import Process, Queue, Event, Array
+from util import get_logger, init_process_logging
+from metrics import get_registry, start_metrics_reporter
+from asr import StreamingRecognizer, RecognitionError, result_text
+
+logger = get_logger()
+
+# 一个批次最多合并的窗口数，以及为凑批次最多等待的时间（秒）
+max_batch = 8
+max_batch_wait = 0.02
+# 客户端等待识别结果的超时（秒），超时或服务端识别失败时客户端抛出 asr.RecognitionError，该窗口被消音
+response_timeout = 30.0
+
+BATCH_BUCKETS = (1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+
+
+def batch_generate(model, windows):
+    """
+    一次前向计算识别多个独立窗口，返回与 windows 顺序一致的文本列表
+
+    模型不支持批量输入时退回逐个识别。
+    """
+    if len(windows) == 1:
+        return [result_text(model.generate(input=windows[0], is_final=True))]
+    try:
+        res = model.generate(input=list(windows), batch_size=len(windows), is_final=True)
+        if isinstance(res, list) and len(res) == len(windows):
+            return [result_text([item]) for item in res]
+        logger.warning(f"Batched generate returned {len(res) if isinstance(res, list) else res!r} results "
+                       f"for {len(windows)} windows, falling back to sequential inference")
+    except Exception as e:
+        logger.warning(f"Batched generate failed, falling back to sequential inference: {e}")
+    return [result_text(model.generate(input=w, is_final=True)) for w in windows]
+
+
+class ASRClient:
+    """
+    采集进程中使用的识别客户端，接口与 StreamingRecognizer 一致（feed/finalize），
+    另有 transcribe 用于独立窗口识别。同一时刻每个流只有一个请求在途。
+
+    对象可以直接作为 Process 参数传递。服务在多次启动/停止之间常驻时，同一个流号会先后被
+    不同的采集进程使用，请求序号带上进程号，避免收到上一个进程遗留的结果。
+    """
+
+    def __init__(self, stream_id, request_queue, response_queue, chunk_samples, ready=None, failed=None):
+        self.stream_id = stream_id
+        self.request_queue = request_queue
+        self.response_queue = response_queue
+        self.chunk_samples = chunk_samples
+        self.ready = ready
+        self.failed = failed
+        self._seq = 0
+
+    def wait_ready(self, stop_event=None, poll_interval=0.05):
+        """等待服务加载并预热完模型；模型加载失败或 stop_event 被设置时返回 False"""
+        while self.ready is not None and not self.ready.is_set():
+            if self.failed is not None and self.failed.is_set():
+                return False
+            if stop_event is not None and stop_event.is_set():
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def _request(self, kind, samples):
+        self._seq += 1
+        seq = (os.getpid(), self._seq)
+        self.request_queue.put((self.stream_id, seq, kind, samples, time.time()))
+        deadline = time.monotonic() + response_timeout
+        while True:
+            try:
+                reply_seq, text = self.response_queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                logger.error(f"ASR server did not answer stream {self.stream_id} within {response_timeout}s")
+                raise RecognitionError(f"ASR server timed out after {response_timeout}s")
+            # 丢弃超时请求或上一个进程的请求迟到的结果
+            if reply_seq == seq:
+                if text is None:
+                    raise RecognitionError("ASR server failed to recognize the window")
+                return text
+
+    def feed(self, samples):
+        return self._request("feed", samples)
+
+    def finalize(self):
+        return self._request("finalize", None)
+
+    def transcribe(self, samples):
+        return self._request("window", samples)
+
+    def reset(self):
+        """丢弃该流在服务端的流式 cache，新的采集进程开始时调用"""
+        try:
+            self._request("reset", None)
+        except RecognitionError:
+            # 服务无响应时之后的每个窗口都会超时并被消音，这里不中断启动
+            pass
+
+
+class ASRService:
+    """
+    多路共享的识别服务
+
+    在独立进程中只加载一份模型并预热，各采集进程通过 ASRClient 经本地队列提交音频窗口。
+    服务的生命周期由传给 start 的 stop_event 决定，可以跨越多次处理流程的启动/停止。
+    服务进程在 max_batch_wait 内凑齐最多 max_batch 个并发请求：独立窗口（window 模式）
+    合并为一次批量 generate；流式请求按流保留各自的 StreamingRecognizer cache，
+    共用同一份模型依次计算（Paraformer 流式 cache 不能跨流合批）。结果按流号送回。
+
+    Args:
+        streams: 流的数量，每个流对应一个结果队列
+        asr_config: init_model 的参数
+        chunk_size: 流式识别的 FunASR chunk_size
+        sample_rate: 输入采样率
+    """
+
+    def __init__(self, streams, asr_config=None, chunk_size=(0, 10, 5), sample_rate=16000):
+        self.streams = streams
+        self.asr_config = dict(asr_config or {})
+        self.chunk_size = tuple(chunk_size)
+        self.sample_rate = sample_rate
+        self.request_queue = Queue()
+        self.response_queues = [Queue() for _ in range(streams)]
+        # 模型加载和预热完成后设置
+        self.ready = Event()
+        # 模型加载失败时设置，服务进程随即退出
+        self.failed = Event()
+        # 模型实际使用的设备（如 "cuda:0"、"cpu"），加载失败时为空；界面据此显示，不必自己导入 torch
+        self._device = Array('c', 64)
+        self.process = None
+
+    @property
+    def device(self):
+        """就绪后返回模型所在设备，尚未就绪或加载失败时返回 None（加载失败时 failed 被设置）"""
+        return self._device.value.decode() or None
+
+    @property
+    def chunk_samples(self):
+        return int(self.chunk_size[1] * StreamingRecognizer.FRAME_SECONDS * self.sample_rate)
+
+    def client(self, stream_id):
+        return ASRClient(stream_id, self.request_queue, self.response_queues[stream_id], self.chunk_samples,
+                         self.ready, self.failed)
+
+    def start(self, stop_event, metrics_queue=None, log_channel=None):
+        self.process = Process(target=process_asr_server, name="ASRServer",
+                               args=(self.request_queue, self.response_queues, stop_event, self.asr_config,
+                                     self.chunk_size, self.sample_rate, metrics_queue, log_channel, self.ready,
+                                     self._device, self.failed))
+        self.process.start()
+        return self.process
+
+
+def process_asr_server(request_queue, response_queues, stop_event, asr_config, chunk_size=(0, 10, 5),
+                       sample_rate=16000, metrics_queue=None, log_channel=None, ready=None, device=None,
+                       failed=None):
+    init_process_logging(log_channel)
+    # 在函数内导入，避免只使用客户端的进程加载识别模型依赖
+    from filterprocess import init_model
+    logger.info(f"Starting ASR server for {len(response_queues)} streams, "
+                f"max_batch={max_batch}, max_batch_wait={max_batch_wait * 1000:.0f}ms")
+    # 服务端的块长度即各流送入的块长度
+    model = init_model(chunk_size=chunk_size, **asr_config)
+    if model is None:
+        # 没有模型时不提供服务，客户端据此拒绝开始，而不是把每个窗口都当作空文本放行
+        logger.error("ASR server failed to load the model, exiting")
+        if failed is not None:
+            failed.set()
+        return
+    if device is not None:
+        device.value = str(getattr(model, "device", "cpu")).encode()[:63]
+    if ready is not None:
+        ready.set()
+    metrics_reporter = start_metrics_reporter(metrics_queue, "ASRServer", stop_event)
+    registry = get_registry()
+    batch_sizes = registry.histogram("asr_server_batch_size", BATCH_BUCKETS)
+    request_wait = registry.histogram("asr_server_request_wait_seconds")
+    batch_seconds = registry.histogram("asr_server_batch_seconds")
+    requests_total = registry.counter("asr_server_requests_total")
+    # 流号 -> 该流的 StreamingRecognizer（各自保留 cache）
+    recognizers = {}
+    try:
+        while not stop_event.is_set():
+            try:
+                batch = [request_queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + max_batch_wait
+            while len(batch) < max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(request_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            start_t = time.monotonic()
+            now = time.time()
+            results = {}
+            windows = [i for i, request in enumerate(batch) if request[2] == "window"]
+            if windows:
+                try:
+                    texts = batch_generate(model, [batch[i][3] for i in windows])
+                except Exception as e:
+                    logger.error(f"Speech recognition failed: {e}")
+                    # None 表示识别失败，客户端收到后抛出 RecognitionError
+                    texts = [None] * len(windows)
+                results.update(zip(windows, texts))
+            for i, (stream_id, _, kind, samples, _) in enumerate(batch):
+                if kind == "window":
+                    continue
+                if kind == "reset":
+                    recognizers.pop(stream_id, None)
+                    results[i] = ""
+                    continue
+                recognizer = recognizers.get(stream_id)
+                if recognizer is None:
+                    if not getattr(model, "streaming", True):
+                        logger.warning(f"ASR backend {model.name} does not support streaming, "
+                                       f"stream {stream_id} chunks are recognized independently")
+                    recognizer = recognizers[stream_id] = StreamingRecognizer(model, chunk_size=chunk_size,
+                                                                              sample_rate=sample_rate)
+                try:
+                    results[i] = recognizer.feed(samples) if kind == "feed" else recognizer.finalize()
+                except Exception as e:
+                    logger.error(f"Speech recognition failed for stream {stream_id}: {e}")
+                    results[i] = None
+            for i, (stream_id, seq, _, _, queued_t) in enumerate(batch):
+                response_queues[stream_id].put((seq, results[i]))
+                request_wait.observe(now - queued_t)
+            batch_sizes.observe(len(batch))
+            batch_seconds.observe(time.monotonic() - start_t)
+            requests_total.inc(len(batch))
+    finally:
+        if metrics_reporter is not None:
+            metrics_reporter.report()
+        logger.info("ASR server stopped")
@@ -0,0 +1,157 @@
+"""
+识别后端实时率基准
+
+在 CPU（或 --device 指定的设备）上依次加载各识别后端（见 asrbackend.py），
+对同一段音频测量：
+
+- 模型加载耗时和加载后的常驻内存
+- window 模式：按 1.2 s 独立窗口识别，实时率 RTF（推理耗时 / 音频时长）及单窗口耗时分位数
+- streaming 模式（后端支持时）：按 600 ms 块流式识别的 RTF 及单块耗时分位数
+- 推理期间平均占用的 CPU 核数
+
+每个后端在单独的子进程中运行，内存和线程互不影响；未安装依赖的后端记为 unavailable。
+
+    python benchmarks/bench_asr.py --audio speech.wav
+    python benchmarks/bench_asr.py --backends onnx,whisper --threads 2 --output bench_asr.json
+
+默认使用合成的音调音频，只适合比较 Paraformer 类后端的耗时；Whisper 在非语音输入上
+可能输出重复文本、耗时偏高，比较 Whisper 时请用 --audio 提供真实录音。
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from asrbackend import BACKENDS, DEFAULT_MODEL_DIRS, backend_available, create_backend  # noqa: E402
+from asr import StreamingRecognizer, result_text  # noqa: E402
+from mediaio import read_wav  # noqa: E402
+from bench_pipeline import synthesize_audio, _read_proc  # noqa: E402
+
+RATE = 16000
+WINDOW_SECONDS = 1.2
+CHUNK_SIZE = (0, 10, 5)
+# 不计入统计的预热窗口数
+WARMUP = 2
+
+
+def _timings(durations, audio_seconds, cpu_seconds):
+    durations = np.array(durations[WARMUP:] if len(durations) > WARMUP * 2 else durations)
+    return {
+        "rtf": float(durations.sum() / audio_seconds) if audio_seconds else 0.0,
+        "p50_ms": float(np.percentile(durations, 50) * 1000),
+        "p99_ms": float(np.percentile(durations, 99) * 1000),
+        "cpu_cores": float(cpu_seconds / durations.sum()) if durations.sum() else 0.0,
+    }
+
+
+def _measure(calls, step_seconds):
+    """依次执行 calls，返回 (各次耗时, 计入统计的音频时长, CPU 秒数)"""
+    durations = []
+    cpu0 = time.process_time()
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+    counted = len(durations) - (WARMUP if len(durations) > WARMUP * 2 else 0)
+    return durations, counted * step_seconds, time.process_time() - cpu0
+
+
+def run_backend(name, samples, model_dir=None, device="cpu", threads=None):
+    """在子进程中执行：加载后端并测量两种模式，返回结果字典"""
+    options = {"threads": threads} if threads else {}
+    start = time.perf_counter()
+    model = create_backend(name, model_dir=model_dir, device=device, **options)
+    if model is None:
+        return {"backend": name, "status": "failed to load"}
+    result = {
+        "backend": name,
+        "status": "ok",
+        "device": model.device,
+        "load_seconds": time.perf_counter() - start,
+        "rss_mb": _read_proc(os.getpid())[1] / 2 ** 20,
+    }
+
+    window = int(WINDOW_SECONDS * RATE)
+    windows = [samples[i:i + window] for i in range(0, len(samples) - window + 1, window)]
+    texts = []
+    durations, seconds, cpu = _measure(
+        [lambda w=w: texts.append(result_text(model.generate(input=w, is_final=True))) for w in windows],
+        WINDOW_SECONDS)
+    result["window"] = _timings(durations, seconds, cpu)
+    result["window"]["sample_text"] = "".join(texts)[:40]
+
+    if model.streaming:
+        recognizer = StreamingRecognizer(model, chunk_size=CHUNK_SIZE, sample_rate=RATE)
+        chunk = recognizer.chunk_samples
+        chunks = [samples[i:i + chunk] for i in range(0, len(samples) - chunk + 1, chunk)]
+        durations, seconds, cpu = _measure([lambda c=c: recognizer.feed(c) for c in chunks], chunk / RATE)
+        recognizer.finalize()
+        result["streaming"] = _timings(durations, seconds, cpu)
+    return result
+
+
+def print_table(results):
+    header = (f"{'backend':<10}{'status':<16}{'load s':>8}{'RSS MB':>8}"
+              f"{'win RTF':>9}{'win p99 ms':>12}{'str RTF':>9}{'str p99 ms':>12}{'cores':>7}")
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if r["status"] != "ok":
+            print(f"{r['backend']:<10}{r['status']:<16}")
+            continue
+        stream = r.get("streaming")
+        print(f"{r['backend']:<10}{r['status']:<16}{r['load_seconds']:>8.1f}{r['rss_mb']:>8.0f}"
+              f"{r['window']['rtf']:>9.3f}{r['window']['p99_ms']:>12.1f}"
+              + (f"{stream['rtf']:>9.3f}{stream['p99_ms']:>12.1f}" if stream else f"{'-':>9}{'-':>12}")
+              + f"{r['window']['cpu_cores']:>7.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="逗号分隔的后端名称")
+    parser.add_argument("--audio", help="16 kHz 单声道 WAV 录音，默认使用合成音频")
+    parser.add_argument("--seconds", type=float, default=60.0, help="合成音频时长，或截取录音的前若干秒")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--threads", type=int, help="每个后端的推理线程数，默认见 asrbackend.cpu_threads")
+    parser.add_argument("--model-dir", action="append", default=[], metavar="BACKEND=PATH",
+                        help="指定后端的模型目录，可重复")
+    parser.add_argument("--output", help="把结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    # 默认使用仓库根目录下的模型目录（resource_path 相对于被运行的脚本）
+    model_dirs = {name: os.path.join(ROOT, path) for name, path in DEFAULT_MODEL_DIRS.items()}
+    model_dirs.update(item.split("=", 1) for item in args.model_dir)
+    if args.audio:
+        samples = read_wav(args.audio, RATE)[:int(args.seconds * RATE)]
+    else:
+        samples, _ = synthesize_audio(args.seconds)
+    results = []
+    for name in args.backends.split(","):
+        if name not in BACKENDS:
+            parser.error(f"unknown backend {name}, choose from {', '.join(BACKENDS)}")
+        if not backend_available(name):
+            results.append({"backend": name, "status": "unavailable"})
+            continue
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            try:
+                results.append(executor.submit(run_backend, name, samples, model_dirs.get(name), args.device,
+                                               args.threads).result())
+            except Exception as e:
+                results.append({"backend": name, "status": f"error: {e}"})
+    print(f"audio: {len(samples) / RATE:.1f}s, device: {args.device}, threads: {args.threads or 'default'}")
+    print_table(results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"audio_seconds": len(samples) / RATE, "device": args.device, "results": results}, f,
+                      ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
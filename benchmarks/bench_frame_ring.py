@@ -0,0 +1,98 @@
+"""
+视频帧跨进程传递基准
+
+在两个进程之间以固定帧率传递合成的 BGR 帧，对比 multiprocessing.Queue
+直接传递帧数据与 SharedFrameRing 只传递 (slot, seq) 两种方式的：
+
+- 生产者/消费者进程 CPU 时间（占墙钟时间的百分比）
+- 从写入帧到消费者拿到帧的延迟分位数
+
+    python benchmarks/bench_frame_ring.py --width 1920 --height 1080 --fps 30 --seconds 10
+"""
+import argparse
+import os
+import sys
+import time
+from multiprocessing import Process, Queue
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framering import SharedFrameRing  # noqa: E402
+
+
+def produce(frame_queue, result_queue, width, height, fps, seconds, frame_ring):
+    frame = np.random.randint(0, 255, (height, width, 3), dtype=np.uint8)
+    cpu0 = time.process_time()
+    start = time.monotonic()
+    total = int(fps * seconds)
+    for i in range(total):
+        deadline = start + i / fps
+        time.sleep(max(0.0, deadline - time.monotonic()))
+        # 模拟采集：把帧写入（或复制到）待发送位置
+        frame[0, 0, 0] = i % 256
+        if frame_ring is None:
+            frame_queue.put((time.monotonic(), frame))
+        else:
+            slot, seq = frame_ring.write(frame)
+            frame_queue.put((time.monotonic(), (slot, seq)))
+    frame_queue.put(None)
+    result_queue.put(("producer", time.process_time() - cpu0, time.monotonic() - start))
+
+
+def consume(frame_queue, result_queue, frame_ring):
+    cpu0 = time.process_time()
+    start = time.monotonic()
+    latencies = []
+    checksum = 0
+    while True:
+        item = frame_queue.get()
+        if item is None:
+            break
+        sent_t, payload = item
+        frame = payload if frame_ring is None else frame_ring.read(*payload)
+        latencies.append(time.monotonic() - sent_t)
+        # 读取一个像素，确保帧数据真的可访问
+        checksum += int(frame[0, 0, 0])
+    result_queue.put(("consumer", time.process_time() - cpu0, time.monotonic() - start, latencies))
+
+
+def run(mode, width, height, fps, seconds):
+    frame_queue = Queue()
+    result_queue = Queue()
+    frame_ring = SharedFrameRing.for_video(width, height, fps, delay=2.0) if mode == "shm" else None
+    procs = [
+        Process(target=produce, args=(frame_queue, result_queue, width, height, fps, seconds, frame_ring)),
+        Process(target=consume, args=(frame_queue, result_queue, frame_ring)),
+    ]
+    for p in procs:
+        p.start()
+    results = {}
+    for _ in procs:
+        item = result_queue.get()
+        results[item[0]] = item[1:]
+    for p in procs:
+        p.join()
+    if frame_ring is not None:
+        frame_ring.close()
+    prod_cpu, prod_wall = results["producer"]
+    cons_cpu, cons_wall, latencies = results["consumer"]
+    lat = np.array(latencies) * 1000
+    print(f"{mode:>6} producer_cpu={prod_cpu / prod_wall * 100:6.1f}%  consumer_cpu={cons_cpu / cons_wall * 100:6.1f}%  "
+          f"latency p50={np.percentile(lat, 50):6.2f}ms p99={np.percentile(lat, 99):6.2f}ms  frames={len(lat)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    for mode in ("queue", "shm"):
+        run(mode, args.width, args.height, args.fps, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
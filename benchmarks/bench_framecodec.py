@@ -0,0 +1,148 @@
+"""
+视频延迟缓冲区压缩格式基准
+
+对比 framecodec 中各格式在给定分辨率下的：
+
+- 每帧压缩后大小，以及保存 delay 秒延迟（含共享内存槽位）所需的内存
+- 单线程每帧编码/解码耗时，和按 fps 运行时占用的 CPU 核数
+- workers 个线程并行编解码时的吞吐（帧/秒）
+- 解码结果相对原始帧的 PSNR
+
+默认使用合成的类摄像头画面（渐变背景、移动的色块和传感器噪声），--video 可换成录制的视频文件。
+
+    python benchmarks/bench_framecodec.py --width 1920 --height 1080 --fps 60 --delay 2
+    python benchmarks/bench_framecodec.py --video sample.mp4 --codecs yuv420 jpeg:75 jpeg:90
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from framecodec import make_frame_codec, frame_nbytes  # noqa: E402
+from filterprocess import video_queue_seconds, delay_max  # noqa: E402
+
+
+def synthetic_frames(width, height, count, seed=0):
+    """渐变背景上移动的色块，叠加高斯噪声，压缩率接近室内摄像头画面"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width]
+    background = np.stack([x * 200 // width + 30, y * 160 // height + 50, (x + y) * 120 // (width + height) + 60],
+                          axis=-1).astype(np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        for k in range(6):
+            cx = int((0.2 + 0.12 * k) * width + 40 * math.sin(i / 10 + k)) % width
+            cy = int((0.3 + 0.08 * k) * height + 30 * math.cos(i / 13 + k)) % height
+            cv2.circle(frame, (cx, cy), height // 10, (40 * k % 255, 255 - 30 * k, 90 + 20 * k), -1)
+        cv2.putText(frame, f"frame {i}", (width // 20, height // 8), cv2.FONT_HERSHEY_SIMPLEX, height / 400,
+                    (255, 255, 255), max(1, height // 300))
+        noise = rng.normal(0, 3, frame.shape)
+        frames.append(np.clip(frame + noise, 0, 255).astype(np.uint8))
+    return frames
+
+
+def video_frames(path, width, height, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (width, height)) if frame.shape[:2] != (height, width) else frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Can't read frames from {path}")
+    return frames
+
+
+def parse_codec(text):
+    """"jpeg:80" -> {"type": "jpeg", "quality": 80}"""
+    kind, _, quality = text.partition(":")
+    return {"type": kind, "quality": int(quality)} if quality else {"type": kind}
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def measure(spec, frames, args):
+    codec = make_frame_codec(spec)
+    codec.decode(codec.encode(frames[0]))
+    start = time.perf_counter()
+    encoded = [codec.encode(frame) for frame in frames]
+    encode_ms = (time.perf_counter() - start) / len(frames) * 1000
+    start = time.perf_counter()
+    decoded = [codec.decode(data) for data in encoded]
+    decode_ms = (time.perf_counter() - start) / len(frames) * 1000
+    with ThreadPoolExecutor(args.workers) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda frame: codec.decode(codec.encode(frame)), frames))
+        parallel_fps = len(frames) / (time.perf_counter() - start)
+    frame_bytes = sum(frame_nbytes(data) for data in encoded) / len(encoded)
+    raw_bytes = frames[0].nbytes
+    # 原始帧保存时共享内存槽位覆盖最大延迟；压缩保存时槽位只覆盖视频队列，堆中另存压缩帧
+    if spec["type"] == "raw":
+        memory = raw_bytes * (math.ceil(args.fps * (args.delay + 0.5)) + 2)
+    else:
+        memory = (raw_bytes * (math.ceil(args.fps * (video_queue_seconds + 0.5)) + 2)
+                  + frame_bytes * args.fps * args.delay)
+    return {
+        "codec": spec,
+        "backend": getattr(codec, "backend", None),
+        "frame_kb": frame_bytes / 1024,
+        "ratio": raw_bytes / frame_bytes,
+        "memory_mb": memory / 1e6,
+        "encode_ms": encode_ms,
+        "decode_ms": decode_ms,
+        "cores": (encode_ms + decode_ms) * args.fps / 1000,
+        "parallel_fps": parallel_fps,
+        "psnr_db": min(psnr(frame, frame_out) for frame, frame_out in zip(frames, decoded)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--delay", type=float, default=delay_max, help="需要保存的延迟（秒）")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--workers", type=int, default=2, help="并行编解码的线程数")
+    parser.add_argument("--codecs", nargs="+", default=["raw", "yuv420", "jpeg:75", "jpeg:85", "jpeg:95"],
+                        help="格式名，jpeg 可用 jpeg:<quality> 指定质量")
+    parser.add_argument("--video", help="使用该视频文件的帧代替合成画面")
+    parser.add_argument("--output", help="把结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    if args.video:
+        frames = video_frames(args.video, args.width, args.height, args.frames)
+    else:
+        frames = synthetic_frames(args.width, args.height, args.frames)
+    print(f"{args.width}x{args.height}@{args.fps}, delay {args.delay:.1f}s, {len(frames)} frames, "
+          f"{args.workers} workers")
+    print(f"{'codec':<10}{'KB/frame':>10}{'ratio':>7}{'memory MB':>11}{'enc ms':>8}{'dec ms':>8}"
+          f"{'cores':>7}{'fps (pool)':>12}{'PSNR dB':>9}")
+    results = []
+    for text in args.codecs:
+        result = measure(parse_codec(text), frames, args)
+        results.append(result)
+        print(f"{text:<10}{result['frame_kb']:>10.0f}{result['ratio']:>7.1f}{result['memory_mb']:>11.0f}"
+              f"{result['encode_ms']:>8.2f}{result['decode_ms']:>8.2f}{result['cores']:>7.2f}"
+              f"{result['parallel_fps']:>12.0f}{result['psnr_db']:>9.1f}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"params": vars(args), "results": results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
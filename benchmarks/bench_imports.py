@@ -0,0 +1,120 @@
+"""
+各进程角色的导入耗时基准
+
+在新的解释器中以 python -X importtime 导入每个角色实际用到的模块，统计：
+
+- 导入总耗时（顶层模块 cumulative 之和）和含解释器启动的进程总耗时
+- 加载了哪些重量级依赖（torch、funasr、cv2、pyaudio 等）
+- 耗时最多的包（包内各模块自身耗时之和）
+
+Windows 上子进程以 spawn 方式启动，每个子进程都会重新导入进程函数所在的模块，
+因此这里的耗时近似于界面出现前和每个工作进程开始工作前的冷启动开销。
+
+    python benchmarks/bench_imports.py
+    python benchmarks/bench_imports.py --repeat 5 --output bench_imports.json
+
+未安装的依赖记为 missing，不计入耗时。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 角色 -> 依次导入的模块：进程函数所在模块，以及该角色运行时才按需导入的依赖
+ROLES = [
+    ("gui", ["run"]),
+    ("asr_server", ["asrserver", "asrbackend", "funasr", "torch"]),
+    ("audio_capture", ["filterprocess", "pyaudio"]),
+    ("audio_send", ["filterprocess", "pyaudio"]),
+    ("video_capture", ["filterprocess", "cv2"]),
+    ("video_send", ["filterprocess", "cv2", "pyvirtualcam"]),
+    ("headless", ["headless"]),
+]
+HEAVY_MODULES = ["torch", "funasr", "funasr_onnx", "onnxruntime", "faster_whisper", "ctranslate2", "cv2",
+                 "pyaudio", "pyvirtualcam", "pygrabber", "tkinter", "numpy", "pypinyin"]
+
+# importlib.import_module 不经过解释器的导入计时，这里用 __import__
+IMPORT_SCRIPT = """
+import sys
+sys.path.insert(0, {root!r})
+for name in {modules!r}:
+    try:
+        __import__(name)
+    except ImportError as e:
+        print("missing", name, e.name, flush=True)
+"""
+
+
+def parse_importtime(stderr):
+    """返回 (顶层导入的 cumulative 微秒之和, 各顶层包的 self 微秒之和, 所有导入过的模块名集合)"""
+    total = 0
+    packages = {}
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative, raw_name = line[len("import time:"):].split("|", 2)
+        name = raw_name.strip()
+        modules.add(name)
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(self_us)
+        # 嵌套导入的名称前有更多缩进
+        if not raw_name.startswith("  "):
+            total += int(cumulative)
+    return total, packages, modules
+
+
+def measure_role(modules, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c",
+                               IMPORT_SCRIPT.format(root=ROOT, modules=modules)],
+                              cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - start
+        total, packages, loaded = parse_importtime(proc.stderr)
+        missing = sorted({line.split()[2] for line in proc.stdout.splitlines() if line.startswith("missing ")})
+        if best is None or total < best["import_ms"] * 1000:
+            best = {
+                "modules": modules,
+                "import_ms": total / 1000,
+                "process_ms": wall * 1000,
+                "heavy_loaded": [name for name in HEAVY_MODULES if name in loaded and name not in missing],
+                "missing": missing,
+                "top": [(name, us / 1000) for name, us in sorted(packages.items(), key=lambda item: -item[1])[:6]],
+            }
+            if proc.returncode != 0:
+                best["error"] = proc.stderr.strip().splitlines()[-1]
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="每个角色运行次数，取导入耗时最少的一次")
+    parser.add_argument("--output", help="把结果写入该 JSON 文件")
+    args = parser.parse_args()
+
+    baseline = measure_role([], args.repeat)
+    results = {"interpreter_ms": baseline["process_ms"], "roles": {}}
+    print(f"interpreter startup: {baseline['process_ms']:.0f} ms")
+    print(f"{'role':<15}{'import ms':>10}{'process ms':>12}  heavy modules loaded / missing")
+    for role, modules in ROLES:
+        result = measure_role(modules, args.repeat)
+        results["roles"][role] = result
+        missing = f" (missing: {', '.join(result['missing'])})" if result["missing"] else ""
+        print(f"{role:<15}{result['import_ms']:>10.0f}{result['process_ms']:>12.0f}  "
+              f"{', '.join(result['heavy_loaded']) or '-'}{missing}")
+        print(" " * 17 + "top: " + ", ".join(f"{name} {ms:.0f}ms" for name, ms in result["top"]))
+        if "error" in result:
+            print(" " * 17 + f"error: {result['error']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
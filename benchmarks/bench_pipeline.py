@@ -0,0 +1,462 @@
+"""
+端到端基准：延迟、消音准确率、音画同步、丢帧、各进程 CPU/内存
+
+通过 headless.run_pipeline 运行完整的 采集 -> 识别 -> 过滤 -> 发送 进程，输入为可复现的测试素材：
+
+- 音频：背景噪声上按固定随机种子排列的一串“词”，每个词是一段特定频率的音调，
+  其中一部分是敏感词，时间位置已知
+- 识别：ToneWordModel 按音调频率“识别”出对应的词，并按 --stub-rtf 模拟推理耗时；
+  也可以用 --model-dir 换成真实模型（CPU），此时用 --audio/--manifest 提供录音和敏感词标注
+- 视频：TestPatternSource 生成的编号画面
+
+结果写入 JSON，可用 --compare 对比两次运行（例如两个提交）：
+
+    python benchmarks/bench_pipeline.py --mode fast --output before.json
+    python benchmarks/bench_pipeline.py --mode paced --seconds 60 --output after.json
+    python benchmarks/bench_pipeline.py --compare before.json after.json
+
+延迟指标在 paced 模式下才反映直播时的情况；fast 模式下输入总是领先识别，
+capture_to_ready 主要是识别队列的排队时间，应关注 speed（处理速度相对实时的倍数）。
+
+消音准确率按采样统计：recall 为敏感词音频被消音的比例，precision 为被消音的音频中
+属于敏感词的比例（识别以窗口为单位，precision 低于 1 是正常的）。测量时关闭自适应延迟，
+使输出音频与输入逐采样对齐。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mediaio import read_frame_number  # noqa: E402
+
+RATE = 16000
+# 测试词表：第 i 个词用 TONE_BASE + i * TONE_STEP Hz 的音调表示
+VOCABULARY = ["你好", "欢迎", "今天", "宝贝", "最便宜", "链接", "超值", "下单", "最实惠", "谢谢"]
+SENSITIVE = ["最便宜", "超值", "最实惠"]
+TONE_BASE = 400.0
+TONE_STEP = 150.0
+WORD_SECONDS = 0.5
+NOISE_LEVEL = 0.02
+
+
+def tone_frequency(word):
+    return TONE_BASE + VOCABULARY.index(word) * TONE_STEP
+
+
+class ToneWordModel:
+    """
+    代替 FunASR 模型的桩：按输入音频中出现的音调频率输出对应的词
+
+    generate 的参数与返回值与 funasr.AutoModel 一致。rtf 为模拟的实时率，
+    每次调用睡眠 音频时长 × rtf 秒；批量输入时按最长的窗口计时，每多一个窗口
+    只增加 batch_cost 倍，模拟批量前向计算的收益。
+    """
+
+    def __init__(self, rtf=0.1, threshold=0.05, batch_cost=0.15):
+        self.rtf = rtf
+        self.threshold = threshold
+        self.batch_cost = batch_cost
+
+    def generate(self, input=None, cache=None, is_final=False, **kwargs):
+        if isinstance(input, list):
+            longest = max(len(samples) for samples in input)
+            time.sleep(longest / RATE * self.rtf * (1 + self.batch_cost * (len(input) - 1)))
+            return [{"text": self._words(np.asarray(samples, dtype=np.float32))} for samples in input]
+        samples = np.asarray(input, dtype=np.float32)
+        if len(samples) == 0:
+            return [{"text": ""}]
+        time.sleep(len(samples) / RATE * self.rtf)
+        return [{"text": self._words(samples)}]
+
+    def _words(self, samples):
+        spectrum = np.abs(np.fft.rfft(samples)) * 2 / len(samples)
+        freqs = np.fft.rfftfreq(len(samples), 1 / RATE)
+        words = []
+        for word in VOCABULARY:
+            band = np.abs(freqs - tone_frequency(word)) < TONE_STEP / 4
+            if spectrum[band].max() > self.threshold:
+                words.append(word)
+        return "".join(words)
+
+
+def synthesize_audio(seconds, seed=0, pause_seconds=0.0):
+    """
+    生成测试音频，返回 (samples, [(word, start, end)])
+
+    pause_seconds 大于 0 时每 3~6 个词后插入平均该时长的停顿（只有背景噪声），模拟主播不说话的时段
+    """
+    rng = np.random.default_rng(seed)
+    # 不插入停顿时不额外抽取随机数，与之前的结果保持相同的素材
+    words_until_pause = rng.integers(3, 7) if pause_seconds > 0 else 0
+    samples = (rng.standard_normal(int(seconds * RATE)) * NOISE_LEVEL).astype(np.float32)
+    script = []
+    t = 1.0
+    while t + WORD_SECONDS < seconds - 1.0:
+        word = VOCABULARY[rng.integers(len(VOCABULARY))]
+        start, end = int(t * RATE), int((t + WORD_SECONDS) * RATE)
+        n = np.arange(end - start)
+        envelope = np.minimum(1.0, np.minimum(n, n[::-1]) / (0.01 * RATE))
+        samples[start:end] += 0.3 * envelope * np.sin(2 * np.pi * tone_frequency(word) * n / RATE)
+        script.append((word, t, t + WORD_SECONDS))
+        t += WORD_SECONDS + rng.uniform(0.3, 0.9)
+        words_until_pause -= 1
+        if words_until_pause == 0:
+            t += pause_seconds * rng.uniform(0.5, 1.5)
+            words_until_pause = rng.integers(3, 7)
+    return samples, script
+
+
+def write_wav(path, samples):
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(RATE)
+        f.writeframes((np.clip(samples, -1, 1) * 32767).astype(np.int16).tobytes())
+
+
+def _read_proc(pid):
+    """返回 (CPU 秒数, RSS 字节)；优先使用 psutil，否则读取 Linux /proc"""
+    try:
+        import psutil
+        proc = psutil.Process(pid)
+        cpu = proc.cpu_times()
+        return cpu.user + cpu.system, proc.memory_info().rss
+    except ImportError:
+        pass
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu = (int(fields[11]) + int(fields[12])) / ticks
+    rss = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+    return cpu, rss
+
+
+class ProcessSampler(threading.Thread):
+    """定期采样各进程的累计 CPU 时间和常驻内存，进程退出后保留最后一次采样"""
+
+    def __init__(self, interval=0.25):
+        super().__init__(name="ProcessSampler", daemon=True)
+        self.interval = interval
+        self.pids = {"Main": os.getpid()}
+        self.samples = {}
+        self._stopped = threading.Event()
+
+    def add(self, processes):
+        self.pids.update({name: process.pid for name, process in processes.items()})
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            now = time.monotonic()
+            for name, pid in list(self.pids.items()):
+                try:
+                    cpu, rss = _read_proc(pid)
+                except Exception:
+                    continue
+                self.samples.setdefault(name, []).append((now, cpu, rss))
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+    def summary(self):
+        result = {}
+        for name, samples in self.samples.items():
+            times, cpu, rss = (np.array(column) for column in zip(*samples))
+            span = times[-1] - times[0]
+            result[name] = {
+                "cpu_seconds": float(cpu[-1]),
+                "cpu_percent": float((cpu[-1] - cpu[0]) / span * 100) if span > 0 else 0.0,
+                "rss_peak_mb": float(rss.max() / 2 ** 20),
+                "rss_mean_mb": float(rss.mean() / 2 ** 20),
+            }
+        return result
+
+
+def _percentiles(values, scale=1.0):
+    if len(values) == 0:
+        return None
+    values = np.asarray(values) * scale
+    return {"p50": float(np.percentile(values, 50)), "p99": float(np.percentile(values, 99)),
+            "max": float(values.max()), "mean": float(values.mean())}
+
+
+def evaluate_audio(result, script, total_samples, sensitive_words):
+    """按输出帧的 PTS 把输出音频对应回输入采样，统计消音准确率和丢失的窗口"""
+    records, data = result["records"], result["data"]
+    window = records[0][2]
+    pts0 = records[0][0]
+    muted = np.zeros(total_samples, dtype=bool)
+    delivered = np.zeros(total_samples, dtype=bool)
+    offset = 0
+    for pts, _, length in records:
+        k = int(round((pts - pts0) * RATE / window))
+        start = k * window
+        chunk = data[offset:offset + length]
+        offset += length
+        end = min(start + length, total_samples)
+        if end <= start:
+            continue
+        delivered[start:end] = True
+        if not chunk.any():
+            muted[start:end] = True
+    sensitive = np.zeros(total_samples, dtype=bool)
+    words = []
+    for word, start, end in script:
+        if word in sensitive_words:
+            sensitive[int(start * RATE):int(end * RATE)] = True
+            segment = slice(int(start * RATE), int(end * RATE))
+            words.append(bool(muted[segment].all() or not delivered[segment].any()))
+    true_positive = np.count_nonzero(muted & sensitive)
+    delivered_sensitive = np.count_nonzero(sensitive & delivered)
+    lateness = [presented - pts for pts, presented, _ in records]
+    return {
+        "frames": len(records),
+        "window_seconds": window / RATE,
+        "dropped_windows": int(round((records[-1][0] - pts0) * RATE / window)) + 1 - len(records),
+        "mute_recall": true_positive / delivered_sensitive if delivered_sensitive else None,
+        "mute_precision": true_positive / np.count_nonzero(muted) if muted.any() else None,
+        "sensitive_words": len(words),
+        "sensitive_words_fully_muted": int(sum(words)),
+        "muted_seconds": float(np.count_nonzero(muted) / RATE),
+        "presentation_lateness_ms": _percentiles(lateness, 1000),
+    }, pts0
+
+
+def evaluate_video(result, expected_frames, fps, audio_pts0):
+    """解码输出帧序号，统计丢帧和相对音频时钟的 PTS 偏差"""
+    numbers = [read_frame_number(frame) for frame in result["data"]] if result["data"] is not None else []
+    received = set(numbers)
+    skew = [pts - (audio_pts0 + n / fps) for (pts, _, _), n in zip(result["records"], numbers)]
+    lateness = [presented - pts for pts, presented, _ in result["records"]]
+    return {
+        "frames": len(result["records"]),
+        "expected_frames": expected_frames,
+        "dropped_frames": expected_frames - len(received),
+        "duplicate_frames": len(numbers) - len(received),
+        "av_pts_skew_ms": _percentiles(skew, 1000),
+        "av_pts_skew_abs_ms": _percentiles(np.abs(skew), 1000),
+        "presentation_lateness_ms": _percentiles(lateness, 1000),
+    }
+
+
+def metric_percentiles(metrics, process, name):
+    metric = metrics.get(process, {}).get("metrics", {}).get(name)
+    if not metric or not metric.get("count"):
+        return None
+    return {"p50_ms": metric["p50"] * 1000, "p99_ms": metric["p99"] * 1000, "count": metric["count"]}
+
+
+def _histogram_mean(metrics, process, name):
+    metric = metrics.get(process, {}).get("metrics", {}).get(name)
+    if not metric or not metric.get("count"):
+        return None
+    return metric["sum"] / metric["count"]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(args):
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    if args.audio:
+        with open(args.manifest, "r", encoding="utf-8") as f:
+            script = [(item["word"], item["start"], item["end"]) for item in json.load(f)]
+        audio_path = args.audio
+        sensitive_words = sorted({word for word, _, _ in script})
+        with wave.open(audio_path, "rb") as f:
+            seconds = f.getnframes() / f.getframerate()
+    else:
+        samples, script = synthesize_audio(args.seconds, args.seed, args.pause_seconds)
+        audio_path = os.path.join(workdir, "speech.wav")
+        write_wav(audio_path, samples)
+        sensitive_words = SENSITIVE
+        seconds = args.seconds
+    words_path = os.path.join(workdir, "sensitive_words.txt")
+    with open(words_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(sensitive_words) + "\n")
+
+    config = load_config_dict({
+        "mode": args.mode,
+        "sensitive_words": words_path,
+        "adaptive_delay": False,
+        "channels": args.channels,
+        "asr_server": {"auto": None, "on": True, "off": False}[args.asr_server],
+        "asr": dict({"backend": args.backend, "model_dir": args.model_dir, "device": "cpu"}
+                    if args.model_dir or args.backend != "auto"
+                    else {"factory": ToneWordModel, "rtf": args.stub_rtf}, mode=args.asr_mode, vad=args.vad),
+        "audio": {"source": {"type": "wav", "path": audio_path, "tail_seconds": 0.0},
+                  "sink": {"type": "memory", "keep_data": True}},
+        "video": None if args.no_video else {
+            "source": {"type": "pattern", "frames": int(seconds * args.fps)},
+            "sink": {"type": "memory", "keep_data": True},
+            "width": args.width, "height": args.height, "fps": args.fps,
+            "delay_codec": parse_delay_codec(args.video_delay_codec),
+        },
+    })
+    # 只对比结果时不需要加载识别模型等依赖
+    from headless import run_pipeline
+    sampler = ProcessSampler()
+    sampler.start()
+    report, sinks = run_pipeline(config, on_start=sampler.add)
+    sampler.stop()
+    # 从各进程同时开始处理计时，不含模型加载等初始化时间
+    wall = report["wall_seconds"]
+
+    total_samples = int(seconds * RATE)
+    audio, audio_pts0 = evaluate_audio(sinks["audio"], script, total_samples, sensitive_words)
+    metrics = report["metrics"]
+    result = {
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "params": {key: value for key, value in vars(args).items() if key != "compare"},
+        "wall_seconds": wall,
+        "startup_seconds": report["startup_seconds"],
+        "audio_seconds": seconds,
+        "speed": seconds / wall,
+        "audio": audio,
+        "latency": {
+            "capture_to_ready": metric_percentiles(metrics, "AudioCapture", "audio_capture_to_queue_seconds"),
+            "asr_queue_wait": metric_percentiles(metrics, "AudioCapture", "asr_queue_wait_seconds"),
+            "asr_inference": metric_percentiles(metrics, "AudioCapture", "asr_inference_seconds"),
+        },
+        "processes": sampler.summary(),
+        "queues": report["queues"],
+    }
+    capture_metrics = metrics.get("AudioCapture", {}).get("metrics", {})
+    if "asr_windows_total" in capture_metrics:
+        windows = capture_metrics["asr_windows_total"]["value"]
+        skipped = capture_metrics["asr_windows_skipped_total"]["value"]
+        result["asr_windows"] = {"total": windows, "skipped": skipped,
+                                 "skip_ratio": skipped / windows if windows else None}
+    if args.channels > 1:
+        result["channels"] = []
+        for channel in range(args.channels):
+            key = f"audio-{channel}" if channel else "audio"
+            if key in sinks:
+                channel_result, _ = evaluate_audio(sinks[key], script, total_samples, sensitive_words)
+                result["channels"].append({name: channel_result[name] for name in
+                                           ("frames", "dropped_windows", "mute_recall", "presentation_lateness_ms")})
+    if "ASRServer" in metrics:
+        result["latency"]["asr_server_batch_size"] = _histogram_mean(metrics, "ASRServer", "asr_server_batch_size")
+        result["latency"]["asr_server_request_wait"] = metric_percentiles(metrics, "ASRServer",
+                                                                          "asr_server_request_wait_seconds")
+    if "video" in sinks:
+        result["video"] = evaluate_video(sinks["video"], int(seconds * args.fps), args.fps, audio_pts0)
+    return result
+
+
+def parse_delay_codec(text):
+    """"jpeg:80" -> {"type": "jpeg", "quality": 80}"""
+    kind, _, quality = text.partition(":")
+    return {"type": kind, "quality": int(quality)} if quality else kind
+
+
+def load_config_dict(overrides):
+    """与 load_config 相同的合并规则，但直接接受字典（配置中含有 ToneWordModel 类，不能写成 JSON）"""
+    from headless import DEFAULT_CONFIG, DEFAULT_VIDEO_CONFIG
+    config = dict(DEFAULT_CONFIG)
+    config.update(overrides)
+    if config["video"] is not None:
+        config["video"] = dict(DEFAULT_VIDEO_CONFIG, **config["video"])
+    return config
+
+
+# --compare 时对比的指标：(显示名称, 取值路径)
+COMPARE_KEYS = [
+    ("speed (x realtime)", ("speed",)),
+    ("capture->ready p50 ms", ("latency", "capture_to_ready", "p50_ms")),
+    ("capture->ready p99 ms", ("latency", "capture_to_ready", "p99_ms")),
+    ("asr inference p99 ms", ("latency", "asr_inference", "p99_ms")),
+    ("asr inference count", ("latency", "asr_inference", "count")),
+    ("asr skip ratio", ("asr_windows", "skip_ratio")),
+    ("audio lateness p99 ms", ("audio", "presentation_lateness_ms", "p99")),
+    ("mute recall", ("audio", "mute_recall")),
+    ("mute precision", ("audio", "mute_precision")),
+    ("dropped audio windows", ("audio", "dropped_windows")),
+    ("dropped video frames", ("video", "dropped_frames")),
+    ("A/V skew |p99| ms", ("video", "av_pts_skew_abs_ms", "p99")),
+]
+
+
+def _lookup(result, path):
+    for key in path:
+        if not isinstance(result, dict) or result.get(key) is None:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(old_path, new_path):
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{'':<26}{str(old.get('commit')):>14}{str(new.get('commit')):>14}{'change':>10}")
+    keys = list(COMPARE_KEYS)
+    keys += [(f"{name} cpu %", ("processes", name, "cpu_percent")) for name in sorted(new.get("processes", {}))]
+    keys += [(f"{name} rss peak MB", ("processes", name, "rss_peak_mb")) for name in sorted(new.get("processes", {}))]
+    for label, path in keys:
+        a, b = _lookup(old, path), _lookup(new, path)
+        change = f"{(b - a) / abs(a) * 100:+.1f}%" if a and b is not None else ""
+        fmt = lambda v: "-" if v is None else f"{v:.3f}"  # noqa: E731
+        print(f"{label:<26}{fmt(a):>14}{fmt(b):>14}{change:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["paced", "fast"], default="fast")
+    parser.add_argument("--seconds", type=float, default=30.0, help="合成音频时长")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pause-seconds", type=float, default=0.0, help="每 3~6 个词后插入的平均停顿时长")
+    parser.add_argument("--stub-rtf", type=float, default=0.1, help="ToneWordModel 模拟的实时率")
+    parser.add_argument("--model-dir", help="使用真实模型（CPU）代替 ToneWordModel")
+    parser.add_argument("--backend", choices=["auto", "funasr", "onnx", "whisper"], default="auto",
+                        help="真实模型使用的识别后端（见 asrbackend.py），指定后端时不需要 --model-dir")
+    parser.add_argument("--audio", help="录音 WAV 文件，需同时给出 --manifest")
+    parser.add_argument("--manifest", help='敏感词标注 JSON：[{"word": ..., "start": 秒, "end": 秒}, ...]')
+    parser.add_argument("--asr-mode", choices=["streaming", "window"], default="streaming")
+    parser.add_argument("--vad", choices=["energy", "fsmn", "off"], default="energy", help="识别前的语音活动检测")
+    parser.add_argument("--channels", type=int, default=1, help="同时运行的音频流数量，多路时使用共享识别服务")
+    parser.add_argument("--asr-server", choices=["auto", "on", "off"], default="auto",
+                        help="是否使用共享识别服务，auto 为多路时使用；off 时每路各自加载模型")
+    parser.add_argument("--no-video", action="store_true")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--video-delay-codec", default="raw",
+                        help="延迟期间视频帧的保存格式：raw、yuv420、jpeg 或 jpeg:<quality>（见 framecodec.py）")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="对比两次运行的结果文件")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if bool(args.audio) != bool(args.manifest):
+        parser.error("--audio and --manifest must be given together")
+    result = run_benchmark(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(json.dumps({key: result[key] for key in ("speed", "audio", "channels", "latency") if key in result},
+                     ensure_ascii=False, indent=2))
+    if "video" in result:
+        print(json.dumps(result["video"], ensure_ascii=False, indent=2))
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+VB-CABLE 输出重采样基准
+
+把连续的 1 kHz 正弦波按 1.2 s 分块，从 16 kHz 重采样到 44.1/48 kHz，对比旧的
+逐块 np.interp 线性插值与 StreamResampler：
+
+- 每秒音频消耗的 CPU 时间
+- 与理想正弦波的最大误差，分别统计块边界附近和块内部
+
+    python benchmarks/bench_resampler.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resampler import StreamResampler  # noqa: E402
+
+INPUT_RATE = 16000
+BLOCK_SECONDS = 1.2
+SECONDS = 60
+TONE_HZ = 1000
+
+
+def legacy_resample(audio_array, input_rate, output_rate):
+    """原 output_audio_to_vb_cable 中的重采样实现"""
+    new_length = int(len(audio_array) * output_rate / input_rate)
+    resampled_audio = np.interp(
+        np.linspace(0, len(audio_array), new_length, endpoint=False),
+        np.arange(len(audio_array)),
+        audio_array
+    )
+    return resampled_audio.astype(np.float32).tobytes()
+
+
+def measure(name, process_block, signal, block, output_rate, delay):
+    cpu0 = time.process_time()
+    chunks = [np.frombuffer(process_block(signal[i:i + block]), dtype=np.float32).copy()
+              for i in range(0, len(signal), block)]
+    cpu = time.process_time() - cpu0
+    out = np.concatenate(chunks)
+    ideal = np.sin(2 * np.pi * TONE_HZ * (np.arange(len(out)) / output_rate - delay))
+    err = np.abs(out - ideal)
+    # 跳过开头一个块（滤波器预热），按输出块边界 ±2 ms 划分区域
+    out_block = block * output_rate // INPUT_RATE
+    edge = int(0.002 * output_rate)
+    pos = np.arange(len(out)) % out_block
+    near_edge = (pos < edge) | (pos >= out_block - edge)
+    valid = np.arange(len(out)) >= out_block
+    print(f"{name:>8} -> {output_rate:>5}: cpu={cpu / SECONDS * 1000:6.3f} ms per audio second, "
+          f"max err edge={err[valid & near_edge].max():.5f} interior={err[valid & ~near_edge].max():.5f}")
+
+
+def main():
+    block = int(BLOCK_SECONDS * INPUT_RATE)
+    signal = np.sin(2 * np.pi * TONE_HZ * np.arange(INPUT_RATE * SECONDS) / INPUT_RATE).astype(np.float32)
+    for output_rate in (44100, 48000):
+        measure("interp", lambda x: legacy_resample(x, INPUT_RATE, output_rate), signal, block, output_rate, 0.0)
+        resampler = StreamResampler(INPUT_RATE, output_rate)
+        # 多相滤波器的群时延为 (taps * up - 1) / (2 * up) 个输入采样
+        delay = (resampler.taps * resampler.up - 1) / (2 * resampler.up) / INPUT_RATE
+        measure("polyphase", lambda x: resampler.process(x).tobytes(), signal, block, output_rate, delay)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import threading
+import numpy as np
+from util import get_logger, RollingStats
+
+logger = get_logger()
+
+
+class AdaptiveDelayController:
+    """
+    根据实测的 采集 -> 识别结果 延迟自动调整直播延迟
+
+    目标延迟取最近若干窗口延迟的 p99 加上余量，并限制在 [min_delay, max_delay]。
+    延迟每次最多调整 max_step 秒，且只在音频窗口开头足够安静时生效：
+    缩短延迟时丢弃窗口开头的静音采样，延长延迟时在窗口开头补静音，
+    因此音频前后衔接不会出现可闻的跳变。识别明显跟不上（目标比当前延迟
+    大 urgent_gap 以上）时不再等待静音，立即延长以免音频帧过期。
+
+    生效后的延迟写入共享的 multiprocessing.Value，视频采集进程经 VideoPtsSmoother 逐帧跟随，
+    音视频使用同一个延迟。
+
+    Args:
+        shared_delay: multiprocessing.Value('d')，为 None 时只在本进程内生效
+        initial: 初始延迟（秒）
+        min_delay, max_delay: 延迟上下限（秒）
+        margin: 在 p99 延迟之上保留的余量（秒），覆盖发送端调度和写声卡的耗时
+        max_step: 单次调整的最大幅度（秒），同时是调整期间音视频之间的最大偏差
+        urgent_gap: 目标延迟超出当前延迟多少秒时不等静音直接调整
+        min_samples: 至少观测到多少个窗口后才开始调整
+        silence_rms: 判定为静音的 RMS 阈值
+        enabled: 为 False 时保持初始延迟不变
+    """
+
+    def __init__(self, shared_delay=None, initial=2.0, min_delay=0.6, max_delay=3.0, margin=0.25, max_step=0.02,
+                 urgent_gap=0.2, min_samples=20, silence_rms=0.01, enabled=True):
+        self.shared_delay = shared_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.margin = margin
+        self.max_step = max_step
+        self.urgent_gap = urgent_gap
+        self.min_samples = min_samples
+        self.silence_rms = silence_rms
+        self.enabled = enabled
+        self._latency = RollingStats(200)
+        self._lock = threading.Lock()
+        self._delay = float(initial)
+        self._publish()
+
+    @property
+    def delay(self):
+        return self._delay
+
+    def _publish(self):
+        if self.shared_delay is not None:
+            self.shared_delay.value = self._delay
+
+    def observe(self, latency):
+        """记录一个窗口从开始采集到可以发送所经过的时间（秒）"""
+        with self._lock:
+            self._latency.add(latency)
+
+    def target(self):
+        with self._lock:
+            if len(self._latency) < self.min_samples:
+                return self._delay
+            p99 = self._latency.percentile(99)
+        return min(self.max_delay, max(self.min_delay, p99 + self.margin))
+
+    def latency_percentiles(self):
+        with self._lock:
+            return self._latency.percentile(50), self._latency.percentile(99)
+
+    def adjust_window(self, samples, sample_rate):
+        """
+        在需要时调整一个音频窗口的长度以改变延迟
+
+        Returns:
+            (samples, delay)：调整后的采样，以及该窗口 PTS 应使用的延迟。
+            窗口的 PTS 始终按调整前的延迟计算，使其与上一窗口首尾相接。
+        """
+        previous = self._delay
+        if not self.enabled:
+            return samples, previous
+        diff = self.target() - previous
+        n = int(round(min(abs(diff), self.max_step) * sample_rate))
+        # 小于 10 ms 的差异不调整，避免来回抖动
+        if n < sample_rate // 100:
+            return samples, previous
+        head = samples[:max(n, sample_rate // 20)]
+        quiet = float(np.sqrt(np.mean(np.square(head)))) < self.silence_rms
+        if not quiet and diff < self.urgent_gap:
+            return samples, previous
+        if diff < 0:
+            samples = samples[n:]
+        else:
+            samples = np.concatenate([np.zeros(n, dtype=samples.dtype), samples])
+        self._delay = previous + (n / sample_rate if diff > 0 else -n / sample_rate)
+        self._publish()
+        logger.info(f"Broadcast delay {previous:.3f}s -> {self._delay:.3f}s (target {previous + diff:.3f}s)")
+        return samples, previous
+
+
+class VideoPtsSmoother:
+    """
+    视频帧按 采集时刻 + 延迟 打 PTS 时，让延迟的变化逐帧平滑生效
+
+    音频在窗口开头一次性调整 max_step，视频若在下一帧直接采用新延迟，缩短延迟时新帧的 PTS
+    可能早于发送端堆中已有的帧，画面乱序。这里每帧最多跟随半个帧间隔的延迟变化，
+    并保证相邻帧的 PTS 间隔不小于半个帧间隔：PTS 严格递增，调整期间帧间隔的变化小于一帧。
+    （间隔下限不取整个帧间隔，否则采集抖动造成的延后会一直累积，延迟也无法缩短。）
+
+    Args:
+        fps: 视频帧率
+    """
+
+    def __init__(self, fps):
+        self.step = 0.5 / fps
+        self.delay = None
+        self._last_pts = None
+
+    def pts(self, capture_t, delay):
+        """capture_t 采集时刻的帧在目标延迟为 delay 时的 PTS"""
+        if self.delay is None:
+            self.delay = delay
+        else:
+            self.delay += max(-self.step, min(self.step, delay - self.delay))
+        pts = capture_t + self.delay
+        if self._last_pts is not None and pts < self._last_pts + self.step:
+            pts = self._last_pts + self.step
+        self._last_pts = pts
+        return pts
@@ -0,0 +1,222 @@
+"""
+音视频设备探测
+
+界面启动时需要知道哪些麦克风能打开、有哪些摄像头以及摄像头支持的分辨率。逐个打开设备
+很慢，这里在后台线程中探测并把结果逐条放入队列，由界面线程取出后填入下拉框：
+
+- 设备列表（PyAudio 设备信息、DirectShow 设备名）只做枚举，开销很小
+- 每个设备以 名称/索引/通道数等 组成的键缓存探测结果到 config/device_cache.json，
+  设备列表不变时直接使用缓存，只有新出现或发生变化的设备才会重新打开
+- 摄像头在线程池中并行探测，麦克风在一个线程中依次探测（PortAudio 打开流不保证线程安全）
+"""
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from util import get_logger, resource_path
+
+logger = get_logger()
+
+CACHE_VERSION = 1
+# 没有 DirectShow 设备名时按索引尝试的摄像头数量
+fallback_camera_count = 10
+camera_probe_workers = 4
+
+
+def device_cache_path():
+    return resource_path("config/device_cache.json")
+
+
+def _com_init():
+    """在线程中使用 DirectShow（pygrabber）前初始化 COM"""
+    try:
+        import comtypes
+        comtypes.CoInitialize()
+    except Exception:
+        pass
+
+
+def list_audio_devices(p):
+    """枚举 PyAudio 设备，返回 [(kind, index, name, key)]，kind 为 "input"/"output" """
+    devices = []
+    for i in range(p.get_device_count()):
+        dev = p.get_device_info_by_index(i)
+        for kind, channels in (("input", dev['maxInputChannels']), ("output", dev['maxOutputChannels'])):
+            if channels > 0:
+                key = f"{kind}:{i}:{dev['name']}:{dev.get('hostApi')}:{channels}:{dev.get('defaultSampleRate')}"
+                devices.append((kind, i, dev['name'], key))
+    return devices
+
+
+def list_cameras():
+    """枚举摄像头，返回 ([(index, name, key)], 是否有真实设备名)"""
+    try:
+        from pygrabber.dshow_graph import FilterGraph
+        names = FilterGraph().get_input_devices()
+        return [(i, name, f"camera:{i}:{name}") for i, name in enumerate(names)], True
+    except Exception as e:
+        logger.warning(f"Failed to get camera names, probing indices 0-{fallback_camera_count - 1}: {e}")
+        return [(i, f"摄像头 {i}", f"camera:{i}") for i in range(fallback_camera_count)], False
+
+
+def probe_audio_input(p, index):
+    # 在函数内导入，避免 mediaio 与本模块互相依赖
+    from mediaio import init_audio_mic
+    stream = init_audio_mic(index, p)
+    if stream is None:
+        return False
+    stream.close()
+    return True
+
+
+def probe_camera(index, directshow=True):
+    """打开摄像头读取一帧，成功时附带支持的分辨率（从大到小）和帧率"""
+    import cv2
+    cap = cv2.VideoCapture(index, cv2.CAP_DSHOW) if directshow else cv2.VideoCapture(index)
+    try:
+        if not cap.isOpened():
+            return {"ok": False}
+        ret, frame = cap.read()
+        if not ret or frame is None or frame.size == 0:
+            return {"ok": False}
+    finally:
+        cap.release()
+    info = {"ok": True, "formats": [], "fps": 30}
+    if directshow:
+        info.update(probe_camera_formats(index))
+    return info
+
+
+def probe_camera_formats(index):
+    """通过 DirectShow 读取摄像头支持的格式，返回 {"formats": ["WxH", ...], "fps": n}"""
+    try:
+        from pygrabber.dshow_graph import FilterGraph
+        graph = FilterGraph()
+        if index >= len(graph.get_input_devices()):
+            return {}
+        graph.add_video_input_device(index)
+        resolutions = set()
+        fps = 30
+        for fmt in graph.get_input_device().get_formats():
+            resolutions.add(f"{fmt.get('width', 0)}x{fmt.get('height', 0)}")
+            fps = fmt.get('max_framerate', 30)
+        formats = sorted(resolutions, key=lambda x: int(x.split('x')[0]) * int(x.split('x')[1]), reverse=True)
+        return {"formats": formats, "fps": int(fps)}
+    except Exception as e:
+        logger.error(f"Failed to get camera formats: {e}")
+        return {}
+
+
+class DeviceProber:
+    """
+    后台设备探测
+
+    start() 后结果逐条放入 results 队列：
+        ("input", index, name, ok)
+        ("output", index, name, True)
+        ("camera", index, name, info)   info 为 {"ok", "formats", "fps"}
+        ("done", None, None, elapsed_seconds)
+
+    Args:
+        p: PyAudio 实例
+        cache_path: 缓存文件，为 None 时使用 config/device_cache.json
+        probe_cameras: 是否探测摄像头（没有 OpenCV 时为 False）
+    """
+
+    def __init__(self, p, cache_path=None, probe_cameras=True):
+        self.p = p
+        self.cache_path = cache_path or device_cache_path()
+        self.probe_cameras = probe_cameras
+        self.results = queue.Queue()
+        self._cache = {}
+        self._probed = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable device cache {self.cache_path}: {e}")
+        return {"version": CACHE_VERSION, "fingerprint": None, "devices": {}}
+
+    def _save_cache(self, fingerprint, keys):
+        # 只保留当前存在的设备
+        data = {"version": CACHE_VERSION, "fingerprint": fingerprint,
+                "devices": {key: self._cache[key] for key in keys if key in self._cache}}
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to write device cache {self.cache_path}: {e}")
+
+    def start(self, force=False):
+        """开始后台探测；force 为 True 时忽略缓存重新打开所有设备"""
+        self._thread = threading.Thread(target=self._run, args=(force,), name="DeviceProber", daemon=True)
+        self._thread.start()
+        return self
+
+    def _cached(self, key, force):
+        with self._lock:
+            return None if force else self._cache.get(key)
+
+    def _store(self, key, info):
+        with self._lock:
+            self._cache[key] = info
+            self._probed += 1
+
+    def _run(self, force):
+        start = time.monotonic()
+        data = self._load_cache()
+        self._cache = dict(data["devices"])
+        self._probed = 0
+        audio_devices = list_audio_devices(self.p)
+        cameras, directshow = list_cameras() if self.probe_cameras else ([], False)
+        keys = [device[3] for device in audio_devices] + [camera[2] for camera in cameras]
+        fingerprint = hashlib.sha1("\n".join(keys).encode("utf-8")).hexdigest()
+        if fingerprint == data["fingerprint"] and not force:
+            logger.info("Device list unchanged, using cached capabilities")
+
+        executor = ThreadPoolExecutor(max_workers=camera_probe_workers, thread_name_prefix="CameraProbe")
+        futures = [executor.submit(self._probe_camera, index, name, key, directshow, force)
+                   for index, name, key in cameras]
+        for kind, index, name, key in audio_devices:
+            if kind == "output":
+                self.results.put(("output", index, name, True))
+                continue
+            info = self._cached(key, force)
+            if info is None:
+                info = {"ok": probe_audio_input(self.p, index)}
+                self._store(key, info)
+            self.results.put(("input", index, name, info["ok"]))
+        for future in futures:
+            future.result()
+        executor.shutdown()
+        self._save_cache(fingerprint, keys)
+        elapsed = time.monotonic() - start
+        logger.info(f"Device probing finished in {elapsed:.2f}s, {self._probed} devices opened, "
+                    f"{len(keys)} devices listed")
+        self.results.put(("done", None, None, elapsed))
+
+    def _probe_camera(self, index, name, key, directshow, force):
+        info = self._cached(key, force)
+        if info is None:
+            _com_init()
+            try:
+                info = probe_camera(index, directshow)
+            except Exception as e:
+                logger.error(f"Failed to probe camera {index}: {e}")
+                info = {"ok": False}
+            self._store(key, info)
+        self.results.put(("camera", index, name, info))
@@ -1,3 +1,8 @@
+import sys
 from funasr import AutoModel
 model = AutoModel(model="paraformer-zh-streaming", model_revision="v2.0.4", disable_update=True,device="cuda:0")
-print("模型加载成功")
\ No newline at end of file
+print("模型加载成功")
+if "--onnx" in sys.argv:
+    # 导出 int8 量化的 ONNX 模型（model_quant.onnx / decoder_quant.onnx），供 asrbackend 的 "onnx" 后端在 CPU 上使用
+    output_dir = model.export(type="onnx", quantize=True)
+    print(f"ONNX 模型已导出到 {output_dir}")
@@ -1,14 +1,25 @@
+import math
 import time
 import queue
+import threading
 from dataclasses import dataclass
-from funasr import AutoModel
-import pyaudio
-import cv2
-import pyvirtualcam
 import numpy as np
-from util import get_logger
-from util import resource_path 
+from util import get_logger, init_process_logging
 from util import AudioReplaceType
+from util import SensitiveWordWatcher
+from ringbuffer import AudioRingBuffer
+from scheduler import PresentationScheduler
+from resampler import StreamResampler
+from mediaio import make_audio_source, make_audio_sink, make_video_source, make_video_sink
+from delaycontrol import AdaptiveDelayController, VideoPtsSmoother
+from startgate import wait_for_start
+from mediaclock import SampleClock
+from mediaqueue import BoundedQueue
+from framecodec import CompressedDelayBuffer, make_frame_codec, codec_type
+from metrics import get_registry, start_metrics_reporter, histogram_quantile, RTF_BUCKETS
+from asr import StreamingRecognizer, InferenceWorker, result_text, warm_up
+from asrbackend import create_backend
+from vad import create_vad
 logger = get_logger()
  
 @dataclass
@@ -16,6 +27,34 @@ class MediaFrame:
     data: any
     target_t: float  # Presentation TimeStamp
     end_t: float
+    capture_t: float = 0.0  # 开始采集的时刻
+
+@dataclass
+class AudioCaptureConfig:
+    """
+    音频采集进程（process_capture_audio）的配置，界面和无界面入口共用
+
+    Args:
+        sensitive_matcher: 敏感词匹配器（见 matcher.py）
+        mute_type: 消音方式，AudioReplaceType 的值
+        device_index: 麦克风设备序号，为 None 时使用默认设备
+        source: 音频输入配置（见 mediaio.make_audio_source），为 None 时使用麦克风
+        asr_config: init_model 的参数，例如 {"model_dir": ..., "device": "cpu"}，"mode"/"vad" 可覆盖 asr_mode/vad_mode
+        sensitive_words_file: 监听修改的敏感词文件，为 None 时使用 config/sensitive_words.txt
+        adaptive: 是否自适应调整直播延迟，为 None 时使用 adaptive_delay
+        shared_delay: 音视频共享的直播延迟 multiprocessing.Value，只由一路音频调整
+        asr_client: 共享识别服务的客户端（asrserver.ASRClient），为 None 时在本进程加载模型
+    """
+    sensitive_matcher: any
+    mute_type: int
+    device_index: int = None
+    source: dict = None
+    asr_config: dict = None
+    sensitive_words_file: str = None
+    adaptive: bool = None
+    shared_delay: any = None
+    asr_client: any = None
+
 
 def now_sec() -> float:
     return time.monotonic()
@@ -24,335 +63,646 @@ is_running = True
 start_time = None  # Unified start time reference
 delay_t = 2.0
 delay_threshold = 0.15
+# 根据实测识别延迟在 [delay_min, delay_max] 内自动调整直播延迟，delay_t 为初始值
+adaptive_delay = True
+delay_min = 0.6
+# 延迟上限同时决定视频共享内存的大小：video_delay_codec 为 "raw" 时槽位需保存
+# 宽 × 高 × 3 × fps × (上限 + 0.5 s) 字节的原始帧，1080p60 下 3 s 约 1.3 GB、2 s 约 950 MB，720p30 下 3 s 约 300 MB。
+# 内存紧张时调低 delay_max，或改用压缩保存（video_delay_codec = "jpeg"）
+delay_max = 3.0
+# 在 p99 识别延迟之上保留的余量（秒）
+delay_margin = 0.25
+# "streaming": Paraformer 流式识别，块间保留 cache；"window": 每 1.2 s 窗口独立识别
+asr_mode = "streaming"
+# 流式识别的块长度（毫秒），需为 60 ms 的整数倍
+asr_chunk_ms = 600
+# 识别后端："funasr"、"onnx"（int8 量化）、"whisper"（faster-whisper int8），"auto" 按硬件选择
+asr_backend = "auto"
+# 识别前的语音活动检测："energy" 能量/过零率，"fsmn" FunASR fsmn-vad，"off" 每个窗口都识别
+vad_mode = "energy"
+# 跨块匹配时保留的上一段识别文本长度（字符）
+text_tail_len = 16
+# 采集线程与识别线程之间最多排队的窗口数，识别落后时由环形缓冲区继续缓存麦克风数据
+asr_queue_size = 4
+# 每处理多少个窗口输出一次各阶段队列深度和耗时（耗时分位数取自指标直方图，为启动以来的累计值）
+stage_stats_interval = 20
+# 视频帧在采集/发送进程间的传递方式："shm" 共享内存槽位，"queue" 直接经队列 pickle 传递
+video_transport = "shm"
+# 进程间队列的容量（见 mediaqueue.BoundedQueue）：音频窗口数、视频帧积压时长（秒）、敏感词事件数
+audio_queue_size = 64
+video_queue_seconds = 0.5
+record_queue_size = 256
+# 视频延迟期间发送进程中帧的保存格式（见 framecodec.py）："raw" 原始帧留在共享内存槽位中，槽位覆盖整个最大延迟；
+# "yuv420"、"jpeg" 压缩后保存，共享内存只需覆盖视频队列。也可以写成 {"type": "jpeg", "quality": 80, "workers": 4}
+video_delay_codec = "raw"
+# 压缩保存时的编解码线程数，以及提前于呈现时刻解码的时长（秒）
+video_codec_workers = 2
+video_decode_lead = 0.1
+# 共享内存槽位超过该大小（MB）时启动时告警
+video_ring_warn_mb = 1024
 
-def init_model():
-    # Initialize the speech recognition model like in main.py
-    logger.info("Initializing speech recognition model")
-    model_dir =resource_path("model") 
-    model = None
-    logger.info(f"Model directory: {model_dir}")
-    try:
-        # model = AutoModel(model="paraformer-zh-streaming", model_revision="v2.0.4", disable_update=True,device="cuda:0")
-        model = AutoModel(model=model_dir, model_revision="v2.0.4", disable_update=True,device="cuda:0",disable_pbar=False)
-    except Exception as e:
-        logger.error(f"Failed to initialize speech recognition model: {e}")
-   
-    logger.info("Speech recognition model initialized successfully")
-    return model
 
-def init_video_cam(camera_index,w,h,fps):
-    try:    
-        logger.info("Initializing video capture device")
-        cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
-        # 设置摄像头分辨率
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
-        cap.set(cv2.CAP_PROP_FPS, fps)
-
-        # 关键：设置像素格式为 YUY2（大多数 UVC 采集设备默认格式）
-        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('Y', 'U', 'Y', '2'))
-        logger.info("Video capture device initialized successfully with resolution 1280x720")
-        return cap
-    except Exception as e:
-        logger.error(f"Failed to initialize video capture: {e}")
-        return None
-       
-                
-def init_audio_mic(audio_input_device_index,p):
-    # Initialize audio input stream similar to main.py
-    logger.info("Initializing audio input stream")
-    INPUT_RATE = 16000
-    CHUNK = 960
-    CHANNELS = 1
-    input_idx = audio_input_device_index
-    try:
-        audio_stream_in = p.open(
-            format=pyaudio.paFloat32,
-            channels=CHANNELS,
-            rate=INPUT_RATE,
-            input=True,
-            input_device_index=input_idx,
-            frames_per_buffer=CHUNK
-        )
-        logger.info(f"Audio input stream initialized successfully with rate={INPUT_RATE}, chunk={CHUNK}")
-        return audio_stream_in
-    except Exception as e:
-        logger.error(f"Failed to initialize audio input stream: {e}")
+def make_audio_queue():
+    """采集到发送的音频队列：满时阻塞采集端并告警，不丢弃音频"""
+    return BoundedQueue(audio_queue_size, "block", "audio_queue")
+
+
+def make_video_queue(fps, paced=True):
+    """采集到发送的视频队列：实时运行时丢弃最旧的帧；不限速处理文件时阻塞，让采集端等待发送端"""
+    return BoundedQueue(max(2, math.ceil(fps * video_queue_seconds)), "drop_oldest" if paced else "block",
+                        "video_queue")
+
+
+def make_record_queue():
+    """敏感词事件队列：满时同一敏感词的事件合并计数"""
+    return BoundedQueue(record_queue_size, "coalesce", "record_queue", coalesce_key="word")
+
+
+def delay_upper_bound(adaptive=None):
+    """本次运行中直播延迟可能达到的上限：自适应时为 delay_max，固定延迟时为 delay_t"""
+    adaptive = adaptive_delay if adaptive is None else adaptive
+    return delay_max if adaptive else delay_t
+
+
+def video_pending_frames(fps, adaptive=None):
+    """视频发送端按 PTS 等待的帧数上限，与原始帧保存时的共享内存槽位数（framering.SharedFrameRing.for_video）一致"""
+    return math.ceil(fps * (delay_upper_bound(adaptive) + 0.5)) + 2
+
+
+def video_ring_seconds(delay_codec=None, adaptive=None):
+    """共享内存槽位需要覆盖的时长：原始帧保存时覆盖延迟上限，压缩保存时只需覆盖视频队列中待压缩的帧"""
+    delay_codec = video_delay_codec if delay_codec is None else delay_codec
+    return delay_upper_bound(adaptive) if codec_type(delay_codec) == "raw" else video_queue_seconds
+
+
+def log_frame_ring(frame_ring):
+    """记录共享内存槽位的大小，超过 video_ring_warn_mb 时告警"""
+    size_mb = frame_ring.slots * frame_ring.frame_bytes / 1e6
+    message = f"Shared frame ring: {frame_ring.slots} slots x {frame_ring.frame_bytes / 1e6:.1f} MB = {size_mb:.0f} MB"
+    if size_mb > video_ring_warn_mb:
+        logger.warning(f"{message}; lower delay_max or set video_delay_codec to \"jpeg\" to reduce memory")
+    else:
+        logger.info(message)
+
+
+def init_model(model_dir=None, device=None, factory=None, backend=None, chunk_size=None, **options):
+    # Initialize the speech recognition model like in main.py
+    # factory 用于基准测试等场景替换模型：返回带 generate 方法的对象，options 作为其参数
+    if factory is not None:
+        logger.info(f"Initializing speech recognition model with {factory.__name__}")
+        return factory(**options)
+    # backend 为 None 时使用 asr_backend；device 为 None 时有 CUDA 用 GPU，否则用 CPU（见 asrbackend.py）
+    backend = backend or asr_backend
+    # chunk_size 为 None 时按 asr_chunk_ms，与 StreamingRecognizer 送入的块长度一致
+    chunk_size = chunk_size or (0, asr_chunk_ms // 60, asr_chunk_ms // 120)
+    logger.info(f"Initializing speech recognition model, backend: {backend}")
+    model = create_backend(backend, model_dir=model_dir, device=device, chunk_size=chunk_size, **options)
+    if model is None:
+        logger.error("Failed to initialize speech recognition model")
         return None
-       
+    # 首次推理会触发 CUDA/ONNX 的图编译和显存分配，在开始处理前完成
+    warm_up(model, chunk_size=chunk_size)
+    return model
 
-def init_audio_output(p):
-    # Initialize audio output stream
-    logger.info("Initializing audio output stream")
-     
-    try:
-        # Find VB-Cable device like in main.py
-        output_idx = None
-        for i in range(p.get_device_count()):
-            dev = p.get_device_info_by_index(i)
-            # Look for output device with CABLE in name
-            if dev['maxOutputChannels'] > 0 and 'CABLE' in dev['name'].upper():
-                output_idx = i
-                logger.info(f"Found VB-Cable output device: {dev['name']} (index {i})")
-                break
-        # If no VB-Cable device found, use first available output device
-        if output_idx is None:
-            logger.warning("VB-Cable device not found, searching for alternative output device")
-            for i in range(p.get_device_count()):
-                dev = p.get_device_info_by_index(i)
-                if dev['maxOutputChannels'] > 0:
-                    output_idx = i
-                    logger.info(f"Using alternative output device: {dev['name']} (index {i})")
-                    break
-        if output_idx is None:
-            raise Exception("No output device found")
-        device_info = p.get_device_info_by_index(output_idx)
-        output_rate = int(device_info['defaultSampleRate'])
-        audio_stream_out = p.open(
-                format=pyaudio.paFloat32,
-                channels=1,
-                rate=output_rate,
-                output=True,
-                output_device_index=output_idx,
-                frames_per_buffer=1024
-            )
-        logger.info(f"Audio output stream initialized successfully with rate={output_rate}")
-        return audio_stream_out
-    except Exception as e:
-        logger.error(f"Failed to initialize audio output stream: {e}")
-        
-        
-def process_capture_video_frames(video_queue, start_time, stop_event, camera_index,width,height, fps):
+def process_capture_video_frames(video_queue, start_time, stop_event, camera_index,width,height, fps, frame_ring=None, shared_delay=None, metrics_queue=None, log_channel=None, source=None, media_clock=None):
+    init_process_logging(log_channel)
+    # OpenCV 只在视频进程中导入，音频进程和界面进程不加载
+    import cv2
     # Thread 1: Process video frames
     logger.info("Starting video capture thread")
     logger.info(f"Camera index: {camera_index}")
-    cap = init_video_cam(camera_index,width,height, fps)  # Get the video capture object
-    while time.time() < start_time :
-        time.sleep(0.01)
+    # source 为 None 时打开摄像头，否则按配置打开视频文件等输入（见 mediaio.make_video_source）
+    cap = make_video_source(source, camera_index, width, height, fps)  # Get the video capture object
+    realtime = getattr(cap, "realtime", True)
+    source_fps = getattr(cap, "fps", fps)
+    # 与音频采集、发送进程共用同一时钟模型（见 mediaclock.MediaClock）
+    clock = media_clock.now if media_clock is not None else now_sec
+    # 初始化完成后报告就绪，等待所有进程统一开始（start_time 为 StartGate 或时间戳）
+    start_time = wait_for_start(start_time, stop_event)
+    # 非实时输入按帧序号计算 PTS，起点为 start_time 对应的单调时钟时刻，与音频采集进程一致
+    clock_origin = now_sec() - (time.time() - start_time)
+    frame_index = 0
+    # 延迟变化逐帧平滑生效，PTS 保持递增
+    pts_smoother = VideoPtsSmoother(source_fps)
+    metrics_reporter = start_metrics_reporter(metrics_queue, "VideoCapture", stop_event)
+    registry = get_registry()
+    captured_frames = registry.counter("video_capture_frames_total")
+    capture_seconds = registry.histogram("video_capture_read_seconds")
     try:
         # while is_running:
         while not stop_event.is_set():
-            ret, frame = cap.read()
+            read_t = now_sec()
+            if frame_ring is None:
+                ret, frame = cap.read()
+            else:
+                # 直接解码到共享内存槽位中，队列里只传递 (slot, seq)
+                slot, seq, slot_frame = frame_ring.next_slot()
+                ret, frame = cap.read(slot_frame)
             if not ret:
-                logger.warning("Can't receive frame from camera")
+                if realtime:
+                    logger.warning("Can't receive frame from camera")
+                else:
+                    logger.info(f"Video source finished after {frame_index} frames")
                 break
             # Create MediaFrame with frame data and timestamp based on unified clock
-            timestamp =  now_sec() + delay_t
+            # 延迟由音频采集进程中的 AdaptiveDelayController 统一调整
+            if realtime:
+                timestamp = pts_smoother.pts(clock(), shared_delay.value if shared_delay is not None else delay_t)
+            else:
+                timestamp = clock_origin + frame_index / source_fps + delay_t
+            frame_index += 1
+            if frame_ring is not None:
+                if not np.shares_memory(frame, slot_frame):
+                    # 摄像头实际输出的尺寸与槽位不一致时，OpenCV 会另行分配
+                    if frame.shape == slot_frame.shape:
+                        slot_frame[...] = frame
+                    else:
+                        cv2.resize(frame, (width, height), dst=slot_frame)
+                frame_ring.commit(slot, seq)
+                frame = (slot, seq)
             video_queue.put((timestamp,frame))   # Priority based on timestamp
+            captured_frames.inc()
+            capture_seconds.observe(now_sec() - read_t)
     except Exception as e:
         logger.error(f"Error capturing video frames: {e}")
     finally:
         if cap.isOpened():  # Check if the video capture is open
             cap.release()
+        # 通知发送进程输入已结束
+        try:
+            video_queue.put(None, timeout=5.0)
+        except queue.Full:
+            logger.error("Video queue is full, failed to send end of stream")
+        if metrics_reporter is not None:
+            metrics_reporter.report()
         logger.info(f"Video capture thread stopped. ")
 
-def process_send_video_frames(video_queue, start_time, stop_event,width,height, fps):
+def process_send_video_frames(video_queue, start_time, stop_event,width,height, fps, frame_ring=None, metrics_queue=None, log_channel=None, sink=None, paced=True, media_clock=None, delay_codec=None):
+    init_process_logging(log_channel)
     # Thread 1: Process video frames
     logger.info("Starting video sending thread")
-    target_t = None
     frame_count = 0
-    while time.time() < start_time :
-        time.sleep(0.01)
+    # 初始化完成后报告就绪，等待所有进程统一开始（start_time 为 StartGate 或时间戳）
+    wait_for_start(start_time, stop_event)
+    metrics_reporter = start_metrics_reporter(metrics_queue, "VideoSender", stop_event)
+    registry = get_registry()
+    convert_seconds = registry.histogram("video_convert_seconds")
+    slot_overwrites = registry.counter("video_slot_overwrites_total")
+    # 音视频发送进程按同一时钟模型判断呈现时刻
+    # 堆中最多保留最大延迟内的帧，发送端卡住时积压留在有界的视频队列中按策略丢弃
+    clock = media_clock.now if media_clock is not None else now_sec
+    delay_codec = video_delay_codec if delay_codec is None else delay_codec
+    delay_buffer = None
+    if codec_type(delay_codec) == "raw":
+        scheduler = PresentationScheduler(video_queue, stop_event, delay_threshold, name="VideoSender", clock=clock,
+                                          metric_prefix="video_send", paced=paced,
+                                          max_pending=video_pending_frames(fps)).start()
+    else:
+        # 延迟期间的帧压缩保存，呈现前解码；返回的已是解码后的帧，不再经共享内存槽位读取
+        options = dict(delay_codec) if isinstance(delay_codec, dict) else {"type": delay_codec}
+        workers = options.pop("workers", video_codec_workers)
+        decode_lead = options.pop("decode_lead", video_decode_lead)
+        delay_buffer = scheduler = CompressedDelayBuffer(video_queue, stop_event, delay_threshold,
+                                                         make_frame_codec(options), frame_ring, workers, decode_lead,
+                                                         clock=clock, paced=paced,
+                                                         max_pending=video_pending_frames(fps)).start()
+        frame_ring = None
+        logger.info(f"Video delay buffer: {options}, {workers} codec threads, decoding {decode_lead * 1000:.0f}ms ahead")
     try:
-        with pyvirtualcam.Camera(width=width, height=height, fps=fps) as cam:
-            logger.info("Virtual camera initialized successfully")
-            while not stop_event.is_set():
+        # sink 为 None 时输出到虚拟摄像头：协商像素格式，后端支持 BGR 时采集帧可直接透传
+        video_sink = make_video_sink(sink, width, height, fps)
+        passthrough = None
+        try:
+            while True:
+                # 睡眠到下一帧的呈现时间，过期帧已由调度器丢弃
+                due = scheduler.next_due()
+                if due is None:
+                    break
                 try:
-                    # Get next frame from queue
-                    if target_t is None:
-                        target_t, media_frame = video_queue.get(timeout=0.01)
-                    current_time = now_sec()
-                    # Send frame if it's time to display it
-                    if current_time - delay_threshold <=  target_t <= current_time:
-                        # 调整帧大小以匹配虚拟摄像头分辨率
-                        frame = cv2.resize(media_frame, (cam.width, cam.height))
-                        # 将BGR格式转换为RGB格式（因为pyvirtualcam期望RGB格式）
-                        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                        # 将RGB格式的numpy数组发送到虚拟摄像头
-                        cam.send(frame_rgb)
-                        # Log the target_t when sending video frame
-                        frame_count += 1
-                        target_t = None  # Ready for next frame
-                        if frame_count % 30 == 0:  # Log every 30 frames sent
-                            logger.debug(f"Sent {frame_count} video frames so far")
-                    elif target_t <= current_time - delay_threshold:
-                        # Too early for this frame, put it back
-                        target_t = None
-                except queue.Empty:
-                    # No frames available, send last frame or blank frame
-                    time.sleep(0.001)
-                    continue
+                    target_t, media_frame = due
+                    if frame_ring is not None:
+                        slot, seq = media_frame
+                        media_frame = frame_ring.read(slot, seq)
+                        if media_frame is None:
+                            logger.warning(f"Video frame slot {slot} was overwritten before sending")
+                            slot_overwrites.inc()
+                            continue
+                    # 尺寸不同才缩放，格式不同才转换，结果写入预分配缓冲区
+                    convert_t = now_sec()
+                    frame = video_sink.convert(media_frame)
+                    if frame_ring is not None and frame is media_frame:
+                        # 透传时返回的是槽位本身，发送期间可能被采集进程覆盖；先复制出来再校验
+                        if passthrough is None or passthrough.shape != frame.shape:
+                            passthrough = np.empty_like(frame)
+                        np.copyto(passthrough, frame)
+                        frame = passthrough
+                    convert_seconds.observe(now_sec() - convert_t)
+                    if frame_ring is not None and not frame_ring.is_valid(slot, seq):
+                        logger.warning(f"Video frame slot {slot} was overwritten while converting")
+                        slot_overwrites.inc()
+                        continue
+                    video_sink.send(frame, target_t)
+                    frame_count += 1
+                    if frame_count % (fps * 10) == 0:  # Log every 10 seconds of frames
+                        logger.info(scheduler.stats_line())
                 except Exception as e:
                     logger.error(f"Error sending video frames: {e}")
-        logger.info(f"Video sending thread stopped. Total frames sent: {frame_count}")
+        finally:
+            video_sink.close()
+            if delay_buffer is not None:
+                delay_buffer.close()
+        logger.info(f"Video sending thread stopped. Total frames sent: {frame_count}, {scheduler.stats_line()}")
     except Exception as e:
         logger.error(f"Error initializing or using virtual camera: {e}")
     finally:
+        if metrics_reporter is not None:
+            metrics_reporter.report()
         logger.info("stop video sending thread")
 
 
-def output_audio_to_vb_cable(audio_data, vb_cable_stream, input_rate, output_rate):
+def write_audio_output(audio_data, audio_sink, pts, resampler=None, resample_seconds=None):
         """
-        将音频数据输出到VB-Cable输出流，并进行重采样
+        将音频数据输出到音频输出（VB-Cable 等），并进行重采样
         
         Args:
-            audio_data: 需要输出的音频数据
-            vb_cable_stream: VB-Cable输出流对象
-            input_rate: 输入音频的采样率
-            output_rate: 输出音频的采样率
+            audio_data: 需要输出的 float32 音频数据
+            audio_sink: 音频输出对象，见 mediaio.make_audio_sink
+            pts: 音频帧的呈现时间戳
+            resampler: 输入/输出采样率不同时使用的 StreamResampler，块间保持滤波器状态
+            resample_seconds: 记录重采样耗时的直方图
         """
         try:
             # 如果采样率不同，则进行重采样
-            if input_rate != output_rate:
-                # 将bytes转换为numpy array
-                audio_array = np.frombuffer(audio_data, dtype=np.float32)
-                # 计算重采样后的长度
-                new_length = int(len(audio_array) * output_rate / input_rate)
-                # 重采样 - 简单的线性插值方法
-                resampled_audio = np.interp(
-                    np.linspace(0, len(audio_array), new_length, endpoint=False),
-                    np.arange(len(audio_array)),
-                    audio_array
-                )
-                # 转换回bytes
-                audio_data = resampled_audio.astype(np.float32).tobytes()
+            if resampler is not None:
+                resample_t = now_sec()
+                audio_data = resampler.process(audio_data)
+                if resample_seconds is not None:
+                    resample_seconds.observe(now_sec() - resample_t)
             # 输出音频数据
-            vb_cable_stream.write(audio_data)
+            audio_sink.write(audio_data, pts)
         except Exception as e:
             logger.error(f"输出音频到输出设备失败: {e}")
-def process_send_audio_frames(audio_queue, start_time, stop_event):
+def process_send_audio_frames(audio_queue, start_time, stop_event, metrics_queue=None, log_channel=None, sink=None, paced=True, media_clock=None):
+    init_process_logging(log_channel)
     # Thread 2: Process audio frames
     logger.info("Starting audio processing and sending thread")
-    # Initialize audio output stream
-    p = pyaudio.PyAudio()
-    audio_stream_out = init_audio_output(p)
-    audio_frame = None
-    while time.time() < start_time :
-        time.sleep(0.01)
- 
+    clock = media_clock.now if media_clock is not None else now_sec
+    # Initialize audio output stream，sink 为 None 时输出到 VB-CABLE
+    audio_sink = make_audio_sink(sink, clock)
+    # 初始化完成后报告就绪，等待所有进程统一开始（start_time 为 StartGate 或时间戳）
+    wait_for_start(start_time, stop_event)
+    metrics_reporter = start_metrics_reporter(metrics_queue, "AudioSender", stop_event)
+    registry = get_registry()
+    resample_seconds = registry.histogram("audio_resample_seconds")
+    # 回调模式的输出自带按 PTS 播放的抖动缓冲区，提前 lead 秒把整块音频交给它，由回调按采样取出
+    jitter_buffer = getattr(audio_sink, "jitter_buffer", None)
+    output_counters = [registry.counter(name) for name in ("audio_output_underruns_total",
+                                                          "audio_output_underrun_samples_total",
+                                                          "audio_output_late_samples_total",
+                                                          "audio_output_corrections_total")]
+    output_gauges = [registry.gauge(name) for name in ("audio_output_buffer_seconds", "audio_output_pts_error_seconds")]
+    scheduler = PresentationScheduler(audio_queue, stop_event, delay_threshold, name="AudioSender", clock=clock,
+                                      metric_prefix="audio_send", paced=paced,
+                                      lead=getattr(audio_sink, "lead", 0.0), max_pending=audio_queue_size).start()
+    # (输入采样率, 输出采样率) -> 重采样器，跨音频块保留滤波器状态
+    resamplers = {}
     try:
-        while not stop_event.is_set():
+        while True:
+            # 睡眠到下一帧的呈现时间，过期帧已由调度器丢弃
+            due = scheduler.next_due()
+            if due is None:
+                break
             try:
-                if audio_frame is None:            
-                    # Get audio data from the audio queue
-                    _,audio_frame ,input_rate,output_rate= audio_queue.get(timeout=0.01)
-                current_time = now_sec() 
-                if current_time - delay_threshold <= audio_frame.target_t <= current_time  :
-                    # audio_stream_out.write(audio_frame.data.astype(np.float32).tobytes())
-                    output_audio_to_vb_cable(audio_frame.data.astype(np.float32).tobytes(),audio_stream_out, input_rate,output_rate )
-                    logger.debug(f"Sent audio frame with timestamp: {audio_frame.target_t}")
-                    audio_frame = None
-                elif audio_frame.target_t < current_time - delay_threshold:
-                    logger.debug(f"Audio frame 已过期,current_time:{current_time},audio_frame.target_t:{audio_frame.target_t},{(current_time - audio_frame.target_t):.3f}")
-                    audio_frame = None
-            
-            except queue.Empty:
-                continue
+                _, audio_frame, input_rate = due
+                output_rate = audio_sink.rate
+                resampler = None
+                if input_rate != output_rate:
+                    resampler = resamplers.get((input_rate, output_rate))
+                    if resampler is None:
+                        resampler = resamplers[(input_rate, output_rate)] = StreamResampler(input_rate, output_rate)
+                write_audio_output(audio_frame.data.astype(np.float32, copy=False), audio_sink, audio_frame.target_t,
+                                   resampler, resample_seconds)
+                logger.bind(sample=50).debug(f"Sent audio frame with timestamp: {audio_frame.target_t}")
+                if jitter_buffer is not None:
+                    for counter, value in zip(output_counters, (jitter_buffer.underruns, jitter_buffer.underrun_samples,
+                                                                jitter_buffer.late_samples, jitter_buffer.corrections)):
+                        counter.value = value
+                    output_gauges[0].set(jitter_buffer.available() / audio_sink.rate)
+                    output_gauges[1].set(jitter_buffer.error)
+                if scheduler.presented % 50 == 0:
+                    logger.info(scheduler.stats_line() + (
+                        f", output underruns={jitter_buffer.underruns} late_samples={jitter_buffer.late_samples} "
+                        f"corrections={jitter_buffer.corrections} error={jitter_buffer.error * 1000:.1f}ms"
+                        if jitter_buffer is not None else ""))
             except Exception as e:
                 logger.error(f"Error sending audio frames: {e}")
     finally:
-        logger.info("Stopping audio send thread")
-        p.terminate()
- 
+        logger.info(f"Stopping audio send thread, {scheduler.stats_line()}")
+        audio_sink.close()
+        if metrics_reporter is not None:
+            metrics_reporter.report()
+
+
+def mute_audio_frame(audio_frame, audio_fob_type, sample_rate):
+    """按消音选项把音频帧替换为静音或“哔”声，采样率与原始数据保持一致"""
+    num_samples = len(audio_frame.data)
+    if audio_fob_type == AudioReplaceType.SILENCE.value:
+        audio_frame.data = np.zeros(num_samples, dtype=np.float32)
+    else:
+        beep_freq = 800  # Beep frequency in Hz
+        t = np.arange(num_samples) / sample_rate
+        audio_frame.data = (np.sin(2 * np.pi * beep_freq * t) * 0.5).astype(np.float32)  # Generate sine wave with reduced volume
+    return audio_frame
 
 
-def process_capture_audio(audio_queue, record_queue,start_time, stop_event, audio_input_device_index , sensitive_set, audio_fob_type):
+def process_capture_audio(audio_queue, record_queue, start_time, stop_event, config, metrics_queue=None, log_channel=None):
+    """config 为 AudioCaptureConfig"""
+    init_process_logging(log_channel)
     # Initialize audio input stream
     logger.info("Starting audio capture thread")
     
     INPUT_RATE = 16000
-    CHUNK = 960
-    p = pyaudio.PyAudio()
-    audio_stream_in = init_audio_mic(audio_input_device_index, p)
-    model = init_model()
-    audio_stream_out = init_audio_output(p)
-    # Buffer to accumulate audio data
-    audio_buffer = np.array([], dtype=np.float32)
-    # Target duration in seconds
-    target_duration = 1.2
-    chunk_count = 0
-    while time.time() < start_time :
-        time.sleep(0.01)
-   
-    timestamp = None
+    sensitive_matcher, audio_fob_type = config.sensitive_matcher, config.mute_type
+    shared_delay, asr_client = config.shared_delay, config.asr_client
+    asr_config = dict(config.asr_config or {})
+    mode = asr_config.pop("mode", asr_mode)
+    vad_name = asr_config.pop("vad", vad_mode)
+    # 使用共享识别服务（asrserver.ASRService）时本进程不加载模型，只等待服务加载完成
+    model = init_model(**asr_config) if asr_client is None else None
+    if model is None and (asr_client is None or not asr_client.wait_ready(stop_event)):
+        # 没有可用的识别模型时不输出音频，避免未经过滤的声音直接播出；结束标记让发送进程退出
+        if not stop_event.is_set():
+            logger.error("ASR model is unavailable, audio capture exits without sending audio")
+        try:
+            audio_queue.put(None, timeout=5.0)
+        except queue.Full:
+            logger.error("Audio queue is full, failed to send end of stream")
+        return
+    if asr_client is not None:
+        # 丢弃上一次运行可能残留的流式 cache
+        asr_client.reset()
+    # source 为 None 时使用麦克风，否则按配置打开 WAV 文件等输入（见 mediaio.make_audio_source）
+    audio_source = make_audio_source(config.source, config.device_index)
+    realtime = audio_source.realtime
+    if mode == "streaming" and not getattr(model, "streaming", True):
+        logger.warning(f"ASR backend {model.name} does not support streaming, using window mode")
+        mode = "window"
+    streaming = mode == "streaming"
+    if streaming:
+        if asr_client is not None:
+            # 流式 cache 保存在服务进程中，块长度以服务端为准
+            recognizer = asr_client
+        else:
+            recognizer = StreamingRecognizer(model, chunk_size=(0, asr_chunk_ms // 60, asr_chunk_ms // 120),
+                                             sample_rate=INPUT_RATE)
+        window_samples = recognizer.chunk_samples
+        recognize = recognizer.feed
+    else:
+        # Target duration in seconds
+        target_duration = 1.2
+        window_samples = int(target_duration * INPUT_RATE)
+
+        def recognize(samples):
+            if asr_client is not None:
+                return asr_client.transcribe(samples)
+            res = model.generate(input=samples, is_final=is_running)
+            logger.bind(sample=10).debug(f"Recognized speech: {res}")
+            return result_text(res)
+    logger.info(f"ASR mode: {mode}, window: {window_samples / INPUT_RATE:.2f}s")
+    # 实时输入按累计采样数计算 PTS：采样时钟把采样序号映射到单调时钟并估计声卡频偏（见 mediaclock.py）
+    sample_clock = SampleClock(INPUT_RATE) if realtime else None
+    # 环形缓冲区可容纳 10 s 音频，推理偶尔变慢时不会丢失麦克风采样
+    audio_ring = AudioRingBuffer(INPUT_RATE * 10, clock=sample_clock)
+
+    # 后台监听敏感词文件，修改后增量更新匹配器
+    word_watcher = SensitiveWordWatcher(sensitive_matcher, config.sensitive_words_file)
+    word_watcher.start()
+
+    # 采集 -> 识别 -> 合并 三个阶段：采集线程只负责切窗口，识别在 InferenceWorker 中进行，
+    # 合并线程按 PTS 把识别结果与音频窗口对应起来，完成匹配、消音后送入发送队列
+    infer_queue = queue.Queue(maxsize=asr_queue_size)
+    verdict_queue = queue.Queue()
+    # 非语音窗口不识别，直接经合并线程按顺序发送；流式识别在语音结束时收尾当前句子
+    vad = create_vad(vad_name, INPUT_RATE)
+    inference_worker = InferenceWorker(recognize, infer_queue, verdict_queue,
+                                       finish=recognizer.finalize if streaming else None)
+    # 等待识别结果的音频窗口，以 PTS 为键
+    waiting_frames = {}
+    waiting_lock = threading.Lock()
+    registry = get_registry()
+    capture_to_queue = registry.histogram("audio_capture_to_queue_seconds")
+    queue_wait_seconds = registry.histogram("asr_queue_wait_seconds")
+    inference_seconds = registry.histogram("asr_inference_seconds")
+    join_seconds = registry.histogram("asr_join_seconds")
+    capture_to_verdict = registry.histogram("audio_capture_to_verdict_seconds")
+    # 阶段统计日志中输出的直方图
+    stage_histograms = {"queue_wait": queue_wait_seconds, "inference": inference_seconds, "join": join_seconds,
+                        "capture_to_verdict": capture_to_verdict}
+    windows_total = registry.counter("asr_windows_total")
+    skipped_windows = registry.counter("asr_windows_skipped_total")
+    skip_ratio = registry.gauge("asr_skip_ratio")
+    real_time_factor = registry.histogram("asr_real_time_factor", RTF_BUCKETS)
+    sensitive_hits = registry.counter("sensitive_hits_total")
+    recognition_failures = registry.counter("asr_failures_total")
+    delay_gauge = registry.gauge("broadcast_delay_seconds")
+    depth_gauges = {name: registry.gauge(name) for name in ("asr_infer_queue_depth", "asr_verdict_queue_depth",
+                                                             "audio_ring_fill_seconds")}
+    drop_counters = [registry.counter(name) for name in ("audio_input_overflow_samples_total",
+                                                        "audio_input_device_overflows_total",
+                                                        "audio_input_underruns_total")]
+    clock_drift = registry.gauge("audio_clock_drift_ppm")
+    clock_resyncs = registry.counter("audio_clock_resyncs_total")
+
+    # 非实时输入的处理速度与真实时间无关，保持固定延迟；adaptive 为 None 时使用 adaptive_delay
+    delay_controller = AdaptiveDelayController(shared_delay, initial=delay_t, min_delay=delay_min,
+                                               max_delay=delay_max, margin=delay_margin,
+                                               enabled=(adaptive_delay if config.adaptive is None else config.adaptive) and realtime)
+
+    def emit(audio_frame):
+        latency = now_sec() - audio_frame.capture_t
+        delay_controller.observe(latency)
+        capture_to_queue.observe(latency)
+        delay_gauge.set(delay_controller.delay)
+        audio_queue.put((audio_frame.target_t, audio_frame, INPUT_RATE))
+
+    def join_verdicts():
+        # 流式模式下保留上一块，等下一块识别后再发送，以便屏蔽跨块的敏感词
+        pending_frame = None
+        text_tail = ""
+        joined_count = 0
+
+        def check_text(text, audio_frame):
+            """匹配 上一段尾部 + 本段文本，命中时屏蔽本块，返回是否需要屏蔽上一块"""
+            nonlocal text_tail
+            joined = text_tail + text
+            hit_current = False
+            hit_previous = False
+            found_sensitive_words = []
+            for start, end, word in word_watcher.matcher.iter_matches(joined):
+                if end <= len(text_tail):
+                    continue  # 已在上一块中处理过
+                hit_current = True
+                hit_previous = hit_previous or start < len(text_tail)
+                if word not in found_sensitive_words:
+                    found_sensitive_words.append(word)
+            text_tail = joined[-text_tail_len:]
+            for word in found_sensitive_words:
+                logger.warning(f"Sensitive word detected: {word}")
+                logger.error(f"⚠️  Warning: Sensitive word detected: {word}")
+                record_queue.put({"word":word,"sentence":joined})
+                sensitive_hits.inc()
+            if hit_current:
+                mute_audio_frame(audio_frame, audio_fob_type, INPUT_RATE)
+                logger.info(f"Replaced audio due to sensitive words: {', '.join(found_sensitive_words)}, "
+                            f"timestamp: {audio_frame.target_t}")
+            return hit_previous
+
+        while True:
+            verdict = verdict_queue.get()
+            if verdict is None:
+                break
+            pts, recognized_text, queued_t, infer_start_t, infer_end_t, skipped = verdict
+            with waiting_lock:
+                audio_frame = waiting_frames.pop(pts)
+            now_t = now_sec()
+            queue_wait_seconds.observe(infer_start_t - queued_t)
+            join_seconds.observe(now_t - infer_end_t)
+            capture_to_verdict.observe(now_t - audio_frame.capture_t)
+            windows_total.inc()
+            depth_gauges["asr_infer_queue_depth"].set(infer_queue.qsize())
+            depth_gauges["asr_verdict_queue_depth"].set(verdict_queue.qsize())
+            depth_gauges["audio_ring_fill_seconds"].set(audio_ring.available() / INPUT_RATE)
+            if recognized_text is None:
+                # 识别失败或超时：无法确认是否含敏感词，按命中处理，本块和等待跨块匹配的上一块都消音
+                recognition_failures.inc()
+                logger.bind(sample=10).warning(f"No ASR result for window at {pts:.3f}, muting it")
+                recognized_text = ""
+                if pending_frame is not None:
+                    mute_audio_frame(pending_frame, audio_fob_type, INPUT_RATE)
+                if not skipped:
+                    mute_audio_frame(audio_frame, audio_fob_type, INPUT_RATE)
+            if skipped:
+                # 非语音窗口：流式识别收尾的文字属于上一块，随上一块一起发送
+                skipped_windows.inc()
+                skip_ratio.set(skipped_windows.value / windows_total.value)
+                if pending_frame is not None:
+                    check_text(recognized_text, pending_frame)
+                    emit(pending_frame)
+                    pending_frame = None
+                emit(audio_frame)
+                continue
+            inference_seconds.observe(infer_end_t - infer_start_t)
+            real_time_factor.observe((infer_end_t - infer_start_t) / (window_samples / INPUT_RATE))
+            skip_ratio.set(skipped_windows.value / windows_total.value)
+            # Check for sensitive words
+            hit_previous = check_text(recognized_text, audio_frame)
+            if not streaming:
+                emit(audio_frame)
+            else:
+                if pending_frame is not None:
+                    if hit_previous:
+                        mute_audio_frame(pending_frame, audio_fob_type, INPUT_RATE)
+                    emit(pending_frame)
+                pending_frame = audio_frame
+            joined_count += 1
+            if joined_count % stage_stats_interval == 0:
+                logger.info("音频阶段统计: " + ", ".join(
+                    f"{name} p50={histogram_quantile(h.snapshot(), 0.5) * 1000:.0f}ms "
+                    f"p99={histogram_quantile(h.snapshot(), 0.99) * 1000:.0f}ms"
+                    for name, h in stage_histograms.items())
+                    + f", skipped={skipped_windows.value}/{windows_total.value}"
+                    + (f", clock drift={sample_clock.drift_ppm:.1f}ppm resyncs={sample_clock.resyncs}"
+                       if sample_clock is not None else "")
+                    + f", delay={delay_controller.delay:.3f}s, infer_queue={infer_queue.qsize()}, verdict_queue={verdict_queue.qsize()}, "
+                      f"ring={audio_ring.available() / INPUT_RATE:.2f}s")
+
+        if streaming and pending_frame is not None:
+            # 流结束：收尾解码器并发送最后一块
+            try:
+                check_text(recognizer.finalize(), pending_frame)
+            except Exception as e:
+                logger.error(f"Speech recognition failed at end of stream, muting the last window: {e}")
+                recognition_failures.inc()
+                mute_audio_frame(pending_frame, audio_fob_type, INPUT_RATE)
+            emit(pending_frame)
+
+    def join_then_finish():
+        try:
+            join_verdicts()
+        finally:
+            # 最后一块发出后才通知发送进程输入已结束，结束标记不会越过仍在等待识别结果的窗口
+            try:
+                audio_queue.put(None, timeout=5.0)
+            except queue.Full:
+                logger.error("Audio queue is full, failed to send end of stream")
+
+    verdict_joiner = threading.Thread(target=join_then_finish, name="VerdictJoiner", daemon=True)
+
+    # 初始化完成后报告就绪，等待所有进程统一开始（start_time 为 StartGate 或时间戳）
+    start_time = wait_for_start(start_time, stop_event)
+    # 非实时输入按采样序号计算 PTS，起点为 start_time 对应的单调时钟时刻，与视频采集进程一致
+    clock_origin = now_sec() - (time.time() - start_time)
+    metrics_reporter = start_metrics_reporter(metrics_queue, "AudioCapture", stop_event)
+    inference_worker.start()
+    verdict_joiner.start()
+    audio_source.start(audio_ring)
+    # 预分配的识别窗口，每个窗口从环形缓冲区复制一次
+    audio_buffer = np.empty(window_samples, dtype=np.float32)
+    reported_drops = (0, 0, 0)
     try:
         # while is_running:
         while not stop_event.is_set():
-             
-            if timestamp is None:
-                timestamp = now_sec()
-            # Read audio chunk
-            try:
-                data = audio_stream_in.read(CHUNK, exception_on_overflow=False)
-            except Exception as e:
-                logger.error(f"Audio read error: {e}")
-                break
-            audio_data = np.frombuffer(data, dtype=np.float32)
-            chunk_count += 1
-            # Accumulate audio data in buffer
-            audio_buffer = np.concatenate([audio_buffer, audio_data])
-            
-            # Check if we have enough data (1.2 seconds)
-            if len(audio_buffer) >= int(target_duration * INPUT_RATE):
-                # Create MediaFrame with accumulated audio data and timestamp
-                now_t = now_sec()
-                logger.info(f"音频采集结束，结束时间：{now_t}，采集时间长度：{(now_t - timestamp):.3f}")
-
-                duration = len(audio_buffer) / INPUT_RATE
-                audio_frame = MediaFrame(audio_buffer.copy(), timestamp + delay_t, duration)
-                res = model.generate(input=audio_buffer, is_final=is_running)
-                logger.debug(f"Recognized speech: {res}")
-                logger.info(f"音频推理完毕，推理时长{now_sec() - now_t}")
-                # Check for sensitive words
-                found_sensitive_words = []
-                recognized_text = None
-                if isinstance(res, list) and len(res) > 0 and 'text' in res[0]:
-                    recognized_text = res[0]['text'].replace(' ', '')
-                    for word in sensitive_set:
-                        if word in recognized_text:
-                            found_sensitive_words.append(word)
-                            logger.warning(f"Sensitive word detected: {word}")
-                            logger.error(f"⚠️  Warning: Sensitive word detected: {word}")
-                            break
-                             
-                if found_sensitive_words:
-                    output_rate = audio_stream_out._rate
-                    for item in found_sensitive_words:
-                        record_queue.put({"word":item,"sentence":recognized_text})
-                     
-                    if audio_fob_type == AudioReplaceType.SILENCE.value:
-                        # Use silence instead of beep
-                        num_samples = int(duration * output_rate)
-                        silence_signal = np.zeros(num_samples, dtype=np.float32)
-                        audio_frame.data = silence_signal
-                        logger.info(f"Replaced audio with silence due to sensitive words: {', '.join(found_sensitive_words)}")
-                        logger.debug(f"Sent silence audio frame with timestamp: {audio_frame.target_t}")
-                        audio_queue.put((timestamp + delay_t, audio_frame, INPUT_RATE, audio_stream_out._rate))
-                    else:  
-                        # Generate beep signal
-                        num_samples = int(duration * output_rate)
-                        beep_freq = 800  # Beep frequency in Hz
-                        t = np.linspace(0, duration, num_samples, False)
-                        audio_frame.data = np.sin(2 * np.pi * beep_freq * t) * 0.5  # Generate sine wave with reduced volume
-                       
-                        logger.info(f"Replaced audio with beep due to sensitive words: {', '.join(found_sensitive_words)}")
-                        logger.debug(f"Sent beep audio frame with timestamp: {audio_frame.target_t}")
-                        audio_queue.put((timestamp + delay_t, audio_frame, output_rate, output_rate))
-                else:
-                    audio_queue.put((timestamp + delay_t, audio_frame, INPUT_RATE, audio_stream_out._rate))
-                now_t = now_sec()
-                logger.info(f"音频处理完毕，发送时间:{now_t}")
-                timestamp = None
-                # Reset buffer
-                audio_buffer = np.array([], dtype=np.float32)
-                
+            if not audio_ring.read_into(audio_buffer, timeout=1.0):
+                if not audio_source.is_active():
+                    if realtime:
+                        logger.error("Audio input stream is no longer active")
+                    else:
+                        logger.info(f"Audio source finished after {audio_ring.samples_read / INPUT_RATE:.1f}s")
+                    break
+                logger.warning(f"Audio input underrun, total underruns: {audio_ring.underruns}")
+                continue
+            drops = (audio_ring.overflows, audio_ring.input_overflows, audio_ring.underruns)
+            if drops != reported_drops:
+                logger.warning(f"Audio input drops: ring overflow samples={drops[0]}, "
+                               f"device overflows={drops[1]}, underruns={drops[2]}")
+                reported_drops = drops
+                for counter, value in zip(drop_counters, drops):
+                    counter.value = value
+            # 以窗口第一个采样的时刻作为窗口起始时间：实时输入由采样时钟换算，不受本线程停顿和回调抖动影响
+            window_start = audio_ring.samples_read - window_samples
+            if realtime:
+                timestamp = sample_clock.time_at(window_start)
+                clock_drift.set(sample_clock.drift_ppm)
+                clock_resyncs.value = sample_clock.resyncs
+            else:
+                timestamp = clock_origin + window_start / INPUT_RATE
+
+            # Create MediaFrame with accumulated audio data and timestamp
+            window = audio_buffer.copy()
+            # 延迟需要调整时在窗口开头裁剪或补充静音，识别仍使用原始窗口
+            frame_data, frame_delay = delay_controller.adjust_window(window, INPUT_RATE)
+            duration = len(frame_data) / INPUT_RATE
+            # 非实时输入的 capture_t 取窗口可读的时刻，延迟统计只反映处理耗时
+            audio_frame = MediaFrame(frame_data, timestamp + frame_delay, duration, timestamp if realtime else now_sec())
+            with waiting_lock:
+                waiting_frames[audio_frame.target_t] = audio_frame
+            if realtime and infer_queue.full():
+                logger.warning(f"ASR is falling behind, {infer_queue.qsize()} windows waiting for inference")
+            speech = vad is None or vad.is_speech(window)
+            infer_queue.put((audio_frame.target_t, window if speech else None, now_sec()))
     except Exception as e:
         logger.error(f"Error capturing audio frames: {e}")
         logger.exception(e)
     finally:
         logger.info("Stopping audio capture thread")
-        audio_stream_in.stop_stream()
-        audio_stream_in.close()
-        p.terminate()
-
- 
\ No newline at end of file
+        audio_source.close()
+        infer_queue.put(None)
+        # 等合并线程发送完所有窗口和结束标记；停止时发送进程自行退出，不再等待
+        while verdict_joiner.is_alive() and not stop_event.is_set():
+            verdict_joiner.join(timeout=0.1)
+        undelivered = record_queue.flush() if isinstance(record_queue, BoundedQueue) else 0
+        if undelivered:
+            logger.warning(f"{undelivered} coalesced sensitive word events were not delivered")
+        word_watcher.stop()
+        if metrics_reporter is not None:
+            metrics_reporter.report()
@@ -0,0 +1,264 @@
+"""
+视频延迟缓冲区的帧压缩
+
+直播延迟期间发送进程要保留 delay 秒的帧：1080p60 的原始 BGR 帧每秒约 373 MB，2 秒延迟约 750 MB，
+并随延迟线性增长。CompressedDelayBuffer 在帧进入发送进程时交给线程池压缩，按 PTS 排序的堆中只保存
+压缩后的数据，到呈现时刻前 decode_lead 秒再解码，用 CPU 换内存：
+
+- "raw": 不压缩（仅用于基准对比，流程中 "raw" 表示沿用共享内存槽位保存原始帧）
+- "yuv420": 转为 I420（色度 2x2 下采样），约为原始大小的 1/2，几乎无损，宽高须为偶数
+- "jpeg": 有损，大小取决于画面和 quality；安装了 PyTurboJPEG 时直接调用 libjpeg-turbo，否则用 OpenCV
+
+OpenCV 的颜色转换和 JPEG 编解码会释放 GIL，线程池可以用满多个核。各格式在目标分辨率下的
+内存和 CPU 开销见 benchmarks/bench_framecodec.py。
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from util import get_logger
+from scheduler import PresentationScheduler
+from metrics import get_registry
+
+logger = get_logger()
+
+CODECS = ("raw", "yuv420", "jpeg")
+
+
+def codec_type(spec):
+    """spec 的格式名，spec 为 None 时视为 "raw" """
+    if isinstance(spec, dict):
+        return spec.get("type", "raw")
+    return spec or "raw"
+
+
+def frame_nbytes(data):
+    return memoryview(data).nbytes
+
+
+class RawCodec:
+    name = "raw"
+
+    def encode(self, frame):
+        return frame.copy()
+
+    def decode(self, data):
+        return data
+
+
+class YUV420Codec:
+    """BGR 与 I420 互转，I420 为 (height * 3 / 2, width) 的单通道数组"""
+    name = "yuv420"
+
+    def __init__(self):
+        import cv2
+        self._cv2 = cv2
+
+    def encode(self, frame):
+        return self._cv2.cvtColor(frame, self._cv2.COLOR_BGR2YUV_I420)
+
+    def decode(self, data):
+        return self._cv2.cvtColor(data, self._cv2.COLOR_YUV2BGR_I420)
+
+
+class JPEGCodec:
+    """
+    Args:
+        quality: JPEG 质量（1-100）
+        backend: "auto" 有 PyTurboJPEG 时使用，否则 "opencv"
+    """
+    name = "jpeg"
+
+    def __init__(self, quality=85, backend="auto"):
+        import cv2
+        self._cv2 = cv2
+        self.quality = int(quality)
+        self._turbo = None
+        if backend in ("auto", "turbojpeg"):
+            try:
+                from turbojpeg import TurboJPEG
+                self._turbo = TurboJPEG()
+            except (ImportError, RuntimeError, OSError) as e:
+                if backend == "turbojpeg":
+                    raise
+                logger.debug(f"PyTurboJPEG unavailable, using OpenCV for JPEG: {e}")
+        self.backend = "turbojpeg" if self._turbo is not None else "opencv"
+
+    def encode(self, frame):
+        if self._turbo is not None:
+            return self._turbo.encode(frame, quality=self.quality)
+        ok, data = self._cv2.imencode(".jpg", frame, [self._cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        return data
+
+    def decode(self, data):
+        if self._turbo is not None:
+            return self._turbo.decode(data)
+        return self._cv2.imdecode(data, self._cv2.IMREAD_COLOR)
+
+
+def make_frame_codec(spec):
+    """spec 为格式名或 {"type": "jpeg", "quality": 80}，格式见 CODECS"""
+    options = dict(spec) if isinstance(spec, dict) else {"type": codec_type(spec)}
+    kind = options.pop("type", "raw")
+    if kind == "raw":
+        return RawCodec()
+    if kind == "yuv420":
+        return YUV420Codec()
+    if kind == "jpeg":
+        return JPEGCodec(**options)
+    raise ValueError(f"Unknown video delay codec: {kind}")
+
+
+class CompressedDelayBuffer:
+    """
+    压缩保存延迟期间的视频帧，接口与 scheduler.PresentationScheduler 相同（start、next_due、stats_line）
+
+    1. 后台线程从视频队列取出帧后提交线程池压缩，帧经共享内存槽位传递时，压缩完成后槽位即可复用；
+       压缩结果按 PTS 保存在堆中，堆满时积压留在视频队列中
+    2. 预解码线程在呈现时刻前 decode_lead 秒取出压缩帧，提交线程池解码
+    3. 另一个 PresentationScheduler 按 PTS 返回解码后的帧；两个阶段都按 delay_threshold 丢弃过期帧，
+       过期的压缩帧不再解码
+
+    统计:
+        stored_bytes: 堆中压缩帧的总字节数
+        encode_failures: 压缩前槽位已被覆盖或压缩失败的帧数
+        late_decodes: 到呈现时刻仍未解码完成的帧数
+
+    Args:
+        source_queue: 视频队列，元素为 (pts, 帧)，或帧经共享内存传递时的 (pts, (slot, seq))
+        stop_event, delay_threshold, clock, paced, max_pending: 同 PresentationScheduler
+        codec: 见 make_frame_codec
+        frame_ring: 帧经共享内存槽位传递时的 framering.SharedFrameRing
+        workers: 编解码线程数
+        decode_lead: 提前于呈现时刻解码的时长（秒）
+    """
+
+    def __init__(self, source_queue, stop_event, delay_threshold, codec, frame_ring=None, workers=2,
+                 decode_lead=0.1, clock=time.monotonic, paced=True, max_pending=None):
+        self.source_queue = source_queue
+        self.stop_event = stop_event
+        self.codec = codec
+        self.frame_ring = frame_ring
+        self.decode_lead = decode_lead
+        self.stored_bytes = 0
+        self.encode_failures = 0
+        self.late_decodes = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="VideoCodec")
+        # 按真实时间运行时解码帧数由提前量限制；不限速时按线程数限制，避免一次解码整个堆
+        backlog = 0 if paced else 2 * workers
+        self._decoded = queue.Queue(backlog)
+        registry = get_registry()
+        self._encode_seconds = registry.histogram("video_encode_seconds")
+        self._decode_seconds = registry.histogram("video_decode_seconds")
+        self._stored_gauge = registry.gauge("video_delay_buffer_bytes")
+        self._slot_overwrites = registry.counter("video_slot_overwrites_total")
+        # 解码时刻不需要精确，存储阶段不忙等
+        self._store = PresentationScheduler(self, stop_event, delay_threshold, name="VideoDelay", spin_margin=0.0,
+                                            clock=clock, metric_prefix="video_delay", paced=paced, lead=decode_lead,
+                                            max_pending=max_pending, on_drop=self._release)
+        self._present = PresentationScheduler(self._decoded, stop_event, delay_threshold, name="VideoSender",
+                                              clock=clock, metric_prefix="video_send", paced=paced,
+                                              max_pending=backlog or None)
+        self._decoder = threading.Thread(target=self._decode_ahead, name="VideoDelay-decoder", daemon=True)
+
+    def start(self):
+        self._store.start()
+        self._present.start()
+        self._decoder.start()
+        return self
+
+    def get(self, timeout=None):
+        """供存储阶段的后台线程调用：取出一帧并提交压缩，堆中保存 (pts, future)"""
+        item = self.source_queue.get(timeout=timeout)
+        if item is None:
+            return None
+        pts, frame = item
+        return pts, self._pool.submit(self._encode, frame)
+
+    def _encode(self, frame):
+        start = time.perf_counter()
+        if self.frame_ring is not None:
+            slot, seq = frame
+            view = self.frame_ring.read(slot, seq)
+            data = self.codec.encode(view) if view is not None else None
+            if data is None or not self.frame_ring.is_valid(slot, seq):
+                logger.warning(f"Video frame slot {slot} was overwritten before compressing")
+                self._slot_overwrites.inc()
+                with self._lock:
+                    self.encode_failures += 1
+                return None
+        else:
+            data = self.codec.encode(frame)
+        self._encode_seconds.observe(time.perf_counter() - start)
+        with self._lock:
+            self.stored_bytes += frame_nbytes(data)
+            self._stored_gauge.set(self.stored_bytes)
+        return data
+
+    def _release(self, item):
+        """压缩帧离开堆（解码或过期丢弃）时扣除其大小；压缩尚未完成时在完成后扣除"""
+        item[1].add_done_callback(self._release_done)
+
+    def _release_done(self, future):
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return
+        with self._lock:
+            self.stored_bytes -= frame_nbytes(future.result())
+            self._stored_gauge.set(self.stored_bytes)
+
+    def _decode(self, data):
+        start = time.perf_counter()
+        frame = self.codec.decode(data)
+        self._decode_seconds.observe(time.perf_counter() - start)
+        return frame
+
+    def _decode_ahead(self):
+        while True:
+            due = self._store.next_due()
+            if due is None:
+                break
+            pts, encoded = due
+            self._release(due)
+            try:
+                data = encoded.result()
+            except Exception as e:
+                logger.error(f"Error compressing video frame: {e}")
+                with self._lock:
+                    self.encode_failures += 1
+                continue
+            if data is not None:
+                self._put((pts, self._pool.submit(self._decode, data)))
+        self._put(None)
+
+    def _put(self, item):
+        while not self.stop_event.is_set():
+            try:
+                self._decoded.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def next_due(self):
+        """阻塞到下一帧的呈现时间，返回 (pts, 解码后的帧)；停止或流结束后返回 None"""
+        while True:
+            due = self._present.next_due()
+            if due is None:
+                return None
+            pts, decoded = due
+            if self._present.paced and not decoded.done():
+                self.late_decodes += 1
+            try:
+                return pts, decoded.result()
+            except Exception as e:
+                logger.error(f"Error decoding video frame: {e}")
+
+    def close(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats_line(self):
+        return (f"{self._present.stats_line()}, delay buffer: {self._store.pending()} frames "
+                f"{self.stored_bytes / 1e6:.1f}MB ({self.codec.name}), late_drops before decode="
+                f"{self._store.late_drops}, late_decodes={self.late_decodes}, encode_failures={self.encode_failures}")
@@ -0,0 +1,105 @@
+import math
+import os
+import sys
+from multiprocessing import shared_memory
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    基于 multiprocessing.shared_memory 的视频帧环形槽位
+
+    采集进程把帧直接写入共享内存中的槽位，只通过队列传递 (slot, seq) 元数据，
+    发送进程按槽位取出同一块内存的视图，避免每帧 pickle 和管道复制。
+    每个槽位记录写入序号，读取方据此判断槽位是否已被新帧覆盖。
+
+    对象可以直接作为 Process 参数传递，子进程中会按名称重新映射同一块共享内存。
+
+    Args:
+        slots: 槽位数量
+        shape: 单帧形状，例如 (height, width, 3)
+        dtype: 帧数据类型
+        name: 共享内存名称，为 None 时新建
+    """
+
+    def __init__(self, slots, shape, dtype=np.uint8, name=None):
+        self.slots = int(slots)
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        header_bytes = self.slots * 8
+        self._owner = name is None
+        if self._owner:
+            self._shm = shared_memory.SharedMemory(create=True, size=header_bytes + self.slots * self.frame_bytes)
+        else:
+            self._shm = _attach_shared_memory(name)
+        self._seqs = np.ndarray((self.slots,), dtype=np.int64, buffer=self._shm.buf)
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf,
+                                  offset=header_bytes)
+        if self._owner:
+            self._seqs[:] = -1
+        self._next_seq = 0
+
+    @classmethod
+    def for_video(cls, width, height, fps, delay, channels=3, margin=0.5):
+        """按 宽 × 高 × fps × (延迟 + 余量) 计算槽位数量"""
+        slots = math.ceil(fps * (delay + margin)) + 2
+        return cls(slots, (height, width, channels))
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __getstate__(self):
+        return {"slots": self.slots, "shape": self.shape, "dtype": self.dtype.str, "name": self.name}
+
+    def __setstate__(self, state):
+        self.__init__(state["slots"], state["shape"], state["dtype"], state["name"])
+
+    def next_slot(self):
+        """返回下一个可写槽位 (slot, seq, view)，写完后调用 commit(slot, seq)"""
+        seq = self._next_seq
+        slot = seq % self.slots
+        # 先标记为写入中，读取方看到不一致的序号会丢弃该帧
+        self._seqs[slot] = -1
+        return slot, seq, self._frames[slot]
+
+    def commit(self, slot, seq):
+        self._seqs[slot] = seq
+        self._next_seq = seq + 1
+
+    def write(self, frame):
+        """把帧复制到下一个槽位，返回 (slot, seq)"""
+        slot, seq, view = self.next_slot()
+        view[...] = frame
+        self.commit(slot, seq)
+        return slot, seq
+
+    def read(self, slot, seq):
+        """返回槽位中帧的视图；槽位已被覆盖时返回 None"""
+        if self._seqs[slot] != seq:
+            return None
+        return self._frames[slot]
+
+    def is_valid(self, slot, seq):
+        """使用完视图后再次确认，判断期间是否被写入方覆盖"""
+        return self._seqs[slot] == seq
+
+    def close(self):
+        # 释放 numpy 视图后才能关闭共享内存
+        self._seqs = None
+        self._frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+def _attach_shared_memory(name):
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name == "posix":
+        # POSIX 下附加方也会被 resource_tracker 登记，进程退出时会误删创建方的共享内存
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
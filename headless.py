@@ -0,0 +1,322 @@
+"""
+无界面运行入口
+
+按配置文件搭建与界面相同的 采集 -> 识别 -> 过滤 -> 发送 进程，输入输出可以换成
+WAV/视频文件、内存和空输出，用于在没有音视频硬件的服务器上做性能分析和压测：
+
+    python headless.py config/headless.example.json
+    python headless.py config/headless.example.json --mode fast --report report.json
+
+mode 为 "paced" 时文件输入按真实时间读取、发送端按 PTS 等待，与直播时的行为一致；
+为 "fast" 时文件以识别能跟上的最快速度读取，发送端不再等待，用于测量吞吐。
+"""
+import argparse
+import json
+import queue
+import time
+from multiprocessing import Process, Queue, Event, Value
+import numpy as np
+from util import get_logger, get_log_channel, load_sensitive_words, AudioReplaceType, MatchMode
+from filterprocess import (
+    process_capture_audio,
+    AudioCaptureConfig,
+    process_send_audio_frames,
+    process_capture_video_frames,
+    process_send_video_frames,
+    make_audio_queue,
+    make_video_queue,
+    make_record_queue,
+    video_ring_seconds,
+    log_frame_ring,
+    delay_t,
+    delay_max,
+)
+from framering import SharedFrameRing
+from startgate import StartGate
+from mediaclock import MediaClock
+from metrics import MetricsAggregator
+from asrserver import ASRService
+import filterprocess
+
+logger = get_logger()
+
+DEFAULT_CONFIG = {
+    # "paced" 按真实时间运行，"fast" 尽快处理文件输入
+    "mode": "paced",
+    # 最长运行时间（秒），为 None 时运行到输入结束；麦克风/摄像头输入必须设置
+    "duration": None,
+    # 与界面一致，各进程加载模型、打开设备后报告就绪，全部就绪后同时开始；超过该时间（秒）不再等待
+    "start_timeout": 60.0,
+    "match_mode": "exact",
+    # 敏感词文件，为 None 时使用 config/sensitive_words.txt
+    "sensitive_words": None,
+    "mute": "silence",
+    # init_model 的参数，例如 {"backend": "onnx", "model_dir": "model", "device": "cpu"}，见 asrbackend.py
+    "asr": {},
+    # 是否根据识别延迟自动调整直播延迟，为 None 时使用 filterprocess.adaptive_delay
+    "adaptive_delay": None,
+    # 同时运行的音频流数量，每路使用相同的输入配置和各自的输出
+    "channels": 1,
+    # 是否由共享的识别服务进程（asrserver.ASRService）为所有流识别，为 None 时多路才启用
+    "asr_server": None,
+    "audio": {
+        "source": {"type": "microphone", "device_index": None},
+        "sink": {"type": "null"},
+    },
+    # 为 None 时不启动视频进程
+    "video": None,
+    # 指标 HTTP 端口和 JSONL 快照文件，为 0/"" 时不启用
+    "metrics_port": 0,
+    "metrics_file": "",
+}
+
+DEFAULT_VIDEO_CONFIG = {
+    "source": {"type": "camera", "camera_index": 0},
+    "sink": {"type": "null"},
+    "width": 640,
+    "height": 480,
+    "fps": 30,
+    # "shm" 共享内存槽位，"queue" 经队列传递；fast 模式下采集可能远快于发送，总是使用 queue
+    "transport": "shm",
+    # 延迟期间帧的保存格式，例如 "jpeg" 或 {"type": "jpeg", "quality": 80, "workers": 4}，
+    # 为 None 时使用 filterprocess.video_delay_codec（见 framecodec.py）
+    "delay_codec": None,
+}
+
+
+def load_config(path):
+    """读取 JSON 配置，未给出的字段取 DEFAULT_CONFIG 中的默认值"""
+    with open(path, "r", encoding="utf-8") as f:
+        user_config = json.load(f)
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    for key, value in user_config.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    if config["video"] is not None:
+        video = config["video"] = dict(DEFAULT_VIDEO_CONFIG, **config["video"])
+        # 视频文件默认按文件自身的帧率读取，配置中写明 fps 时才按该帧率
+        if "fps" in user_config["video"] and video["source"].get("type") == "file":
+            video["source"] = dict(video["source"])
+            video["source"].setdefault("fps", video["fps"])
+    return config
+
+
+def _with_results(spec, results_queue, paced=None, channel=0):
+    """内存输出需要结果队列；文件输入未指定 paced 时跟随运行模式"""
+    spec = dict(spec)
+    if spec.get("type") == "memory":
+        spec["results"] = results_queue
+        spec["channel"] = channel
+    if paced is not None and spec.get("type") in ("wav", "file", "pattern"):
+        spec.setdefault("paced", paced)
+    return spec
+
+
+def _drain(q, into):
+    while True:
+        try:
+            into.append(q.get_nowait())
+        except (queue.Empty, EOFError, OSError):
+            return
+
+
+def summarize_sink(result):
+    """内存输出的 JSON 摘要：帧数、PTS 范围、实际输出时刻相对 PTS 的偏差"""
+    records = result["records"]
+    summary = {"frames": len(records)}
+    if not records:
+        return summary
+    pts = np.array([r[0] for r in records])
+    presented = np.array([r[1] for r in records])
+    summary.update({
+        "pts_first": float(pts[0]),
+        "pts_last": float(pts[-1]),
+        "lateness_p50": float(np.percentile(presented - pts, 50)),
+        "lateness_p99": float(np.percentile(presented - pts, 99)),
+    })
+    if result["kind"] == "audio":
+        summary["seconds"] = sum(r[2] for r in records) / result["rate"]
+    return summary
+
+
+def run_pipeline(config, on_start=None):
+    """
+    按配置运行一次处理流程，直到输入结束或达到 duration
+
+    Args:
+        config: load_config 返回的配置
+        on_start: 所有进程启动后以 {进程名: Process} 调用，例如用于采样各进程的 CPU/内存
+
+    Returns:
+        (report, sink_results)：report 可直接序列化为 JSON；sink_results 为
+        {"audio"/"video": MemorySink.result()}，包含逐帧记录和（keep_data 时）输出数据，
+        多路时第 n 路（n > 0）的音频输出键为 "audio-n"
+    """
+    paced = config["mode"] == "paced"
+    stop_event = Event()
+    metrics_queue = Queue()
+    aggregator = MetricsAggregator(metrics_queue, port=config["metrics_port"],
+                                   jsonl_path=config["metrics_file"]).start()
+    results_queue = Queue()
+    record_queue = make_record_queue()
+    log_channel = get_log_channel()
+
+    match_mode = MatchMode[config["match_mode"].upper()].value
+    sensitive_matcher = load_sensitive_words(match_mode, config["sensitive_words"])
+    mute = AudioReplaceType[config["mute"].upper()].value
+    launch_t = time.time()
+    shared_delay = Value('d', delay_t)
+    # 各进程共用的时间基准（音频 PTS 由采集进程的采样时钟换算到同一时钟）
+    media_clock = MediaClock()
+
+    audio = config["audio"]
+    channels = config["channels"]
+    use_server = config["asr_server"] if config["asr_server"] is not None else channels > 1
+    asr_service = None
+    server_processes = []
+    if use_server:
+        server_config = {key: value for key, value in config["asr"].items() if key not in ("mode", "vad")}
+        chunk_ms = filterprocess.asr_chunk_ms
+        asr_service = ASRService(channels, server_config, chunk_size=(0, chunk_ms // 60, chunk_ms // 120))
+        server_processes.append(asr_service.start(stop_event, metrics_queue, log_channel))
+    asr_config = config["asr"]
+    if use_server and channels > 1 and "mode" not in asr_config:
+        # 服务只能把 window 模式的独立窗口合批，流式请求按路依次计算，多路时默认使用 window 模式
+        asr_config = dict(asr_config, mode="window")
+        logger.info(f"{channels} channels share the ASR server, using window mode so requests can be batched")
+    # 创建进程时还不知道进程数量，全部创建后再设置 stages
+    start_gate = StartGate(0)
+    capture_processes = []
+    send_processes = []
+    audio_queues = []
+    video_queue = None
+    for channel in range(channels):
+        # 第一路沿用单路时的进程名，其余各路加上序号，指标按进程名区分
+        suffix = f"-{channel}" if channel else ""
+        audio_queue = make_audio_queue()
+        audio_queues.append(audio_queue)
+        asr_client = asr_service.client(channel) if asr_service is not None else None
+        # 只有第一路调整共享延迟
+        capture_config = AudioCaptureConfig(sensitive_matcher, mute,
+                                            source=_with_results(audio["source"], results_queue, paced),
+                                            asr_config=asr_config, sensitive_words_file=config["sensitive_words"],
+                                            adaptive=config["adaptive_delay"],
+                                            shared_delay=shared_delay if channel == 0 else None,
+                                            asr_client=asr_client)
+        capture_processes.append(Process(target=process_capture_audio, name=f"AudioCapture{suffix}",
+                                         args=(audio_queue, record_queue, start_gate, stop_event, capture_config,
+                                               metrics_queue, log_channel)))
+        send_processes.append(Process(target=process_send_audio_frames, name=f"AudioSender{suffix}",
+                                      args=(audio_queue, start_gate, stop_event, metrics_queue, log_channel,
+                                            _with_results(audio["sink"], results_queue, channel=channel), paced,
+                                            media_clock)))
+    frame_ring = None
+    video = config["video"]
+    if video is not None:
+        width, height, fps = video["width"], video["height"], video["fps"]
+        if video["transport"] == "shm" and paced:
+            # 压缩保存延迟帧时，共享内存只需覆盖视频队列
+            frame_ring = SharedFrameRing.for_video(width, height, fps,
+                                                   video_ring_seconds(video["delay_codec"], config["adaptive_delay"]))
+            log_frame_ring(frame_ring)
+        # 实时运行时队列满丢弃最旧的帧，不限速运行时让快速读取的视频文件等待发送端
+        video_queue = make_video_queue(fps, paced)
+        capture_processes.append(Process(target=process_capture_video_frames, name="VideoCapture",
+                                         args=(video_queue, start_gate, stop_event, None, width, height, fps,
+                                               frame_ring, shared_delay, metrics_queue, log_channel,
+                                               _with_results(video["source"], results_queue, paced), media_clock)))
+        send_processes.append(Process(target=process_send_video_frames, name="VideoSender",
+                                      args=(video_queue, start_gate, stop_event, width, height, fps, frame_ring,
+                                            metrics_queue, log_channel,
+                                            _with_results(video["sink"], results_queue), paced, media_clock,
+                                            video["delay_codec"])))
+
+    processes = capture_processes + send_processes
+    start_gate.stages = len(processes)
+    for process in processes:
+        logger.info(f"Starting process: {process.name}")
+        process.start()
+    processes += server_processes
+    if on_start is not None:
+        on_start({process.name: process for process in processes})
+    start_time = start_gate.open(config["start_timeout"], processes=processes)
+    logger.info(f"All stages ready after {start_time - launch_t:.2f}s")
+
+    sink_results = []
+    hits = []
+    deadline = None if config["duration"] is None else start_time + config["duration"]
+    try:
+        # 输入结束时采集进程退出，发送进程呈现完剩余帧后退出
+        while any(p.is_alive() for p in send_processes):
+            if deadline is not None and time.time() > deadline and not stop_event.is_set():
+                logger.info("Duration reached, stopping pipeline")
+                stop_event.set()
+            if deadline is None and not any(p.is_alive() for p in capture_processes):
+                # 采集进程异常退出时可能没有发出结束标记，最多再等一个最大延迟
+                deadline = time.time() + delay_max + 5.0
+            _drain(results_queue, sink_results)
+            _drain(record_queue, hits)
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user, stopping processes...")
+    finally:
+        stop_event.set()
+        for process in processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                logger.warning(f"Terminating stuck process: {process.name}")
+                process.terminate()
+        _drain(results_queue, sink_results)
+        _drain(record_queue, hits)
+        if frame_ring is not None:
+            frame_ring.close()
+        # 等待最后一次指标上报被汇总
+        time.sleep(0.5)
+        aggregator.stop()
+
+    sinks = {result["kind"] + (f"-{result['channel']}" if result["channel"] else ""): result
+             for result in sink_results}
+    named_queues = [(f"audio_queue-{i}" if i else "audio_queue", q) for i, q in enumerate(audio_queues)]
+    named_queues += [("video_queue", video_queue)] if video_queue is not None else []
+    queues = {name: {"maxsize": q.maxsize, "high_water": q.high_water, "dropped": q.dropped}
+              for name, q in named_queues + [("record_queue", record_queue)]}
+    report = {
+        "mode": config["mode"],
+        "startup_seconds": start_time - launch_t,
+        "wall_seconds": time.time() - start_time,
+        "sensitive_hits": hits,
+        "sinks": {kind: summarize_sink(result) for kind, result in sinks.items()},
+        # 各进程间队列的高水位和丢弃数，队列容量见 filterprocess.make_*_queue
+        "queues": queues,
+        "metrics": aggregator.snapshot(),
+    }
+    return report, sinks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面运行敏感词过滤流程")
+    parser.add_argument("config", help="JSON 配置文件")
+    parser.add_argument("--mode", choices=["paced", "fast"], help="覆盖配置中的运行模式")
+    parser.add_argument("--duration", type=float, help="最长运行时间（秒）")
+    parser.add_argument("--report", help="把运行报告写入该 JSON 文件")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.mode:
+        config["mode"] = args.mode
+    if args.duration is not None:
+        config["duration"] = args.duration
+    report, _ = run_pipeline(config)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            f.write(text)
+        logger.info(f"Report written to {args.report}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import itertools
+import unicodedata
+from collections import deque
+
+
+class SensitiveMatcher:
+    """
+    Aho-Corasick 多模式匹配自动机
+
+    一次线性扫描即可找出文本中出现的全部敏感词，匹配耗时与词库大小无关，
+    只与文本长度和命中数量有关。自动机只由 dict/list/tuple 组成，可以直接
+    pickle 传给子进程。
+
+    Args:
+        words: 敏感词的可迭代对象
+    """
+
+    def __init__(self, words=()):
+        self.words = frozenset(w for w in words if w)
+        # _goto[state] : {symbol: next_state}
+        self._goto = [{}]
+        # _fail[state] : 失配时跳转的状态
+        self._fail = [0]
+        # _out[state] : 在该状态结束的全部敏感词（已合并 fail 链上的输出）
+        self._out = [()]
+        for word in self.words:
+            self._insert(word, word)
+        self._build_fail_links()
+
+    def _insert(self, key, word):
+        goto = self._goto
+        state = 0
+        for symbol in key:
+            nxt = goto[state].get(symbol)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][symbol] = nxt
+                goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        if word not in self._out[state]:
+            self._out[state] = self._out[state] + (word,)
+
+    def _build_fail_links(self):
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for symbol, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and symbol not in goto[f]:
+                    f = fail[f]
+                f = goto[f].get(symbol, 0)
+                fail[nxt] = f
+                if out[f]:
+                    out[nxt] = out[nxt] + out[f]
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def _symbols(self, text):
+        """将文本转换为自动机的输入符号序列，精确匹配时即为字符本身"""
+        return text
+
+    def iter_matches(self, text):
+        """
+        逐个产出文本中的命中
+
+        Yields:
+            (start, end, word)，end 为开区间
+        """
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for i, symbol in enumerate(self._symbols(text)):
+            while state and symbol not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(symbol, 0)
+            if out[state]:
+                for word in out[state]:
+                    yield i + 1 - len(word), i + 1, word
+
+    def find_all(self, text):
+        """
+        返回文本中出现的全部敏感词（按首次出现顺序去重）
+        """
+        if not text:
+            return []
+        found = {}
+        for _, _, word in self.iter_matches(text):
+            if word not in found:
+                found[word] = None
+        return list(found)
+
+
+_pinyin_table = None
+
+
+def pinyin_table():
+    """
+    构建 汉字 -> 无声调拼音 的查找表（每个进程只构建一次）
+
+    Returns:
+        dict，值为该字全部读音组成的元组，第一个为最常用读音
+    """
+    global _pinyin_table
+    if _pinyin_table is None:
+        from pypinyin.pinyin_dict import pinyin_dict
+
+        syllables = {}
+        table = {}
+        for code, readings in pinyin_dict.items():
+            toneless = []
+            for reading in readings.split(","):
+                # 去掉声调符号，ü 归并为 u，兼顾识别错字和谐音
+                plain = "".join(c for c in unicodedata.normalize("NFD", reading) if not unicodedata.combining(c))
+                plain = syllables.setdefault(plain, plain)
+                if plain not in toneless:
+                    toneless.append(plain)
+            table[chr(code)] = tuple(toneless)
+        _pinyin_table = table
+    return _pinyin_table
+
+
+class PhoneticMatcher(SensitiveMatcher):
+    """
+    基于拼音的谐音匹配自动机
+
+    敏感词与识别文本都转换为无声调拼音序列后再做 Aho-Corasick 匹配，
+    可以命中同音字替换和 ASR 识别出的错别字。多音字在词库一侧展开为多个
+    读音组合（最多 MAX_VARIANTS 个），文本一侧取最常用读音，查表即可完成
+    转换。非汉字字符按小写字符本身参与匹配。
+    """
+    MAX_VARIANTS = 8
+
+    def __init__(self, words=()):
+        self._table = pinyin_table()
+        super().__init__(words)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # 拼音表在子进程中重新构建，不随自动机一起 pickle
+        del state["_table"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._table = pinyin_table()
+
+    def _insert(self, key, word):
+        table = self._table
+        readings = [table.get(ch) or (ch.lower(),) for ch in key]
+        for variant in itertools.islice(itertools.product(*readings), self.MAX_VARIANTS):
+            super()._insert(variant, word)
+
+    def _symbols(self, text):
+        table = self._table
+        return [table[ch][0] if ch in table else ch.lower() for ch in text]
+
+
+class IncrementalMatcher:
+    """
+    支持增量更新的敏感词匹配器
+
+    由一个基础自动机、一个只包含新增词的增量自动机以及一个删除集合组成。
+    词库变化时只需为差异部分重建增量自动机；当差异累计超过基础词库的一定
+    比例时才整体重建。实例不可变，更新会返回新对象，便于在运行中原子替换。
+
+    Args:
+        base: 基础自动机
+        delta: 新增词的自动机
+        removed: 已从基础自动机中删除的词
+        factory: 根据词集合构建自动机的可调用对象
+    """
+    # 差异词数超过 max(COMPACT_MIN_WORDS, 基础词数 * COMPACT_RATIO) 时整体重建
+    COMPACT_RATIO = 0.1
+    COMPACT_MIN_WORDS = 256
+
+    def __init__(self, base, delta=None, removed=frozenset(), factory=SensitiveMatcher):
+        self.factory = factory
+        self.base = base
+        self.delta = delta if delta is not None else factory()
+        self.removed = frozenset(removed)
+        self.words = (base.words - self.removed) | self.delta.words
+
+    def __len__(self):
+        return len(self.words)
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __contains__(self, word):
+        return word in self.words
+
+    def iter_matches(self, text):
+        for match in self.base.iter_matches(text):
+            if match[2] not in self.removed:
+                yield match
+        yield from self.delta.iter_matches(text)
+
+    def find_all(self, text):
+        found = [w for w in self.base.find_all(text) if w not in self.removed]
+        for word in self.delta.find_all(text):
+            if word not in found:
+                found.append(word)
+        return found
+
+    def updated(self, words):
+        """
+        根据新的完整词集合返回更新后的匹配器
+
+        Returns:
+            (matcher, added, removed)，后两者为本次新增和删除的词
+        """
+        words = frozenset(w for w in words if w)
+        added = words - self.words
+        removed = self.words - words
+        if not added and not removed:
+            return self, added, removed
+        base_words = self.base.words
+        delta_words = (self.delta.words - removed) | (added - base_words)
+        base_removed = (self.removed | (removed & base_words)) - added
+        if len(delta_words) + len(base_removed) > max(self.COMPACT_MIN_WORDS, len(base_words) * self.COMPACT_RATIO):
+            return IncrementalMatcher(self.factory(words), factory=self.factory), added, removed
+        delta = self.delta if delta_words == self.delta.words else self.factory(delta_words)
+        return IncrementalMatcher(self.base, delta, base_removed, self.factory), added, removed
@@ -0,0 +1,147 @@
+"""
+音频采样时钟与进程间共享的时钟模型
+
+声卡按自己的晶振产生采样，与系统单调时钟之间有几十 ppm 的频偏；回调线程的到达时刻还有
+几毫秒到几十毫秒的调度抖动。按“读取时刻 - 缓冲中的采样数”给窗口打时间戳，会把回调抖动和
+处理线程的停顿带进 PTS，相邻窗口的 PTS 间隔也不等于窗口时长。
+
+SampleClock 以累计采样数作为音频的时间轴：采集回调每次写入后记录 (累计采样数, 到达时刻)，
+每个时间桶只保留相对到达最早的一次（回调只会因调度变晚、不会提前，取下包络即可去掉抖动），
+对最近一段时间的下包络做直线拟合，得到 采样序号 -> 单调时钟 的映射和频偏估计。映射每隔
+resync_interval 秒重新拟合；最近的观测持续偏离映射超过 max_error 时（设备重启、驱动丢采样、
+系统休眠）丢弃历史重新对齐。
+
+MediaClock 是各进程共用的时间基准：视频采集、音视频发送都以 now()（单调时钟）打时间戳和判断呈现时刻，
+音频采集进程用 SampleClock 把采样序号换算到同一单调时钟上，PTS 到达发送进程时已在同一时间轴中，
+其他进程不需要再读取采样时钟的映射。
+"""
+import threading
+import time
+from collections import deque
+from util import get_logger
+
+logger = get_logger()
+
+# 拟合频偏至少需要的时间桶数，之前只做对齐不估计频偏
+min_fit_buckets = 4
+# 频偏估计的上限（ppm），超出视为拟合异常
+max_drift_ppm = 1000.0
+
+
+class SampleClock:
+    """
+    采样序号到单调时钟的映射
+
+    生产者（PortAudio 回调线程）调用 observe，消费者调用 time_at，两者可以在不同线程。
+
+    Args:
+        rate: 标称采样率
+        bucket_seconds: 时间桶长度，每个桶保留一个下包络点
+        window_seconds: 参与拟合的时长
+        resync_interval: 重新拟合的间隔（秒）
+        max_error: 连续两个桶的偏差超过该值（秒）时重新对齐
+        clock: 单调时钟
+    """
+
+    def __init__(self, rate, bucket_seconds=0.5, window_seconds=60.0, resync_interval=2.0, max_error=0.02,
+                 clock=time.monotonic):
+        self.rate = rate
+        self.bucket_samples = max(1, int(bucket_seconds * rate))
+        self.resync_interval = resync_interval
+        self.max_error = max_error
+        self.clock = clock
+        self._lock = threading.Lock()
+        # 对齐点 (采样序号, 时刻)，拟合以相对对齐点的标称秒数为自变量
+        self._anchor = None
+        self._last = None
+        # [桶序号, x, y]，x 为标称秒数，y 为到达时刻相对标称时刻的偏移
+        self._buckets = deque(maxlen=max(min_fit_buckets, int(window_seconds / bucket_seconds)))
+        # 映射 t = anchor_t + x + intercept + slope * x
+        self._intercept = 0.0
+        self._slope = 0.0
+        self._fit_t = None
+        self.resyncs = 0
+        self.error = 0.0
+
+    @property
+    def drift_ppm(self):
+        """设备采样时钟相对单调时钟的频偏，为正表示设备比标称采样率慢"""
+        return self._slope * 1e6
+
+    @property
+    def model(self):
+        """(对齐点采样序号, 对齐点时刻, intercept, slope)，尚未收到采样时为 None"""
+        with self._lock:
+            if self._anchor is None:
+                return None
+            return self._anchor + (self._intercept, self._slope)
+
+    def observe(self, samples, t=None):
+        """记录累计写入 samples 个采样时的到达时刻"""
+        t = self.clock() if t is None else t
+        with self._lock:
+            if self._anchor is None:
+                self._anchor = (samples, t)
+            self._last = (samples, t)
+            x = (samples - self._anchor[0]) / self.rate
+            y = t - self._anchor[1] - x
+            index = (samples - self._anchor[0]) // self.bucket_samples
+            if self._buckets and self._buckets[-1][0] == index:
+                if y < self._buckets[-1][2]:
+                    self._buckets[-1][1] = x
+                    self._buckets[-1][2] = y
+            else:
+                self._buckets.append([index, x, y])
+
+    def time_at(self, sample):
+        """第 sample 个采样对应的单调时钟时刻，尚未收到采样时返回 None"""
+        with self._lock:
+            if self._anchor is None:
+                return None
+            now = self.clock()
+            if self._fit_t is None or now - self._fit_t >= self.resync_interval:
+                self._refit()
+                self._fit_t = now
+            x = (sample - self._anchor[0]) / self.rate
+            return self._anchor[1] + x + self._intercept + self._slope * x
+
+    def _refit(self):
+        # 最后一个桶可能还没收齐，只用已完成的桶判断是否失步
+        complete = list(self._buckets)[-3:-1]
+        if self._fit_t is not None and len(complete) == 2:
+            errors = [y - (self._intercept + self._slope * x) for _, x, y in complete]
+            self.error = errors[-1]
+            if all(abs(e) > self.max_error for e in errors) and (errors[0] > 0) == (errors[1] > 0):
+                logger.warning(f"Audio sample clock off by {errors[-1] * 1000:.1f}ms, resynchronizing")
+                self.resyncs += 1
+                self._anchor = self._last
+                self._buckets.clear()
+                self._buckets.append([0, 0.0, 0.0])
+                self._intercept = self._slope = 0.0
+                return
+        if len(self._buckets) < min_fit_buckets:
+            self._intercept = min(y for _, _, y in self._buckets)
+            self._slope = 0.0
+            return
+        n = len(self._buckets)
+        mean_x = sum(x for _, x, _ in self._buckets) / n
+        mean_y = sum(y for _, _, y in self._buckets) / n
+        var_x = sum((x - mean_x) ** 2 for _, x, _ in self._buckets)
+        slope = sum((x - mean_x) * (y - mean_y) for _, x, y in self._buckets) / var_x if var_x else 0.0
+        if abs(slope) * 1e6 > max_drift_ppm:
+            logger.warning(f"Ignoring implausible audio clock drift estimate: {slope * 1e6:.0f}ppm")
+            slope = self._slope
+        self._slope = slope
+        self._intercept = mean_y - slope * mean_x
+
+
+class MediaClock:
+    """
+    进程间共用的时间基准，对象可以直接作为 Process 参数传递
+
+    视频采集进程用 now() 给帧打时间戳，发送进程的 PresentationScheduler 用 now() 判断呈现时刻；
+    音频 PTS 由采集进程的 SampleClock 换算到同一时钟。
+    """
+
+    def now(self):
+        return time.monotonic()
@@ -0,0 +1,574 @@
+"""
+音视频输入输出设备
+
+采集/发送进程通过这里的 source/sink 访问设备，除麦克风、VB-CABLE、摄像头、虚拟摄像头外，
+还提供文件输入和内存/空输出，使同一套处理流程可以在没有音视频硬件的机器上运行。
+source/sink 由可 pickle 的配置字典描述（见 make_audio_source 等），在子进程中创建。
+
+源的 realtime 属性表示其采样是否按真实时间到达：为 False（文件源不限速读取）时，
+采集进程按采样/帧序号而不是当前时刻计算 PTS，发送进程不再按 PTS 等待。
+
+OpenCV、PyAudio、pyvirtualcam 只在创建对应的设备时导入，只处理音频的进程不会加载 OpenCV。
+"""
+import queue
+import threading
+import time
+import wave
+import numpy as np
+from util import get_logger
+from resampler import StreamResampler
+from ringbuffer import JitterBuffer
+from mediaclock import SampleClock
+
+logger = get_logger()
+
+# VB-CABLE 输出方式："callback" 由 PortAudio 回调按设备周期从抖动缓冲区取采样，"blocking" 整块阻塞写入
+audio_output_mode = "callback"
+# 回调模式每个设备周期的时长（秒）
+audio_output_period = 0.01
+# 回调模式下发送进程提前把音频交给抖动缓冲区的时长（秒），需覆盖发送进程的调度和重采样耗时
+audio_output_lead = 0.1
+
+
+def init_video_cam(camera_index,w,h,fps):
+    try:
+        import cv2
+        logger.info("Initializing video capture device")
+        cap = cv2.VideoCapture(camera_index, cv2.CAP_DSHOW)
+        # 设置摄像头分辨率
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, w)
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, h)
+        cap.set(cv2.CAP_PROP_FPS, fps)
+
+        # 关键：设置像素格式为 YUY2（大多数 UVC 采集设备默认格式）
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc('Y', 'U', 'Y', '2'))
+        logger.info("Video capture device initialized successfully with resolution 1280x720")
+        return cap
+    except Exception as e:
+        logger.error(f"Failed to initialize video capture: {e}")
+        return None
+
+
+def init_audio_mic(audio_input_device_index,p, stream_callback=None):
+    # Initialize audio input stream similar to main.py
+    # 传入 stream_callback 时以 PortAudio 回调模式打开，采样由回调线程推送
+    import pyaudio
+    logger.info("Initializing audio input stream")
+    INPUT_RATE = 16000
+    CHUNK = 960
+    CHANNELS = 1
+    input_idx = audio_input_device_index
+    try:
+        audio_stream_in = p.open(
+            format=pyaudio.paFloat32,
+            channels=CHANNELS,
+            rate=INPUT_RATE,
+            input=True,
+            input_device_index=input_idx,
+            frames_per_buffer=CHUNK,
+            stream_callback=stream_callback
+        )
+        logger.info(f"Audio input stream initialized successfully with rate={INPUT_RATE}, chunk={CHUNK}")
+        return audio_stream_in
+    except Exception as e:
+        logger.error(f"Failed to initialize audio input stream: {e}")
+        return None
+
+
+def init_audio_output(p, stream_callback=None, period_seconds=None):
+    # Initialize audio output stream
+    # 传入 stream_callback 时以回调模式打开（不自动开始），每个周期 period_seconds 秒
+    import pyaudio
+    logger.info("Initializing audio output stream")
+
+    try:
+        # Find VB-Cable device like in main.py
+        output_idx = None
+        for i in range(p.get_device_count()):
+            dev = p.get_device_info_by_index(i)
+            # Look for output device with CABLE in name
+            if dev['maxOutputChannels'] > 0 and 'CABLE' in dev['name'].upper():
+                output_idx = i
+                logger.info(f"Found VB-Cable output device: {dev['name']} (index {i})")
+                break
+        # If no VB-Cable device found, use first available output device
+        if output_idx is None:
+            logger.warning("VB-Cable device not found, searching for alternative output device")
+            for i in range(p.get_device_count()):
+                dev = p.get_device_info_by_index(i)
+                if dev['maxOutputChannels'] > 0:
+                    output_idx = i
+                    logger.info(f"Using alternative output device: {dev['name']} (index {i})")
+                    break
+        if output_idx is None:
+            raise Exception("No output device found")
+        device_info = p.get_device_info_by_index(output_idx)
+        output_rate = int(device_info['defaultSampleRate'])
+        audio_stream_out = p.open(
+                format=pyaudio.paFloat32,
+                channels=1,
+                rate=output_rate,
+                output=True,
+                output_device_index=output_idx,
+                frames_per_buffer=int(output_rate * period_seconds) if period_seconds else 1024,
+                stream_callback=stream_callback,
+                start=stream_callback is None
+            )
+        logger.info(f"Audio output stream initialized successfully with rate={output_rate}")
+        return audio_stream_out
+    except Exception as e:
+        logger.error(f"Failed to initialize audio output stream: {e}")
+
+
+class MicrophoneSource:
+    """PortAudio 回调模式的麦克风输入，回调线程把采样写入环形缓冲区"""
+    realtime = True
+
+    def __init__(self, device_index=None, rate=16000):
+        self.device_index = device_index
+        self.rate = rate
+        self._pa = None
+        self._stream = None
+
+    def start(self, ring):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+
+        def on_audio_input(in_data, frame_count, time_info, status):
+            if status & pyaudio.paInputOverflow:
+                ring.input_overflows += 1
+            ring.write(np.frombuffer(in_data, dtype=np.float32))
+            return None, pyaudio.paContinue
+
+        self._stream = init_audio_mic(self.device_index, self._pa, stream_callback=on_audio_input)
+        if self._stream is None:
+            raise RuntimeError(f"Failed to open audio input device {self.device_index}")
+        self._stream.start_stream()
+
+    def is_active(self):
+        return self._stream is not None and self._stream.is_active()
+
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop_stream()
+            self._stream.close()
+        if self._pa is not None:
+            self._pa.terminate()
+
+
+def read_wav(path, rate=16000):
+    """读取 PCM WAV 文件为单声道 float32，采样率不同时重采样到 rate"""
+    with wave.open(path, "rb") as f:
+        channels, width, file_rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        raw = f.readframes(f.getnframes())
+    if width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (b[:, 0].astype(np.int32) | (b[:, 1].astype(np.int32) << 8) | (b[:, 2].astype(np.int32) << 16))
+        samples = (np.where(ints & 0x800000, ints - 0x1000000, ints) / 8388608.0).astype(np.float32)
+    elif width in (2, 4):
+        dtype = np.int16 if width == 2 else np.int32
+        samples = np.frombuffer(raw, dtype=dtype).astype(np.float32) / float(np.iinfo(dtype).max + 1)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    if file_rate != rate:
+        samples = StreamResampler(file_rate, rate).process(samples).copy()
+    return samples.astype(np.float32, copy=False)
+
+
+class WavFileSource:
+    """
+    WAV 文件音频输入
+
+    paced=True 时按真实时间分块写入，与麦克风行为一致；paced=False 时尽快写入，
+    只在环形缓冲区将满时等待消费者，从而以识别速度（通常快于实时）处理整个文件。
+    文件末尾补 tail_seconds 秒静音，保证最后一个识别窗口能凑满。
+
+    Args:
+        path: WAV 文件路径
+        rate: 输出采样率
+        paced: 是否按真实时间输入
+        loop: 是否循环播放，直到 close
+        block: 每次写入的采样数，与麦克风的回调块大小一致
+    """
+
+    def __init__(self, path, rate=16000, paced=True, loop=False, block=960, tail_seconds=1.5):
+        self.path = path
+        self.rate = rate
+        self.paced = paced
+        self.loop = loop
+        self.block = block
+        self.samples = read_wav(path, rate)
+        self.samples = np.concatenate([self.samples, np.zeros(int(tail_seconds * rate), dtype=np.float32)])
+        self._stop = threading.Event()
+        self._thread = None
+        logger.info(f"WAV source: {path}, {len(self.samples) / rate:.1f}s, paced={paced}, loop={loop}")
+
+    @property
+    def realtime(self):
+        return self.paced
+
+    def start(self, ring):
+        self._thread = threading.Thread(target=self._feed, args=(ring,), name="WavFileSource", daemon=True)
+        self._thread.start()
+
+    def _feed(self, ring):
+        start_t = time.monotonic()
+        written = 0
+        while not self._stop.is_set():
+            for i in range(0, len(self.samples), self.block):
+                if self._stop.is_set():
+                    return
+                chunk = self.samples[i:i + self.block]
+                if self.paced:
+                    wait = start_t + (written + len(chunk)) / self.rate - time.monotonic()
+                    if wait > 0:
+                        time.sleep(wait)
+                else:
+                    while ring.available() + len(chunk) > ring.capacity and not self._stop.is_set():
+                        time.sleep(0.001)
+                ring.write(chunk)
+                written += len(chunk)
+            if not self.loop:
+                break
+
+    def is_active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def close(self):
+        self._stop.set()
+
+
+class VideoFileSource:
+    """
+    视频文件输入，接口与 cv2.VideoCapture 的 read/isOpened/release 一致
+
+    paced=True 时按 fps 节奏返回帧，paced=False 时尽快读取；loop=True 时读到结尾后从头开始。
+    fps 为 None 时使用文件记录的帧率，文件没有记录时按 30。
+    """
+
+    def __init__(self, path, fps=None, paced=True, loop=False):
+        self.path = path
+        self.paced = paced
+        self.loop = loop
+        import cv2
+        self._cap = cv2.VideoCapture(path)
+        self.fps = fps or self._cap.get(cv2.CAP_PROP_FPS) or 30
+        self._start_t = None
+        self._count = 0
+
+    @property
+    def realtime(self):
+        return self.paced
+
+    def read(self, image=None):
+        if self.paced:
+            if self._start_t is None:
+                self._start_t = time.monotonic()
+            wait = self._start_t + self._count / self.fps - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        ret, frame = self._cap.read(image)
+        if not ret and self.loop:
+            import cv2
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self._cap.read(image)
+        if ret:
+            self._count += 1
+        return ret, frame
+
+    def isOpened(self):
+        return self._cap.isOpened()
+
+    def release(self):
+        self._cap.release()
+
+
+class TestPatternSource:
+    """
+    合成的编号测试画面，接口与 cv2.VideoCapture 一致
+
+    每帧左上角用 FRAME_NUMBER_BITS 个黑白方块编码帧序号，输出端用 read_frame_number
+    解码即可统计丢帧并把帧对应回输入时刻。
+
+    Args:
+        width, height, fps: 画面参数
+        frames: 总帧数，为 None 时无限输出
+        paced: 是否按 fps 节奏输出
+    """
+    FRAME_NUMBER_BITS = 20
+    BLOCK = 8
+
+    def __init__(self, width=640, height=480, fps=30, frames=None, paced=True):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = frames
+        self.paced = paced
+        self._start_t = None
+        self._count = 0
+        self._background = np.full((height, width, 3), 96, dtype=np.uint8)
+
+    @property
+    def realtime(self):
+        return self.paced
+
+    def read(self, image=None):
+        if self.frames is not None and self._count >= self.frames:
+            return False, None
+        if self.paced:
+            if self._start_t is None:
+                self._start_t = time.monotonic()
+            wait = self._start_t + self._count / self.fps - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        if image is None or image.shape != self._background.shape:
+            image = np.empty_like(self._background)
+        image[...] = self._background
+        b = self.BLOCK
+        for bit in range(min(self.FRAME_NUMBER_BITS, self.width // b)):
+            if self._count >> bit & 1:
+                image[:b, bit * b:(bit + 1) * b] = 255
+            else:
+                image[:b, bit * b:(bit + 1) * b] = 0
+        self._count += 1
+        return True, image
+
+    def isOpened(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def read_frame_number(frame):
+    """解码 TestPatternSource 写入的帧序号，frame 为未缩放的 BGR 帧"""
+    b = TestPatternSource.BLOCK
+    row = frame[b // 2, b // 2::b][:TestPatternSource.FRAME_NUMBER_BITS]
+    bits = row.reshape(len(row), -1).mean(axis=1) > 127
+    return int(sum(1 << i for i, bit in enumerate(bits) if bit))
+
+
+class VBCableSink:
+    """
+    VB-CABLE（或第一个可用输出设备）音频输出
+
+    callback 模式下 write 只把采样和 PTS 放入抖动缓冲区（见 ringbuffer.JitterBuffer），
+    PortAudio 回调每个设备周期按播放时刻取出采样，数据不足时补静音并计数。
+    回调的播放时刻由输出采样时钟换算（见 mediaclock.SampleClock），不受回调线程调度抖动影响。
+    blocking 模式下 write 阻塞写入整块采样。
+
+    Args:
+        mode: "callback" 或 "blocking"，为 None 时使用 audio_output_mode
+        clock: 与 PTS 同源的时钟
+    """
+
+    def __init__(self, mode=None, clock=time.monotonic):
+        import pyaudio
+        self.mode = mode or audio_output_mode
+        self.clock = clock
+        self.jitter_buffer = None
+        # 发送进程应提前多久调用 write
+        self.lead = 0.0
+        self.device_underflows = 0
+        self._pa = pyaudio.PyAudio()
+        if self.mode == "callback":
+            self._stream = init_audio_output(self._pa, self._on_output, audio_output_period)
+        else:
+            self._stream = init_audio_output(self._pa)
+        if self._stream is None:
+            raise RuntimeError("No audio output device available")
+        self.rate = self._stream._rate
+        if self.mode == "callback":
+            self.jitter_buffer = JitterBuffer(self.rate)
+            self.lead = audio_output_lead
+            self._out_clock = SampleClock(self.rate, clock=clock)
+            self._pulled = 0
+            self._out = np.zeros(int(self.rate * audio_output_period), dtype=np.float32)
+            try:
+                self._latency = self._stream.get_output_latency()
+            except Exception:
+                self._latency = 0.0
+            self._stream.start_stream()
+            logger.info(f"Audio output in callback mode, period={len(self._out)} samples, "
+                        f"latency={self._latency * 1000:.1f}ms, lead={self.lead * 1000:.0f}ms")
+
+    def _on_output(self, in_data, frame_count, time_info, status):
+        import pyaudio
+        if status & pyaudio.paOutputUnderflow:
+            self.device_underflows += 1
+        if len(self._out) != frame_count:
+            self._out = np.zeros(frame_count, dtype=np.float32)
+        self._out_clock.observe(self._pulled)
+        play_t = self._out_clock.time_at(self._pulled) + self._latency
+        self.jitter_buffer.pull(self._out, play_t)
+        self._pulled += frame_count
+        return self._out.tobytes(), pyaudio.paContinue
+
+    def write(self, samples, pts):
+        if self.jitter_buffer is not None:
+            self.jitter_buffer.push(samples, pts)
+        else:
+            self._stream.write(samples.tobytes())
+
+    def close(self):
+        if self.jitter_buffer is not None:
+            # 播放完缓冲区中剩余的音频再关闭
+            self.jitter_buffer.finish()
+            deadline = time.monotonic() + self.jitter_buffer.available() / self.rate + 0.5
+            while self.jitter_buffer.available() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self._stream.stop_stream()
+            self._stream.close()
+        self._pa.terminate()
+
+
+class VirtualCameraSink:
+    """虚拟摄像头输出，按协商到的像素格式转换帧"""
+
+    def __init__(self, width, height, fps):
+        from videoformat import open_virtual_camera, FrameConverter
+        self._cam = open_virtual_camera(width, height, fps)
+        logger.info("Virtual camera initialized successfully")
+        self._converter = FrameConverter(self._cam.width, self._cam.height, self._cam.fmt)
+
+    def convert(self, frame):
+        return self._converter.convert(frame)
+
+    def send(self, frame, pts):
+        self._cam.send(frame)
+
+    def close(self):
+        self._cam.close()
+
+
+class NullSink:
+    """丢弃所有输出，只计数；用于测量处理流程本身的开销"""
+
+    def __init__(self, rate=16000):
+        self.rate = rate
+        self.count = 0
+
+    def convert(self, frame):
+        return frame
+
+    def write(self, samples, pts):
+        self.count += 1
+
+    send = write
+
+    def close(self):
+        logger.info(f"Null sink received {self.count} frames")
+
+
+class MemorySink(NullSink):
+    """
+    把每次输出的 (pts, 实际输出时刻, 长度) 记录在内存中，关闭时放入 results 队列
+
+    Args:
+        results: multiprocessing.Queue，关闭时放入 {"kind", "records", "data"}；为 None 时只保留在本进程
+        kind: "audio" 或 "video"
+        rate: 音频输出采样率
+        keep_data: 是否同时保留输出的音频采样/视频帧
+        channel: 多路运行时的流序号
+    """
+
+    def __init__(self, results=None, kind="audio", rate=16000, keep_data=False, channel=0):
+        super().__init__(rate)
+        self.results = results
+        self.kind = kind
+        self.channel = channel
+        self.keep_data = keep_data
+        self.records = []
+        self.data = []
+
+    def write(self, samples, pts):
+        self.count += 1
+        self.records.append((pts, time.monotonic(), len(samples)))
+        if self.keep_data:
+            self.data.append(np.array(samples, copy=True))
+
+    send = write
+
+    def result(self):
+        data = None
+        if self.keep_data and self.data:
+            data = np.concatenate(self.data) if self.kind == "audio" else np.stack(self.data)
+        return {"kind": self.kind, "channel": self.channel, "rate": self.rate, "records": self.records, "data": data}
+
+    def close(self):
+        if self.results is not None:
+            try:
+                self.results.put(self.result(), timeout=5.0)
+            except queue.Full:
+                logger.error("Memory sink results queue is full")
+
+
+def make_audio_source(spec, device_index=None, paced=True):
+    """
+    按配置创建音频输入
+
+    spec 为 None 或 {"type": "microphone", "device_index": ...} 时使用麦克风，
+    {"type": "wav", "path": ..., "paced": ..., "loop": ...} 时读取 WAV 文件
+    """
+    spec = dict(spec or {"type": "microphone", "device_index": device_index})
+    kind = spec.pop("type")
+    if kind == "microphone":
+        return MicrophoneSource(spec.get("device_index", device_index))
+    if kind == "wav":
+        spec.setdefault("paced", paced)
+        return WavFileSource(**spec)
+    raise ValueError(f"Unknown audio source type: {kind}")
+
+
+def make_audio_sink(spec, clock=time.monotonic):
+    """
+    spec 为 None 或 {"type": "vbcable", "mode": ...} 时输出到 VB-CABLE，另有 "memory"、"null"
+
+    clock 为与 PTS 同源的时钟，回调模式的 VB-CABLE 输出按它换算播放时刻
+    """
+    spec = dict(spec or {"type": "vbcable"})
+    kind = spec.pop("type")
+    if kind == "vbcable":
+        return VBCableSink(clock=clock, **spec)
+    if kind == "memory":
+        return MemorySink(kind="audio", **spec)
+    if kind == "null":
+        return NullSink(**spec)
+    raise ValueError(f"Unknown audio sink type: {kind}")
+
+
+def make_video_source(spec, camera_index=None, width=640, height=480, fps=30, paced=True):
+    """
+    spec 为 None 或 {"type": "camera"} 时打开摄像头，{"type": "file", "path": ...} 时读取视频文件，
+    {"type": "pattern", "frames": ...} 时输出编号测试画面
+
+    视频文件按文件自身的帧率读取，spec 中写明 "fps" 时才覆盖；参数 fps 只用于摄像头和测试画面
+    """
+    spec = dict(spec or {"type": "camera", "camera_index": camera_index})
+    kind = spec.pop("type")
+    if kind == "camera":
+        return init_video_cam(spec.get("camera_index", camera_index), width, height, fps)
+    if kind == "file":
+        spec.setdefault("paced", paced)
+        return VideoFileSource(**spec)
+    if kind == "pattern":
+        spec.setdefault("paced", paced)
+        return TestPatternSource(width, height, fps, **spec)
+    raise ValueError(f"Unknown video source type: {kind}")
+
+
+def make_video_sink(spec, width=640, height=480, fps=30):
+    """spec 为 None 或 {"type": "virtualcam"} 时输出到虚拟摄像头，另有 "memory"、"null" """
+    spec = dict(spec or {"type": "virtualcam"})
+    kind = spec.pop("type")
+    if kind == "virtualcam":
+        return VirtualCameraSink(width, height, fps)
+    if kind == "memory":
+        return MemorySink(kind="video", **spec)
+    if kind == "null":
+        return NullSink()
+    raise ValueError(f"Unknown video sink type: {kind}")
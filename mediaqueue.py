@@ -0,0 +1,172 @@
+"""
+有界进程间队列
+
+采集进程与发送进程之间的 multiprocessing.Queue 默认不限长度：虚拟摄像头或 VB-CABLE 卡住时，
+原始视频帧会一直堆积到内存耗尽。BoundedQueue 限制队列长度，并按流的类型选择队列满时的处理方式：
+
+- "drop_oldest": 丢弃最旧的一项再放入。用于视频，积压的旧帧到发送端时也已过期
+- "block": 阻塞等待空位，等待超过 alarm_after 秒时告警。用于音频，背压沿识别队列传回采集端的
+  环形缓冲区，在那里按溢出计数，不会无声丢失
+- "coalesce": 放不下的事件按 key 合并在本进程中（累计 count），下次放入时先补发。用于敏感词等事件
+
+队列在生产者进程中记录当前深度、高水位和丢弃/合并/阻塞次数（指标名以 name 为前缀），
+高水位和丢弃数同时保存在共享内存中，主进程可以直接读取。对象可以直接作为 Process 参数传递。
+"""
+import queue
+import time
+from multiprocessing import Queue, Value
+from util import get_logger
+from metrics import get_registry
+
+logger = get_logger()
+
+POLICIES = ("drop_oldest", "block", "coalesce")
+
+
+class BoundedQueue:
+    """
+    Args:
+        maxsize: 队列容量（项数）
+        policy: 队列满时的处理方式，见 POLICIES
+        name: 指标和日志使用的名称，例如 "video_queue"
+        alarm_after: block 策略下等待超过该时长（秒）时告警
+        coalesce_key: coalesce 策略下作为合并键的事件字段名（事件为 dict），为 None 时按整个事件合并
+    """
+
+    def __init__(self, maxsize, policy="block", name="queue", alarm_after=0.5, coalesce_key=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue overflow policy: {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.name = name
+        self.alarm_after = alarm_after
+        self.coalesce_key = coalesce_key
+        self._queue = Queue(maxsize)
+        self._high_water = Value('i', 0)
+        self._dropped = Value('i', 0)
+        # 以下只在生产者进程中使用
+        self._pending = {}
+        self._metrics = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_pending"] = {}
+        state["_metrics"] = None
+        return state
+
+    @property
+    def high_water(self):
+        return self._high_water.value
+
+    @property
+    def dropped(self):
+        return self._dropped.value
+
+    def _get_metrics(self):
+        if self._metrics is None:
+            registry = get_registry()
+            self._metrics = {
+                "depth": registry.gauge(f"{self.name}_depth"),
+                "high_water": registry.gauge(f"{self.name}_high_water"),
+                "dropped": registry.counter(f"{self.name}_dropped_total"),
+                "coalesced": registry.counter(f"{self.name}_coalesced_total"),
+                "blocked": registry.counter(f"{self.name}_blocked_total"),
+            }
+        return self._metrics
+
+    def _record_depth(self):
+        metrics = self._get_metrics()
+        try:
+            depth = self._queue.qsize()
+        except NotImplementedError:
+            # macOS 不支持 qsize
+            return
+        metrics["depth"].set(depth)
+        if depth > self._high_water.value:
+            self._high_water.value = depth
+            metrics["high_water"].set(depth)
+
+    def put(self, item, timeout=None):
+        """
+        按策略放入一项；None（流结束标记）不会被合并，队列满时按 drop_oldest 腾出空位或阻塞等待
+
+        block 策略下 timeout 秒内仍没有空位时抛出 queue.Full，timeout 为 None 时一直等待
+        """
+        if self.policy == "coalesce" and item is not None:
+            self._put_coalesced(item)
+        elif self.policy == "drop_oldest":
+            self._put_drop_oldest(item)
+        else:
+            self._put_blocking(item, timeout)
+        self._record_depth()
+
+    def _put_drop_oldest(self, item):
+        while True:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            try:
+                self._queue.get_nowait()
+                self._dropped.value += 1
+                self._get_metrics()["dropped"].inc()
+                logger.bind(sample=50).warning(f"{self.name} is full ({self.maxsize}), dropped the oldest item")
+            except queue.Empty:
+                pass
+
+    def _put_blocking(self, item, timeout=None):
+        try:
+            self._queue.put(item, timeout=self.alarm_after if timeout is None else min(timeout, self.alarm_after))
+            return
+        except queue.Full:
+            if timeout is not None and timeout <= self.alarm_after:
+                raise
+        self._get_metrics()["blocked"].inc()
+        logger.warning(f"{self.name} is full ({self.maxsize}), producer blocked for {self.alarm_after:.1f}s")
+        start = time.monotonic()
+        remaining = None if timeout is None else max(0.0, timeout - self.alarm_after)
+        self._queue.put(item, timeout=remaining)
+        logger.info(f"{self.name} unblocked after {time.monotonic() - start + self.alarm_after:.1f}s")
+
+    def _put_coalesced(self, item):
+        self.flush()
+        if not self._pending:
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+        if self.coalesce_key is not None and isinstance(item, dict):
+            key = item.get(self.coalesce_key)
+        else:
+            key = repr(item)
+        merged = self._pending.get(key)
+        if merged is None:
+            merged = self._pending[key] = dict(item) if isinstance(item, dict) else {"item": item}
+            merged.setdefault("count", 1)
+        else:
+            merged["count"] += item.get("count", 1) if isinstance(item, dict) else 1
+        self._get_metrics()["coalesced"].inc()
+
+    def flush(self):
+        """coalesce 策略下尽量放入本进程中合并待发的事件，返回仍未放入的数量"""
+        for key in list(self._pending):
+            try:
+                self._queue.put_nowait(self._pending[key])
+            except queue.Full:
+                break
+            del self._pending[key]
+        return len(self._pending)
+
+    def get(self, block=True, timeout=None):
+        return self._queue.get(block, timeout)
+
+    def get_nowait(self):
+        return self._queue.get_nowait()
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def empty(self):
+        return self._queue.empty()
@@ -0,0 +1,292 @@
+import bisect
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from util import get_logger, resource_path
+
+logger = get_logger()
+
+# 本地指标端口，/metrics 为 Prometheus 文本格式，/metrics.json 为 JSON
+http_port = 9108
+# 周期性写入 JSONL 快照的文件和间隔（秒）
+snapshot_file = "metrics.jsonl"
+snapshot_interval = 10.0
+# 子进程上报指标的间隔（秒）
+report_interval = 1.0
+
+# 0.5 ~ 3 s 为直播延迟的调整范围，分得更细以便估算采集到发送延迟的分位数
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 2.5, 3.0, 5.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def snapshot(self):
+        return {"type": self.kind, "value": self.value}
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value):
+        self.value = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self):
+        return {"type": self.kind, "buckets": list(self.buckets), "counts": list(self.counts),
+                "sum": self.sum, "count": self.count}
+
+
+class MetricsRegistry:
+    """单个进程内的指标集合，按名称创建或取回计数器、仪表和直方图"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, factory):
+        metric = self._metrics.get(name)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(name, factory())
+        return metric
+
+    def counter(self, name):
+        return self._get(name, Counter)
+
+    def gauge(self, name):
+        return self._get(name, Gauge)
+
+    def histogram(self, name, buckets=LATENCY_BUCKETS):
+        return self._get(name, lambda: Histogram(buckets))
+
+    def snapshot(self):
+        with self._lock:
+            items = list(self._metrics.items())
+        return {name: metric.snapshot() for name, metric in items}
+
+
+_registry = None
+
+
+def get_registry():
+    """获取本进程的指标集合（与 get_logger 一样按进程单例）"""
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
+
+
+class MetricsReporter(threading.Thread):
+    """
+    子进程中的指标上报线程，定期把本进程指标快照放入进程间队列
+
+    Args:
+        metrics_queue: 父进程 MetricsAggregator 读取的 multiprocessing.Queue
+        process_name: 进程名，作为指标的 process 标签
+        stop_event: 停止事件，停止时会再上报一次最终快照
+    """
+
+    def __init__(self, metrics_queue, process_name, stop_event, interval=None):
+        super().__init__(name="MetricsReporter", daemon=True)
+        self.metrics_queue = metrics_queue
+        self.process_name = process_name
+        self.stop_event = stop_event
+        self.interval = interval or report_interval
+
+    def report(self):
+        try:
+            self.metrics_queue.put_nowait((self.process_name, time.time(), get_registry().snapshot()))
+        except Exception:
+            pass
+
+    def run(self):
+        # 不在 multiprocessing.Event 上 wait：本进程退出时仍在等待的线程会让其他进程的 set() 永久阻塞
+        while not self.stop_event.is_set():
+            time.sleep(self.interval)
+            self.report()
+        self.report()
+
+
+def start_metrics_reporter(metrics_queue, process_name, stop_event):
+    """
+    metrics_queue 为 None 时不上报，返回 None
+
+    当前进程名为 "<process_name>-<n>"（多路运行时的第 n 路）时以该名称上报，各路指标分开汇总。
+    """
+    if metrics_queue is None:
+        return None
+    current = multiprocessing.current_process().name
+    if current.startswith(process_name + "-"):
+        process_name = current
+    reporter = MetricsReporter(metrics_queue, process_name, stop_event)
+    reporter.start()
+    return reporter
+
+
+def histogram_quantile(snapshot, q):
+    """按桶线性插值估算直方图分位数，q 取 0~1"""
+    total = snapshot["count"]
+    if not total:
+        return 0.0
+    rank = q * total
+    cumulative = 0
+    lower = 0.0
+    for upper, count in zip(snapshot["buckets"] + [float("inf")], snapshot["counts"]):
+        if cumulative + count >= rank and count:
+            if upper == float("inf"):
+                return lower
+            return lower + (upper - lower) * (rank - cumulative) / count
+        cumulative += count
+        lower = upper
+    return lower
+
+
+class MetricsAggregator:
+    """
+    父进程中的指标汇总
+
+    接收各子进程上报的累计快照（每个进程保留最新一份），通过本地 HTTP 端点
+    暴露 Prometheus 文本格式（/metrics）和 JSON（/metrics.json），并定期把
+    JSON 快照追加到 JSONL 文件。
+
+    Args:
+        metrics_queue: 子进程上报使用的 multiprocessing.Queue
+        port: HTTP 端口，为 None 时不启动 HTTP 服务
+        jsonl_path: JSONL 快照文件，为 None 时不写文件
+    """
+
+    def __init__(self, metrics_queue, port=None, jsonl_path=None, interval=None):
+        self.metrics_queue = metrics_queue
+        self.port = http_port if port is None else port
+        self.jsonl_path = jsonl_path if jsonl_path is not None else resource_path(snapshot_file)
+        self.interval = interval or snapshot_interval
+        self._latest = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._server = None
+
+    def start(self):
+        threading.Thread(target=self._collect, name="MetricsCollector", daemon=True).start()
+        threading.Thread(target=self._write_snapshots, name="MetricsSnapshot", daemon=True).start()
+        if self.port:
+            # http.server 只在汇总指标的主进程中用到，不在各子进程导入时加载
+            from http.server import ThreadingHTTPServer
+            try:
+                self._server = ThreadingHTTPServer(("127.0.0.1", self.port), self._handler())
+                threading.Thread(target=self._server.serve_forever, name="MetricsHTTP", daemon=True).start()
+                logger.info(f"Metrics endpoint: http://127.0.0.1:{self.port}/metrics")
+            except OSError as e:
+                logger.error(f"Failed to start metrics endpoint on port {self.port}: {e}")
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def _collect(self):
+        while not self._stopped.is_set():
+            try:
+                process_name, ts, snapshot = self.metrics_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                self._latest[process_name] = {"time": ts, "metrics": snapshot}
+
+    def snapshot(self):
+        """返回 {进程名: {"time": 上报时间, "metrics": {...}}}，直方图附带 p50/p99 估算"""
+        with self._lock:
+            latest = json.loads(json.dumps(self._latest))
+        for proc in latest.values():
+            for metric in proc["metrics"].values():
+                if metric["type"] == "histogram":
+                    metric["p50"] = histogram_quantile(metric, 0.5)
+                    metric["p99"] = histogram_quantile(metric, 0.99)
+        return latest
+
+    def prometheus_text(self):
+        with self._lock:
+            latest = {name: proc["metrics"] for name, proc in self._latest.items()}
+        by_metric = {}
+        for process_name, metrics in latest.items():
+            for name, metric in metrics.items():
+                by_metric.setdefault(name, []).append((process_name, metric))
+        lines = []
+        for name in sorted(by_metric):
+            series = by_metric[name]
+            lines.append(f"# TYPE {name} {series[0][1]['type']}")
+            for process_name, metric in series:
+                label = f'process="{process_name}"'
+                if metric["type"] == "histogram":
+                    cumulative = 0
+                    for upper, count in zip(metric["buckets"], metric["counts"]):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{label},le="{upper}"}} {cumulative}')
+                    lines.append(f'{name}_bucket{{{label},le="+Inf"}} {metric["count"]}')
+                    lines.append(f"{name}_sum{{{label}}} {metric['sum']}")
+                    lines.append(f"{name}_count{{{label}}} {metric['count']}")
+                else:
+                    lines.append(f"{name}{{{label}}} {metric['value']}")
+        return "\n".join(lines) + "\n"
+
+    def _write_snapshots(self):
+        while not self._stopped.wait(self.interval):
+            if not self.jsonl_path or not self._latest:
+                continue
+            try:
+                with open(self.jsonl_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"time": time.time(), "processes": self.snapshot()}, ensure_ascii=False) + "\n")
+            except OSError as e:
+                logger.error(f"Failed to write metrics snapshot: {e}")
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+        aggregator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body = aggregator.prometheus_text().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body = json.dumps(aggregator.snapshot(), ensure_ascii=False).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
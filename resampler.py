@@ -0,0 +1,114 @@
+from math import gcd
+import numpy as np
+
+# (up, down, taps_per_phase) -> 多相滤波器组，同一进程内所有重采样器共享
+_filter_banks = {}
+
+
+def polyphase_filter_bank(up, down, taps_per_phase=16, beta=8.0):
+    """
+    设计 Kaiser 窗 sinc 低通原型滤波器并拆分为 up 个相位
+
+    Returns:
+        形状为 (up, taps_per_phase) 的 float32 数组，bank[p, k] = h[p + k * up]
+    """
+    key = (up, down, taps_per_phase)
+    bank = _filter_banks.get(key)
+    if bank is None:
+        num_taps = taps_per_phase * up
+        # 截止频率取输入/输出奈奎斯特频率中较低者，并留出 5% 过渡带
+        cutoff = 0.95 / max(up, down)
+        n = np.arange(num_taps) - (num_taps - 1) / 2
+        h = cutoff * np.sinc(cutoff * n) * np.kaiser(num_taps, beta)
+        bank = h.reshape(taps_per_phase, up).T.copy()
+        # 每个相位单独归一化为单位直流增益，避免输出出现周期性纹波
+        bank /= bank.sum(axis=1, keepdims=True)
+        bank = bank.astype(np.float32)
+        _filter_banks[key] = bank
+    return bank
+
+
+class StreamResampler:
+    """
+    有状态的流式多相重采样器
+
+    块与块之间保留滤波器历史和相位，连续送入的音频块重采样后首尾相接，
+    不会在块边界产生断点。每种输入块长度对应的采样索引和相位系数会被缓存，
+    输出写入可复用的缓冲区。
+
+    Args:
+        input_rate: 输入采样率
+        output_rate: 输出采样率
+        taps_per_phase: 每个相位的滤波器抽头数
+    """
+
+    def __init__(self, input_rate, output_rate, taps_per_phase=16):
+        g = gcd(int(input_rate), int(output_rate))
+        self.up = int(output_rate) // g
+        self.down = int(input_rate) // g
+        self.taps = taps_per_phase
+        self.bank = polyphase_filter_bank(self.up, self.down, taps_per_phase)
+        # 下一个输出采样在上采样域中的位置，相对于当前块第一个输入采样
+        self._t = 0
+        self._ext = np.zeros(0, dtype=np.float32)
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._out = np.zeros((0, self.up), dtype=np.float32)
+        # (块长度, 起始位置) -> 计算计划
+        self._plans = {}
+
+    def _plan(self, n):
+        """
+        输出按 up 个一组排列：第 q 组第 j 个输出只依赖 ext[q * down + w]，
+        于是整块重采样可以写成 帧矩阵(rows × width) @ 系数矩阵(width × up) 的一次矩阵乘法
+        """
+        key = (n, self._t)
+        plan = self._plans.get(key)
+        if plan is None:
+            up, down, taps = self.up, self.down, self.taps
+            count = max(0, -(-(up * n - self._t) // down))
+            t = self._t + down * np.arange(up, dtype=np.int64)
+            offsets = t // up
+            phases = t % up
+            width = int(offsets.max()) + taps
+            coeffs = np.zeros((width, up), dtype=np.float32)
+            for j in range(up):
+                # ext 中第 offsets[j] + taps - 1 - k 个采样乘以第 k 个抽头
+                coeffs[offsets[j] + taps - 1 - np.arange(taps), j] = self.bank[phases[j]]
+            rows = -(-count // up)
+            plan = (count, rows, width, coeffs, self._t + down * count - up * n)
+            if len(self._plans) > 16:
+                self._plans.clear()
+            self._plans[key] = plan
+        return plan
+
+    def process(self, samples):
+        """
+        重采样一个音频块
+
+        Returns:
+            输出缓冲区的视图，下次调用 process 时会被覆盖
+        """
+        if self.up == self.down:
+            return np.asarray(samples, dtype=np.float32)
+        n = len(samples)
+        history = self.taps - 1
+        count, rows, width, coeffs, next_t = self._plan(n)
+        # ext = 上一块末尾的历史采样 + 本块采样 + 末尾补零（只被丢弃的输出使用）
+        ext_len = max(history + n, (rows - 1) * self.down + width if rows else 0)
+        if len(self._ext) < ext_len:
+            self._ext = np.zeros(ext_len, dtype=np.float32)
+        ext = self._ext
+        ext[:history] = self._history
+        ext[history:history + n] = samples
+        ext[history + n:] = 0
+        self._history[:] = ext[n:n + history]
+        if len(self._out) < rows:
+            self._out = np.empty((rows, self.up), dtype=np.float32)
+        out = self._out[:rows]
+        if rows:
+            frames = np.lib.stride_tricks.as_strided(ext, shape=(rows, width),
+                                                     strides=(self.down * ext.itemsize, ext.itemsize),
+                                                     writeable=False)
+            np.matmul(frames, coeffs, out=out)
+        self._t = next_t
+        return out.reshape(-1)[:count]
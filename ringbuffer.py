@@ -0,0 +1,245 @@
+import threading
+from collections import deque
+import numpy as np
+
+
+class AudioRingBuffer:
+    """
+    预分配的单生产者/单消费者 float32 环形缓冲区
+
+    PortAudio 回调线程调用 `write` 写入采样，处理线程调用 `read_into` 读出到
+    调用方提供的缓冲区，整个过程不产生按块的内存分配。
+
+    计数器:
+        overflows: 读取跟不上写入时被覆盖丢弃的采样数
+        underruns: `read_into` 等待超时的次数
+        input_overflows: PortAudio 报告 paInputOverflow 的回调次数（驱动层丢采样）
+
+    Args:
+        capacity: 缓冲区容量（采样数）
+        clock: 可选的 mediaclock.SampleClock，每次写入后记录累计采样数和到达时刻
+    """
+
+    def __init__(self, capacity, dtype=np.float32, clock=None):
+        self.capacity = int(capacity)
+        self._buf = np.zeros(self.capacity, dtype=dtype)
+        # 累计写入/读取的采样数，取模后即为环内位置
+        self._written = 0
+        self._read = 0
+        self._cond = threading.Condition()
+        self.overflows = 0
+        self.underruns = 0
+        self.input_overflows = 0
+        self.clock = clock
+
+    @property
+    def samples_written(self):
+        return self._written
+
+    @property
+    def samples_read(self):
+        return self._read
+
+    def available(self):
+        return self._written - self._read
+
+    def write(self, samples):
+        n = len(samples)
+        if n > self.capacity:
+            # 单次写入超过容量时只保留最新的部分
+            self.overflows += n - self.capacity
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        start = self._written % self.capacity
+        first = min(n, self.capacity - start)
+        self._buf[start:start + first] = samples[:first]
+        if first < n:
+            self._buf[:n - first] = samples[first:]
+        with self._cond:
+            self._written += n
+            lost = self._written - self._read - self.capacity
+            if lost > 0:
+                # 消费者落后超过一整圈，最旧的采样已被覆盖
+                self.overflows += lost
+                self._read += lost
+            self._cond.notify()
+        if self.clock is not None:
+            self.clock.observe(self._written)
+
+    def read_into(self, out, timeout=None):
+        """
+        阻塞直到缓冲区中有 len(out) 个采样，然后复制到 out
+
+        Returns:
+            成功读取返回 True，超时返回 False
+        """
+        n = len(out)
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._written - self._read >= n, timeout):
+                self.underruns += 1
+                return False
+            start = self._read % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._buf[start:start + first]
+            if first < n:
+                out[first:] = self._buf[:n - first]
+            self._read += n
+        return True
+
+
+class JitterBuffer:
+    """
+    按 PTS 输出的音频抖动缓冲区
+
+    发送线程调用 `push` 写入带 PTS 的采样块，PortAudio 输出回调调用 `pull` 按设备周期取出采样。
+    `pull` 根据本周期第一个采样实际播放的时刻 play_t 与缓冲区头部采样的 PTS 比较：
+
+    - 偏差在 correction_threshold 内：连续输出
+    - 偏差超过 correction_threshold：每个周期丢弃或重复一个采样，逐渐消除声卡时钟与系统时钟的频偏
+    - 头部采样的 PTS 还没到（超过 max_error，或缓冲区读空后重新开始输出时）：先输出静音等到 PTS，不提前播放
+    - 头部采样已过期（超过 max_error，或重新开始输出时）：丢弃过期采样
+    - 缓冲区中没有数据：补静音并记一次欠载
+
+    计数器:
+        underruns: 因缺少数据补静音的周期数（流开始前和结束后不计）
+        underrun_samples: 补入的静音采样数
+        late_samples: 因过期丢弃的采样数
+        corrections: 为跟随时钟丢弃或重复的采样数
+        error: 最近一次 pull 时 play_t 与头部 PTS 之差（秒），为正表示输出落后
+
+    Args:
+        rate: 采样率
+        capacity_seconds: 缓冲区容量
+        max_error: 超过该偏差（秒）时直接跳过或等待
+        correction_threshold: 超过该偏差（秒）时逐采样修正
+    """
+
+    def __init__(self, rate, capacity_seconds=3.0, max_error=0.04, correction_threshold=0.002):
+        self.rate = rate
+        self.capacity = int(capacity_seconds * rate)
+        self.max_error = max_error
+        self.correction_threshold = correction_threshold
+        self._buf = np.zeros(self.capacity, dtype=np.float32)
+        self._written = 0
+        self._read = 0
+        # (起始采样序号, PTS)，每个 push 的块一个，PTS 不连续的块之间分别对齐
+        self._markers = deque()
+        self._lock = threading.Lock()
+        self._active = False
+        # 读空后重新开始输出时直接对齐到 PTS，连续输出期间只逐采样修正
+        self._aligned = False
+        self.underruns = 0
+        self.underrun_samples = 0
+        self.late_samples = 0
+        self.overflows = 0
+        self.corrections = 0
+        self.error = 0.0
+
+    def available(self):
+        return self._written - self._read
+
+    def push(self, samples, pts):
+        """写入一块采样，pts 为第一个采样的呈现时刻；缓冲区满时丢弃最旧的采样"""
+        samples = np.asarray(samples, dtype=np.float32)
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self.capacity:
+            pts += (n - self.capacity) / self.rate
+            samples = samples[-self.capacity:]
+            n = self.capacity
+        with self._lock:
+            start = self._written % self.capacity
+            first = min(n, self.capacity - start)
+            self._buf[start:start + first] = samples[:first]
+            if first < n:
+                self._buf[:n - first] = samples[first:]
+            self._markers.append((self._written, pts))
+            self._written += n
+            lost = self._written - self._read - self.capacity
+            if lost > 0:
+                self.overflows += lost
+                self._skip(lost)
+            self._active = True
+
+    def _head_pts(self):
+        """读位置采样的 PTS，以及当前块剩余的采样数"""
+        while len(self._markers) > 1 and self._markers[1][0] <= self._read:
+            self._markers.popleft()
+        index, pts = self._markers[0]
+        end = self._markers[1][0] if len(self._markers) > 1 else self._written
+        return pts + (self._read - index) / self.rate, end - self._read
+
+    def _skip(self, n):
+        self._read += n
+        if self._read >= self._written:
+            self._markers.clear()
+
+    def _copy(self, out, n):
+        start = self._read % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self._buf[start:start + first]
+        if first < n:
+            out[first:n] = self._buf[:n - first]
+        self._skip(n)
+
+    def pull(self, out, play_t):
+        """
+        按呈现时刻填满 out，play_t 为 out[0] 实际播放的时刻
+
+        Returns:
+            out 中来自缓冲区（非补静音）的采样数
+        """
+        n = len(out)
+        filled = 0
+        delivered = 0
+        corrected = False
+        with self._lock:
+            while filled < n:
+                if self._read >= self._written:
+                    out[filled:] = 0
+                    self._aligned = False
+                    if self._active:
+                        self.underruns += 1
+                        self.underrun_samples += n - filled
+                    break
+                head_pts, block_left = self._head_pts()
+                error = play_t + filled / self.rate - head_pts
+                self.error = error
+                limit = self.max_error if self._aligned else self.correction_threshold
+                if error > limit:
+                    # 头部采样已过期，丢弃到当前时刻（不超过当前块）
+                    skip = min(block_left, max(1, round(error * self.rate)))
+                    self.late_samples += skip
+                    self._skip(skip)
+                    continue
+                if error < -limit:
+                    # 还没到头部采样的 PTS，本周期剩余部分（或到 PTS 为止）输出静音
+                    wait = min(n - filled, max(1, round(-error * self.rate)))
+                    out[filled:filled + wait] = 0
+                    filled += wait
+                    # 等待跨越周期时，下个周期仍要等到 PTS 再对齐，而不是按 max_error 提前播放
+                    self._aligned = False
+                    continue
+                if not corrected and abs(error) > self.correction_threshold:
+                    corrected = True
+                    self.corrections += 1
+                    if error > 0:
+                        # 输出落后：丢弃一个采样
+                        self._skip(1)
+                        continue
+                    # 输出超前：重复上一个输出的采样
+                    out[filled] = out[filled - 1] if filled else self._buf[self._read % self.capacity]
+                    filled += 1
+                    continue
+                m = min(n - filled, block_left)
+                self._aligned = True
+                self._copy(out[filled:], m)
+                filled += m
+                delivered += m
+        return delivered
+
+    def finish(self):
+        """流结束：之后缓冲区读空不再计为欠载"""
+        with self._lock:
+            self._active = False
@@ -3,24 +3,36 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkinter import font as tkFont
 import threading
-import pyaudio
-from multiprocessing import Process, Queue, Event 
-from util import get_logger
+import queue
+import importlib.util
+from multiprocessing import Process, Queue, Event, Value
+from util import get_logger, get_log_channel, set_log_level
 import time
 import os
 import sys
-import torch 
-import cv2
 from filterprocess import (
     process_capture_audio,
+    AudioCaptureConfig,
     process_send_audio_frames,
     process_capture_video_frames,
     process_send_video_frames,
-    init_audio_mic,
-    init_audio_output,
-    init_video_cam
+    delay_t,
+    video_transport,
+    video_ring_seconds,
+    log_frame_ring,
+    asr_chunk_ms,
+    make_audio_queue,
+    make_video_queue,
+    make_record_queue,
 )
-from util import  load_sensitive_words, AudioReplaceType
+from mediaio import init_audio_mic, init_audio_output, init_video_cam
+from framering import SharedFrameRing
+from startgate import StartGate
+from mediaclock import MediaClock
+from deviceprobe import DeviceProber, probe_camera_formats
+from asrserver import ASRService
+from metrics import MetricsAggregator
+from util import  load_sensitive_words, AudioReplaceType, MatchMode
 
 
 
@@ -32,17 +44,8 @@ except Exception as e:
     WHISPER_AVAILABLE = False
     WHISPER_ERROR = str(e)
 
-# 检测 GPU
-try:
-    CUDA_AVAILABLE = torch.cuda.is_available()
-except ImportError:
-    CUDA_AVAILABLE = False
-
-# 添加OpenCV导入用于视频处理
-try:
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
+# 只检查 OpenCV 是否安装，实际导入在视频进程中进行；GPU 由识别服务进程检测（见 poll_asr_ready）
+CV2_AVAILABLE = importlib.util.find_spec("cv2") is not None
  
 logger = get_logger()
 
@@ -64,8 +67,8 @@ class VoiceFilterApp:
         self.root.title("消禁腾")
 
         # Calculate new dimensions: increase height by 20%
-        original_height = 550
-        new_height = int(original_height * 1.2)  # 660 pixels
+        original_height = 600
+        new_height = int(original_height * 1.2)  # 720 pixels
         x = (self.root.winfo_screenwidth() // 2) - (480 // 2)
         y = (self.root.winfo_screenheight() // 2) - (new_height // 2)  # Adjusted for new height
         self.root.geometry(f"480x{new_height}+{x}+{y}")  # Updated geometry
@@ -88,10 +91,6 @@ class VoiceFilterApp:
         self.root.update()  # Force the window to display the loading message
         
         logger.info("Voice Filter App started")
-        if CUDA_AVAILABLE:
-            logger.info(f"CUDA is available. Using GPU: {torch.cuda.get_device_name(0)}")
-        else:
-            logger.info("CUDA is not available. Using CPU.")
         
         self.is_running = False
         self.caption_running = False
@@ -101,7 +100,15 @@ class VoiceFilterApp:
         self.video_processes = None
         self.process_thread = None
 
+        import pyaudio
         self.p = pyaudio.PyAudio()
+        # 各子进程上报的性能指标在此汇总，通过本地 HTTP 端点和 JSONL 快照输出
+        self.metrics_queue = Queue()
+        self.metrics_aggregator = MetricsAggregator(self.metrics_queue).start()
+        # 识别模型常驻在单独的进程中，程序启动时即开始加载并预热，多次启动/停止过滤都复用同一份模型
+        self.asr_stop_event = Event()
+        self.asr_service = ASRService(1, chunk_size=(0, asr_chunk_ms // 60, asr_chunk_ms // 120))
+        self.asr_service.start(self.asr_stop_event, self.metrics_queue, get_log_channel())
      
         # Add mute option variable
         self.mute_option = tk.StringVar(value="silence")  # Default to silence
@@ -109,93 +116,97 @@ class VoiceFilterApp:
         self.create_widgets()
         
 
-    def get_devices(self, kind='input'):
-        devices = []
-        for i in range(self.p.get_device_count()):
-            dev = self.p.get_device_info_by_index(i)
-      
-            if kind == 'input' and dev['maxInputChannels'] > 0:
-                tmp_d = init_audio_mic(i,self.p)
-                if tmp_d:
-                    tmp_d.close()
-                    devices.append((i, dev['name']))
-            elif kind == 'output' and dev['maxOutputChannels'] > 0:
-                devices.append((i, dev['name']))
-        return devices
-
-    # 添加摄像头检测方法
-    def get_camera_devices(self):
-        """检测可用的摄像头设备"""
-        if not CV2_AVAILABLE:
-            return []
-            
-        cameras = []
-        cameras = self.get_camera_devices_windows()
-        if cameras:  # 如果有摄像头，则返回
-            return cameras
-        for i in range(10):  # 检测前10个摄像头
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, _ = cap.read()
-                if ret:
-                    cameras.append((i, f"摄像头 {i}"))
-                cap.release()
-        return cameras
-    
-    def get_camera_devices_windows(self):
-        # 1. 用 pygrabber 获取真实名称列表（基于 DirectShow）
-        try:
-            from pygrabber.dshow_graph import FilterGraph
-            device_names = FilterGraph().get_input_devices()
-        except Exception as e:
-            logger.error("Failed to get camera names:", e)
-            device_names = []
-
-        cameras = []
-        # 2. 用 CAP_DSHOW 后端逐个测试
-        for i in range(len(device_names)):
-            cap = cv2.VideoCapture(i, cv2.CAP_DSHOW)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                name = device_names[i] if i < len(device_names) else f"Unknown Camera {i}"
-                if ret and frame is not None and frame.size > 0:
-                    cameras.append((i, name))
-                cap.release()
-        return cameras
-
-    # 新增函数：获取摄像头支持的分辨率和FPS
+    # 获取摄像头支持的分辨率和FPS
     def get_camera_formats(self, device_index):
-        """获取指定摄像头支持的分辨率和FPS"""
-        try:
-            from pygrabber.dshow_graph import FilterGraph
-            graph = FilterGraph()
-            devices = graph.get_input_devices()
-            
-            if device_index >= len(devices):
-                return []
-                
-            # 设置该设备为当前输入源
-            graph.add_video_input_device(device_index)
-            
-            # 获取该设备支持的所有格式
-            formats = graph.get_input_device().get_formats()
-            # 提取唯一的分辨率和FPS组合
-            device_info = set()
-            fps = 0
-            for fmt in formats:
-                width = fmt.get('width', 0)
-                height = fmt.get('height', 0)
-                fps = fmt.get('max_framerate', 30)
-                device_info.add( 
-                        f"{width}x{height}"
-                     )
-            # 返回去重后的格式列表
-            # 修改:按分辨率从大到小排序
-            sorted_resolutions = sorted(list(device_info), key=lambda x: int(x.split('x')[0]) * int(x.split('x')[1]), reverse=True)
-            return sorted_resolutions, int(fps)
-        except Exception as e:
-            logger.error(f"Failed to get camera formats: {e}")
-            return []
+        """获取指定摄像头支持的分辨率（从大到小）和FPS，优先使用后台探测时缓存的结果"""
+        info = self.camera_info.get(device_index)
+        if not info or not info.get("formats"):
+            info = probe_camera_formats(device_index)
+        return info.get("formats", []), info.get("fps", 30)
+
+    def start_device_probe(self, force=False):
+        """在后台线程中探测音视频设备，结果逐条填入下拉框（见 deviceprobe.py）"""
+        self.input_names, self.input_idx_map = [], {}
+        self.output_devices, self.output_names, self.output_idx_map = [], [], {}
+        self.camera_names, self.camera_idx_map, self.camera_info = [], {}, {}
+        combos = [self.input_combo, self.output_combo] + ([self.camera_combo] if CV2_AVAILABLE else [])
+        for combo in combos:
+            combo['values'] = []
+            combo.set("检测中...")
+        # 探测完成前不能启动过滤
+        self.start_btn.config(state='disabled')
+        self.refresh_btn.config(state='disabled')
+        self.device_prober = DeviceProber(self.p, probe_cameras=CV2_AVAILABLE).start(force)
+        self.root.after(50, self.poll_device_probe)
+
+    def poll_device_probe(self):
+        """在界面线程中取出探测结果并更新下拉框"""
+        while True:
+            try:
+                kind, index, name, info = self.device_prober.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "input" and info:
+                label = f"{index}_{name}"
+                self.input_names.append(label)
+                self.input_idx_map[label] = index
+                self.input_combo['values'] = self.input_names
+                if len(self.input_names) == 1:
+                    self.input_combo.current(0)
+            elif kind == "output":
+                self.output_devices.append((index, name))
+                self.output_idx_map[name] = index
+                # 优先 VB-Cable，没有时列出所有输出设备
+                vb_devices = [n for _, n in self.output_devices if 'CABLE' in n.upper()]
+                names = vb_devices or [n for _, n in self.output_devices]
+                if names != self.output_names:
+                    selected = self.output_combo.get()
+                    self.output_names = names
+                    self.output_combo['values'] = names
+                    self.output_combo.current(names.index(selected) if selected in names else 0)
+            elif kind == "camera" and info.get("ok"):
+                self.camera_info[index] = info
+                self.camera_idx_map[name] = index
+                self.camera_names = sorted(self.camera_idx_map, key=self.camera_idx_map.get)
+                self.camera_combo['values'] = self.camera_names
+                if len(self.camera_names) == 1:
+                    self.camera_combo.current(0)
+                    self.update_resolution_options(index)
+            elif kind == "done":
+                combos = [self.input_combo, self.output_combo] + ([self.camera_combo] if CV2_AVAILABLE else [])
+                for combo in combos:
+                    if not combo['values']:
+                        combo.set("")
+                if not self.is_running and not self.asr_unavailable():
+                    self.start_btn.config(state='normal')
+                self.refresh_btn.config(state='normal')
+                return
+        self.root.after(50, self.poll_device_probe)
+
+    def asr_unavailable(self):
+        """识别模型加载失败或服务进程已退出；此时不能启动过滤，否则音频会不经过滤直接输出"""
+        return self.asr_service.failed.is_set() or not self.asr_service.process.is_alive()
+
+    def poll_asr_ready(self):
+        """识别服务就绪后显示模型所在设备；加载失败时禁用启动按钮"""
+        if self.asr_service.failed.is_set():
+            self.asr_device_label.config(text="❌ 语音识别模型加载失败", fg="red")
+            self.start_btn.config(state='disabled')
+            return
+        if not self.asr_service.ready.is_set():
+            if self.asr_service.process.is_alive():
+                self.root.after(100, self.poll_asr_ready)
+            else:
+                self.asr_device_label.config(text="❌ 语音识别服务已退出", fg="red")
+                self.start_btn.config(state='disabled')
+            return
+        device = self.asr_service.device or "cpu"
+        if device.startswith("cuda"):
+            logger.info(f"ASR model ready on GPU: {device}")
+            self.asr_device_label.config(text="✅ 使用 GPU 进行语音识别", fg="green")
+        else:
+            logger.info(f"ASR model ready on {device}")
+            self.asr_device_label.config(text="⚠️ 使用 CPU 进行语音识别", fg="orange")
 
     def create_widgets(self):
         # Clear any existing widgets (in case of reload)
@@ -211,44 +222,27 @@ class VoiceFilterApp:
             status.pack(pady=(0,10))
             return
 
-        device_info = "✅ 使用 GPU 进行语音识别" if CUDA_AVAILABLE else "⚠️ 使用 CPU 进行语音识别"
-        color = "green" if CUDA_AVAILABLE else "orange"
-        tk.Label(self.root, text=device_info, fg=color).pack()
+        # 识别设备在识别服务加载完模型后才能确定
+        self.asr_device_label = tk.Label(self.root, text="⏳ 语音识别模型加载中...", fg="gray")
+        self.asr_device_label.pack()
+        self.root.after(100, self.poll_asr_ready)
 
-        # 输入设备
+        # 输入设备，设备列表由 start_device_probe 在后台探测后填入
         tk.Label(self.root, text="输入设备（麦克风）:", anchor='w').pack(fill='x', padx=20, pady=(10,0))
-        input_devices = self.get_devices('input')
-        self.input_names = [f"{i}_{name}" for i, name in input_devices]
-        self.input_idx_map = {f"{idx}_{name}": idx for idx, name in input_devices}
-        self.input_combo = ttk.Combobox(self.root, values=self.input_names, state="readonly")
-        if self.input_names:
-            self.input_combo.current(0)
+        self.input_combo = ttk.Combobox(self.root, state="readonly")
         self.input_combo.pack(fill='x', padx=20, pady=5)
 
         # 输出设备（优先 VB-Cable）
         tk.Label(self.root, text="输出设备（推荐 VB-Cable）:", anchor='w').pack(fill='x', padx=20, pady=(10,0))
-        output_devices = self.get_devices('output')
-        vb_devices = [name for _, name in output_devices if 'CABLE' in name.upper()]
-        if not vb_devices:
-            vb_devices = [name for _, name in output_devices]
-        self.output_names = vb_devices
-        self.output_idx_map = {name: idx for idx, name in output_devices}
-        self.output_combo = ttk.Combobox(self.root, values=self.output_names, state="readonly")
-        if self.output_names:
-            self.output_combo.current(0)
+        self.output_combo = ttk.Combobox(self.root, state="readonly")
         self.output_combo.pack(fill='x', padx=20, pady=5)
 
         # 视频输入设备选择（新增）
         if CV2_AVAILABLE:
             tk.Label(self.root, text="视频输入设备:", anchor='w').pack(fill='x', padx=20, pady=(10,0))
-            camera_devices = self.get_camera_devices()
-            self.camera_names = [name for _, name in camera_devices]
-            self.camera_idx_map = {name: idx for idx, name in camera_devices}
-            self.camera_combo = ttk.Combobox(self.root, values=self.camera_names, state="readonly")
-            if self.camera_names:
-                self.camera_combo.current(0)
-                # 绑定选择事件，当选中摄像头时更新分辨率选项
-                self.camera_combo.bind('<<ComboboxSelected>>', self.on_camera_selected)
+            self.camera_combo = ttk.Combobox(self.root, state="readonly")
+            # 绑定选择事件，当选中摄像头时更新分辨率选项
+            self.camera_combo.bind('<<ComboboxSelected>>', self.on_camera_selected)
             self.camera_combo.pack(fill='x', padx=20, pady=5)
             
             # 视频分辨率和FPS选择（拆分为两个独立的下拉框）
@@ -259,10 +253,6 @@ class VoiceFilterApp:
             tk.Label(self.root, text="视频FPS:", anchor='w').pack(fill='x', padx=20, pady=(10,0))
             self.fps_combo = ttk.Combobox(self.root, state="readonly")
             self.fps_combo.pack(fill='x', padx=20, pady=5)
-            
-            # 初始化分辨率和FPS选项
-            if self.camera_names:
-                self.update_resolution_options(0)
  
 
         # 添加消音选项区域
@@ -278,6 +268,15 @@ class VoiceFilterApp:
         
         # 创建映射字典，用于获取实际值
         self.mute_option_map = dict(zip(mute_options_display, mute_options_values))
+
+        # 敏感词匹配模式
+        tk.Label(self.root, text="匹配模式:", anchor='w').pack(fill='x', padx=20, pady=(10, 0))
+        match_modes_display = ["精确匹配", "拼音/谐音匹配"]
+        match_modes_values = [MatchMode.EXACT.value, MatchMode.PHONETIC.value]
+        self.match_mode_combo = ttk.Combobox(self.root, values=match_modes_display, state="readonly")
+        self.match_mode_combo.set("精确匹配")
+        self.match_mode_combo.pack(fill='x', padx=20, pady=5)
+        self.match_mode_map = dict(zip(match_modes_display, match_modes_values))
         
         # 添加导入敏感词按钮和启动过滤按钮，水平排列
         buttons_frame = tk.Frame(self.root)
@@ -286,6 +285,18 @@ class VoiceFilterApp:
         self.start_btn = tk.Button(buttons_frame, text="▶ 启动过滤", command=self.toggle_process, width=15, height=2)
         self.start_btn.pack(side=tk.LEFT, padx=(5, 0))
 
+        # 重新探测所有设备（忽略缓存），用于插拔设备后或缓存结果过期时
+        self.refresh_btn = tk.Button(buttons_frame, text="刷新设备", command=lambda: self.start_device_probe(force=True))
+        self.refresh_btn.pack(side=tk.LEFT, padx=(5, 0))
+
+        # 日志级别，运行中修改对所有进程立即生效
+        tk.Label(buttons_frame, text="日志:").pack(side=tk.LEFT, padx=(15, 0))
+        self.log_level_combo = ttk.Combobox(buttons_frame, values=["DEBUG", "INFO", "WARNING", "ERROR"],
+                                            state="readonly", width=9)
+        self.log_level_combo.set("DEBUG")
+        self.log_level_combo.bind('<<ComboboxSelected>>', lambda event: set_log_level(self.log_level_combo.get()))
+        self.log_level_combo.pack(side=tk.LEFT, padx=(5, 0))
+
         # 状态栏
         self.status_frame = tk.Frame(self.root)
         self.status_frame.pack(pady=5)
@@ -307,6 +318,9 @@ class VoiceFilterApp:
         # 底部提示
         hint = tk.Label(self.root, text="使用前请安装 VB-Cable\n直播软件中选择 'CABLE Input' 作为麦克风", fg="gray")
         hint.pack(side='bottom', pady=(0,10))
+
+        # 窗口先显示出来，设备在后台探测
+        self.start_device_probe()
     def toggle_process(self):
         if not self.is_running:
             self.start_process()
@@ -314,6 +328,10 @@ class VoiceFilterApp:
             self.stop_process()
     def start_process(self):
         # 占位函数：启动处理流程
+        if self.asr_unavailable():
+            messagebox.showerror("错误", "语音识别模型不可用，无法启动过滤")
+            logger.error("ASR model is unavailable, not starting")
+            return
         try:
             input_name = self.input_combo.get()
             output_name = self.output_combo.get()
@@ -378,7 +396,7 @@ class VoiceFilterApp:
             time.sleep(0.1)
             
         # Reset button to initial state
-        self.start_btn.config(text="▶ 启动过滤", state='normal', fg="black")
+        self.start_btn.config(text="▶ 启动过滤", state='disabled' if self.asr_unavailable() else 'normal', fg="black")
         logger.info("Process stopped")
 
     def check_device_available(self,audio_input_device_index, camera_idx,w,h,fps):
@@ -441,16 +459,18 @@ class VoiceFilterApp:
             return
               
         # 初始化队列
-        self.audio_queue = Queue()
-        video_queue = Queue()  # Changed to PriorityQueue for better ordering
-        audio_queue = Queue()
-        record_queue = Queue()
+        # 有界队列：发送端卡住时视频丢弃最旧的帧，音频阻塞采集端并告警，敏感词事件合并计数
+        video_queue = make_video_queue(int(selected_fps))
+        audio_queue = make_audio_queue()
+        record_queue = make_record_queue()
         # Reset the is_running flag in claude_plan before starting threads
         stop_event.clear()
-        start_time = time.time() + 10.0
-        # 创建敏感词集合
-        sensitive_set = load_sensitive_words()
-        logger.info(f"load sensitive words success,words size : {len(sensitive_set)}")
+        launch_t = time.time()
+        # 各进程初始化完成后报告就绪，全部就绪后统一开始（代替固定等待 10 s）
+        start_gate = StartGate(4 if CV2_AVAILABLE else 2)
+        # 创建敏感词匹配自动机
+        sensitive_matcher = load_sensitive_words(self.match_mode_map[self.match_mode_combo.get()])
+        logger.info(f"load sensitive words success,words size : {len(sensitive_matcher)}")
         # 创建音频处理进程，使用从claude_plan导入的函数
         self.audio_processes = []
         # 获取选中的消音选项
@@ -458,11 +478,19 @@ class VoiceFilterApp:
         selected_mute_option = self.mute_option_map.get(selected_mute_display, "silence")
         logger.info(f"Selected mute option: {selected_mute_option}")
         
+        # 音视频共享的直播延迟，由音频采集进程根据识别延迟调整
+        shared_delay = Value('d', delay_t)
+        # 音视频采集、发送进程共用的时间基准，音频 PTS 由采集进程的采样时钟换算到同一时钟
+        media_clock = MediaClock()
         # 在创建进程时传递消音选项参数
+        capture_config = AudioCaptureConfig(sensitive_matcher, self.mute_option_map[self.mute_option_combo.get()],
+                                            device_index=audio_input_device_index, shared_delay=shared_delay,
+                                            asr_client=self.asr_service.client(0))
         capture_audio_process = Process(target=process_capture_audio, name="AudioCapture",
-                                        args=(audio_queue,record_queue, start_time, stop_event, audio_input_device_index, 
-                                                sensitive_set, self.mute_option_map[self.mute_option_combo.get()] ))
-        send_audio_process = Process(target=process_send_audio_frames, name="AudioProcessor",args=(audio_queue, start_time, stop_event ) )
+                                        args=(audio_queue,record_queue, start_gate, stop_event, capture_config,
+                                                self.metrics_queue, get_log_channel() ))
+        send_audio_process = Process(target=process_send_audio_frames, name="AudioProcessor",args=(audio_queue, start_gate, stop_event, self.metrics_queue, get_log_channel() ),
+                                     kwargs={"media_clock": media_clock})
 
         self.audio_processes.extend([capture_audio_process, send_audio_process])
         # 启动视频进程（如果启用）
@@ -471,9 +499,16 @@ class VoiceFilterApp:
             process.start()
         # 如果启用了视频功能，则创建视频处理进程
         self.video_processes = []
+        frame_ring = None
         if CV2_AVAILABLE :
-            capture_video_process = Process(target=process_capture_video_frames, name="VideoCapture",args=(video_queue, start_time, stop_event,self.camera_idx_map[self.camera_combo.get()], width, height,int(selected_fps)))
-            send_video_process = Process(target=process_send_video_frames, name="VideoSender",args=(video_queue, start_time, stop_event, width, height,int(selected_fps)))
+            if video_transport == "shm":
+                # 共享内存槽位需容纳延迟上限内的视频帧；延迟帧压缩保存时只需覆盖视频队列
+                frame_ring = SharedFrameRing.for_video(width, height, int(selected_fps), video_ring_seconds())
+                log_frame_ring(frame_ring)
+            capture_video_process = Process(target=process_capture_video_frames, name="VideoCapture",args=(video_queue, start_gate, stop_event,self.camera_idx_map[self.camera_combo.get()], width, height,int(selected_fps), frame_ring, shared_delay, self.metrics_queue, get_log_channel()),
+                                            kwargs={"media_clock": media_clock})
+            send_video_process = Process(target=process_send_video_frames, name="VideoSender",args=(video_queue, start_gate, stop_event, width, height,int(selected_fps), frame_ring, self.metrics_queue, get_log_channel()),
+                                         kwargs={"media_clock": media_clock})
             self.video_processes.extend([capture_video_process, send_video_process])
             # 更新视频状态
             self.video_status.config(text="📹 视频: 运行中", fg="green")
@@ -486,25 +521,32 @@ class VoiceFilterApp:
         for process in self.video_processes:
             logger.info(f"Starting video process: {process.name}")
             process.start()
+        start_time = start_gate.open(processes=self.audio_processes + self.video_processes, stop_event=stop_event)
+        logger.info(f"Pipeline started {start_time - launch_t:.2f}s after launch")
         
         # 等待进程完成
         try:
             while self.is_running  :
                 time.sleep(0.1)
+            # 先等待各进程按 stop_event 自行退出：强制结束可能让常驻识别服务的队列锁停在被占用状态
+            for process in self.audio_processes + self.video_processes:
+                process.join(timeout=2.0)
             for process in self.video_processes:
-                logger.warning(f"Terminating stuck process: {process.name}")
                 if process is not None and  process.is_alive():  # 确保进程已启动
+                    logger.warning(f"Terminating stuck process: {process.name}")
                     process.terminate()
                     process.join(timeout=1.0)
                     if process.is_alive():  # 确保进程已终止
                         logger.error(f"Failed to terminate process: {process.name}")
             for process in self.audio_processes:
-                logger.warning(f"Terminating stuck process: {process.name}")
                 if process is not None and  process.is_alive():  # 确保进程已启动
+                    logger.warning(f"Terminating stuck process: {process.name}")
                     process.terminate()
                     process.join(timeout=1.0)
                     if process.is_alive():  # 确保进程已终止
                         logger.error(f"Failed to terminate process: {process.name}")
+            if frame_ring is not None:
+                frame_ring.close()
         except Exception as e:
             logger.info("Interrupted by user, stopping processes...")
             self.is_running = False
@@ -548,8 +590,14 @@ class VoiceFilterApp:
                     if process.is_alive():  # 确保进程已终止
                         logger.error(f"Failed to terminate process: {process.name}")
             
+        self.asr_stop_event.set()
+        self.asr_service.process.join(timeout=2.0)
+        if self.asr_service.process.is_alive():
+            logger.warning("Terminating stuck process: ASRServer")
+            self.asr_service.process.terminate()
         if self.p:
             self.p.terminate()
+        self.metrics_aggregator.stop()
         self.root.destroy()
         logger.info("Application closed")
 
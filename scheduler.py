@@ -0,0 +1,173 @@
+import heapq
+import itertools
+import queue
+import sys
+import threading
+import time
+from util import get_logger, RollingStats
+from metrics import get_registry
+
+logger = get_logger()
+
+
+def enable_high_resolution_timer():
+    """Windows 默认计时器精度约 15.6 ms，提升到 1 ms 以便按截止时间精确唤醒"""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            ctypes.windll.winmm.timeBeginPeriod(1)
+        except Exception as e:
+            logger.warning(f"Failed to raise timer resolution: {e}")
+
+
+class PresentationScheduler:
+    """
+    基于截止时间的帧呈现调度器
+
+    后台线程从进程间队列取出 (pts, ...) 元组放入按 PTS 排序的小顶堆，
+    发送循环调用 `next_due` 时会睡眠到堆顶帧的截止时间再返回，
+    不再以固定间隔轮询。超过截止时间 delay_threshold 仍未呈现的帧会被丢弃。
+    输入队列中的 None 表示流结束，堆中剩余帧呈现完后 `next_due` 返回 None。
+
+    统计:
+        presented: 已呈现帧数
+        late_drops: 因过期丢弃的帧数
+        jitter: 实际呈现时间与 PTS 之差（秒）
+
+    Args:
+        source_queue: 输入队列，元素的第一个字段为 PTS
+        stop_event: 停止事件
+        delay_threshold: 允许的最大迟到时间（秒）
+        name: 日志中使用的名称
+        spin_margin: 截止时间前最后这段时间改为忙等，以消除系统睡眠的唤醒误差
+        clock: 与 PTS 同源的时钟
+        metric_prefix: 指标名前缀，例如 "audio_send"，为 None 时不记录指标
+        paced: 为 False 时不等待截止时间也不丢弃过期帧，按 PTS 顺序尽快返回（用于快于实时的离线处理）
+        lead: 提前于 PTS 返回帧的时长（秒），用于输出端自带按 PTS 播放的缓冲区（如回调模式的音频输出）；
+            过期判断仍以 PTS 为准
+        max_pending: 堆中最多保留的帧数，达到后后台线程暂停从输入队列取帧，积压留在有界的输入队列中
+            按其溢出策略处理（见 mediaqueue.BoundedQueue）；为 None 时不限
+        on_drop: 丢弃过期帧时以该帧调用，用于释放帧占用的资源（在持有内部锁时调用，应尽快返回）
+    """
+
+    def __init__(self, source_queue, stop_event, delay_threshold, name="scheduler", spin_margin=0.002,
+                 clock=time.monotonic, metric_prefix=None, paced=True, lead=0.0, max_pending=None,
+                 on_drop=None):
+        self.source_queue = source_queue
+        self.stop_event = stop_event
+        self.delay_threshold = delay_threshold
+        self.name = name
+        self.spin_margin = spin_margin
+        self.clock = clock
+        self.paced = paced
+        self.lead = lead
+        self.max_pending = max_pending
+        self.on_drop = on_drop
+        self._eos = False
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._feeder = threading.Thread(target=self._feed, name=f"{name}-feeder", daemon=True)
+        self.presented = 0
+        self.late_drops = 0
+        self.jitter = RollingStats()
+        self._metrics = None
+        if metric_prefix:
+            registry = get_registry()
+            self._metrics = (registry.counter(f"{metric_prefix}_presented_total"),
+                             registry.counter(f"{metric_prefix}_late_drops_total"),
+                             registry.histogram(f"{metric_prefix}_jitter_seconds"),
+                             registry.gauge(f"{metric_prefix}_pending"))
+
+    def start(self):
+        enable_high_resolution_timer()
+        self._feeder.start()
+        return self
+
+    def _feed(self):
+        while not self.stop_event.is_set():
+            if self.max_pending is not None:
+                with self._cond:
+                    if len(self._heap) >= self.max_pending:
+                        self._cond.wait(0.1)
+                        continue
+            try:
+                item = self.source_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is None:
+                with self._cond:
+                    self._eos = True
+                    self._cond.notify_all()
+                break
+            self.push(item[0], item)
+        with self._cond:
+            self._cond.notify_all()
+
+    def push(self, pts, item):
+        with self._cond:
+            heapq.heappush(self._heap, (pts, next(self._seq), item))
+            self._cond.notify()
+
+    def _pop(self):
+        entry = heapq.heappop(self._heap)
+        if self.max_pending is not None and len(self._heap) == self.max_pending - 1:
+            # 唤醒因堆满暂停的后台线程
+            self._cond.notify_all()
+        return entry
+
+    def pending(self):
+        return len(self._heap)
+
+    def next_due(self):
+        """
+        阻塞到下一帧的呈现时间，返回该帧；停止或流结束后返回 None
+        """
+        with self._cond:
+            while True:
+                if self.stop_event.is_set():
+                    return None
+                if not self._heap:
+                    if self._eos:
+                        return None
+                    self._cond.wait(0.1)
+                    continue
+                pts = self._heap[0][0]
+                if not self.paced:
+                    _, _, item = self._pop()
+                    self.presented += 1
+                    if self._metrics:
+                        self._metrics[0].inc()
+                    return item
+                now = self.clock()
+                if pts < now - self.delay_threshold:
+                    _, _, item = self._pop()
+                    if self.on_drop is not None:
+                        self.on_drop(item)
+                    self.late_drops += 1
+                    if self._metrics:
+                        self._metrics[1].inc()
+                    logger.debug(f"{self.name}: dropped late frame, pts={pts:.3f}, late by {now - pts:.3f}s")
+                    continue
+                wait = pts - self.lead - now
+                if wait > self.spin_margin:
+                    # 有更早的帧入堆时会被唤醒并重新计算
+                    self._cond.wait(wait - self.spin_margin)
+                    continue
+                _, _, item = self._pop()
+                break
+        due_t = pts - self.lead
+        while self.clock() < due_t:
+            time.sleep(0)
+        self.presented += 1
+        jitter = self.clock() - due_t
+        self.jitter.add(jitter)
+        if self._metrics:
+            self._metrics[0].inc()
+            self._metrics[2].observe(abs(jitter))
+            self._metrics[3].set(len(self._heap))
+        return item
+
+    def stats_line(self):
+        return (f"{self.name}: presented={self.presented}, late_drops={self.late_drops}, pending={self.pending()}, "
+                f"jitter p50={self.jitter.percentile(50) * 1000:.2f}ms p99={self.jitter.percentile(99) * 1000:.2f}ms")
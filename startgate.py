@@ -0,0 +1,93 @@
+"""
+多进程启动握手
+
+各处理进程完成初始化（加载模型、打开设备）后报告就绪，主进程在全部就绪后才确定
+统一的开始时刻 start_time，并留出 margin 秒让各进程同时开始。与固定等待 10 s 相比，
+启动耗时只取决于最慢的一个进程实际初始化的时间。
+"""
+import time
+from multiprocessing import Value
+from util import get_logger
+
+logger = get_logger()
+
+# 等待开始时刻和就绪时的轮询间隔（秒）
+poll_interval = 0.01
+
+
+class StartGate:
+    """
+    启动握手，对象可以直接作为 Process 参数传递
+
+    进程中调用 wait(stop_event) 报告就绪并等待开始时刻；主进程调用 open() 等待所有
+    进程就绪后公布开始时刻。只使用共享内存值和轮询，进程异常退出不会让其他进程卡住。
+
+    Args:
+        stages: 需要报告就绪的进程数量
+        margin: 全部就绪后到开始时刻的间隔（秒），用于让各进程从轮询中醒来
+    """
+
+    def __init__(self, stages, margin=0.2):
+        self.stages = stages
+        self.margin = margin
+        self._ready = Value('i', 0)
+        # 0 表示尚未公布开始时刻
+        self._start = Value('d', 0.0)
+
+    @property
+    def ready_count(self):
+        return self._ready.value
+
+    @property
+    def start_time(self):
+        return self._start.value or None
+
+    def wait(self, stop_event=None):
+        """报告本进程就绪，阻塞到开始时刻，返回开始时刻（time.time()）；stop_event 被设置时立即返回"""
+        with self._ready.get_lock():
+            self._ready.value += 1
+        while not self._start.value:
+            if stop_event is not None and stop_event.is_set():
+                return time.time()
+            time.sleep(poll_interval)
+        start_time = self._start.value
+        while time.time() < start_time:
+            time.sleep(poll_interval)
+        return start_time
+
+    def open(self, timeout=60.0, processes=None, stop_event=None):
+        """
+        等待所有进程就绪后公布开始时刻并返回
+
+        超时、processes 中有进程退出或 stop_event 被设置时不再等待，立即公布，
+        让其余进程照常开始或退出。
+        """
+        deadline = time.monotonic() + timeout
+        while self._ready.value < self.stages:
+            if time.monotonic() > deadline:
+                logger.warning(f"Only {self._ready.value}/{self.stages} stages ready after {timeout}s, starting anyway")
+                break
+            if processes is not None and any(not p.is_alive() for p in processes):
+                logger.error("A pipeline process exited during initialization, starting the remaining stages")
+                break
+            if stop_event is not None and stop_event.is_set():
+                break
+            time.sleep(poll_interval)
+        start_time = time.time() + self.margin
+        self._start.value = start_time
+        return start_time
+
+
+def wait_for_start(start_time, stop_event=None):
+    """
+    等待统一的开始时刻并返回它
+
+    start_time 为 StartGate 时先报告就绪再等待主进程公布；为时间戳时等待到该时刻（旧的固定延迟方式）
+    """
+    if isinstance(start_time, StartGate):
+        return start_time.wait(stop_event)
+    while time.time() < start_time:
+        if stop_event is not None and stop_event.is_set():
+            break
+        time.sleep(poll_interval)
+    return start_time
@@ -0,0 +1,54 @@
+import sys
+import types
+
+import pytest
+
+import asrbackend
+import filterprocess
+
+
+class FakeParaformer:
+    """记录 funasr_onnx Paraformer 的构造参数"""
+    created = []
+
+    def __init__(self, model_dir, **kwargs):
+        self.kwargs = kwargs
+        FakeParaformer.created.append(self)
+
+    def __call__(self, audio_in, param_dict):
+        return []
+
+
+@pytest.fixture
+def fake_funasr_onnx(monkeypatch):
+    FakeParaformer.created = []
+    package = types.ModuleType("funasr_onnx")
+    module = types.ModuleType("funasr_onnx.paraformer_online_bin")
+    module.Paraformer = FakeParaformer
+    package.paraformer_online_bin = module
+    monkeypatch.setitem(sys.modules, "funasr_onnx", package)
+    monkeypatch.setitem(sys.modules, "funasr_onnx.paraformer_online_bin", module)
+    return FakeParaformer
+
+
+def test_asr_chunk_ms_reaches_onnx_backend(fake_funasr_onnx, monkeypatch):
+    monkeypatch.setattr(filterprocess, "asr_chunk_ms", 300)
+    model = filterprocess.init_model(backend="onnx", model_dir="model", device="cpu")
+    assert isinstance(model, asrbackend.ParaformerONNXBackend)
+    # 块长度 300 ms = 5 帧、前瞻 2 帧；第一项为 funasr_onnx 的左侧上下文
+    assert fake_funasr_onnx.created[0].kwargs["chunk_size"] == [5, 5, 2]
+
+
+def test_chunk_size_is_only_passed_to_fixed_chunk_backends(monkeypatch):
+    received = {}
+
+    class WindowBackend(asrbackend.ASRBackend):
+        name = "window-only"
+
+        def __init__(self, model_dir, device="cpu", **options):
+            super().__init__(device)
+            received.update(options)
+
+    monkeypatch.setitem(asrbackend.BACKENDS, "window-only", WindowBackend)
+    asrbackend.create_backend("window-only", model_dir="model", device="cpu", chunk_size=(0, 5, 2))
+    assert "chunk_size" not in received
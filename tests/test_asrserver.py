@@ -0,0 +1,94 @@
+import queue
+
+import numpy as np
+import pytest
+
+import asrserver
+from asr import RecognitionError
+
+
+class FakeModel:
+    """按窗口长度返回文本的模型，记录每次 generate 的输入"""
+
+    def __init__(self, batch_result=None, batch_error=None):
+        self.batch_result = batch_result
+        self.batch_error = batch_error
+        self.calls = []
+
+    def generate(self, input=None, **kwargs):
+        self.calls.append(input)
+        if isinstance(input, list):
+            if self.batch_error is not None:
+                raise self.batch_error
+            if self.batch_result is not None:
+                return self.batch_result
+            return [{"text": f"w {len(samples)}"} for samples in input]
+        return [{"text": f"w {len(input)}"}]
+
+
+def windows(*lengths):
+    return [np.zeros(n, dtype=np.float32) for n in lengths]
+
+
+def test_batch_generate_uses_one_batched_call():
+    model = FakeModel()
+    assert asrserver.batch_generate(model, windows(10, 20, 30)) == ["w10", "w20", "w30"]
+    assert len(model.calls) == 1
+
+
+def test_batch_generate_falls_back_on_mismatched_length():
+    model = FakeModel(batch_result=[{"text": "only one"}])
+    assert asrserver.batch_generate(model, windows(10, 20)) == ["w10", "w20"]
+    # 一次批量调用 + 两次逐个识别
+    assert len(model.calls) == 3
+
+
+def test_batch_generate_falls_back_on_exception():
+    model = FakeModel(batch_error=RuntimeError("batch not supported"))
+    assert asrserver.batch_generate(model, windows(10, 20)) == ["w10", "w20"]
+    assert len(model.calls) == 3
+
+
+def test_single_window_is_not_batched():
+    model = FakeModel()
+    assert asrserver.batch_generate(model, windows(10)) == ["w10"]
+    assert not isinstance(model.calls[0], list)
+
+
+class ReplyingQueue:
+    """请求队列：收到请求后立即把 replies 依次放入结果队列，模拟服务端"""
+
+    def __init__(self, response_queue, replies):
+        self.response_queue = response_queue
+        self.replies = replies
+
+    def put(self, request):
+        _, seq, _, _, _ = request
+        for reply in self.replies(seq):
+            self.response_queue.put(reply)
+
+
+def test_client_returns_reply_for_its_own_request():
+    responses = queue.Queue()
+    # 先到达的是上一个进程遗留的结果，应被丢弃
+    requests = ReplyingQueue(responses, lambda seq: [((0, 99), "stale"), (seq, "text")])
+    client = asrserver.ASRClient(0, requests, responses, chunk_samples=9600)
+    assert client.transcribe(np.zeros(10, dtype=np.float32)) == "text"
+
+
+def test_client_raises_when_server_fails_to_recognize():
+    responses = queue.Queue()
+    requests = ReplyingQueue(responses, lambda seq: [(seq, None)])
+    client = asrserver.ASRClient(0, requests, responses, chunk_samples=9600)
+    with pytest.raises(RecognitionError):
+        client.transcribe(np.zeros(10, dtype=np.float32))
+
+
+def test_client_raises_when_server_does_not_answer(monkeypatch):
+    monkeypatch.setattr(asrserver, "response_timeout", 0.05)
+    responses = queue.Queue()
+    client = asrserver.ASRClient(0, queue.Queue(), responses, chunk_samples=9600)
+    with pytest.raises(RecognitionError):
+        client.feed(np.zeros(10, dtype=np.float32))
+    # reset 不因服务无响应而中断启动
+    client.reset()
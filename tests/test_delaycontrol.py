@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from delaycontrol import AdaptiveDelayController, VideoPtsSmoother
+
+RATE = 16000
+
+
+def controller(latency, count=20, **options):
+    options.setdefault("min_samples", 20)
+    delay_controller = AdaptiveDelayController(**options)
+    for _ in range(count):
+        delay_controller.observe(latency)
+    return delay_controller
+
+
+def quiet(seconds=0.6):
+    return np.zeros(int(seconds * RATE), dtype=np.float32)
+
+
+def loud(seconds=0.6):
+    return np.full(int(seconds * RATE), 0.5, dtype=np.float32)
+
+
+def test_target_is_p99_plus_margin_within_bounds():
+    assert controller(0.5, margin=0.25).target() == pytest.approx(0.75)
+    assert controller(0.1, min_delay=0.6).target() == 0.6
+    assert controller(5.0, max_delay=3.0).target() == 3.0
+    # 样本不足时保持当前延迟
+    assert controller(0.5, count=5, initial=2.0).target() == 2.0
+
+
+def test_shrinks_by_max_step_on_quiet_window():
+    shared = SimpleNamespace(value=0.0)
+    delay_controller = controller(0.5, shared_delay=shared, initial=2.0, max_step=0.02)
+    samples, delay = delay_controller.adjust_window(quiet(), RATE)
+    # 窗口 PTS 仍按调整前的延迟计算，开头被裁掉 max_step 的静音
+    assert delay == 2.0
+    assert len(samples) == len(quiet()) - int(0.02 * RATE)
+    assert delay_controller.delay == pytest.approx(1.98)
+    assert shared.value == pytest.approx(1.98)
+
+
+def test_grows_by_padding_silence():
+    delay_controller = controller(2.0, initial=1.0, max_step=0.02, urgent_gap=10.0)
+    samples, delay = delay_controller.adjust_window(quiet(), RATE)
+    assert delay == 1.0
+    assert len(samples) == len(quiet()) + int(0.02 * RATE)
+    assert not samples[:int(0.02 * RATE)].any()
+    assert delay_controller.delay == pytest.approx(1.02)
+
+
+def test_waits_for_quiet_audio_unless_urgent():
+    delay_controller = controller(0.5, initial=2.0)
+    samples, _ = delay_controller.adjust_window(loud(), RATE)
+    assert len(samples) == len(loud()) and delay_controller.delay == 2.0
+    # 识别明显跟不上时不等静音，立即延长
+    urgent = controller(2.5, initial=1.0, urgent_gap=0.2)
+    samples, _ = urgent.adjust_window(loud(), RATE)
+    assert len(samples) > len(loud()) and urgent.delay > 1.0
+
+
+def test_disabled_controller_keeps_initial_delay():
+    delay_controller = controller(0.5, initial=2.0, enabled=False)
+    samples, delay = delay_controller.adjust_window(quiet(), RATE)
+    assert delay == 2.0 and delay_controller.delay == 2.0 and len(samples) == len(quiet())
+
+
+def test_video_pts_stay_monotonic_while_delay_shrinks():
+    fps = 30
+    smoother = VideoPtsSmoother(fps)
+    pts = [smoother.pts(i / fps, 2.0 if i < 10 else 1.5) for i in range(120)]
+    gaps = np.diff(pts)
+    assert (gaps >= 0.5 / fps - 1e-9).all()
+    # 每帧最多跟随半个帧间隔，最终收敛到新的延迟
+    assert (gaps <= 1.5 / fps + 1e-9).all()
+    assert pts[-1] == pytest.approx(119 / fps + 1.5)
+
+
+def test_video_pts_follow_growing_delay_gradually():
+    fps = 30
+    smoother = VideoPtsSmoother(fps)
+    pts = [smoother.pts(i / fps, 1.0 if i < 5 else 1.2) for i in range(60)]
+    assert (np.diff(pts) <= 1.5 / fps + 1e-9).all()
+    assert pts[-1] == pytest.approx(59 / fps + 1.2)
@@ -0,0 +1,101 @@
+import queue
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from framecodec import CompressedDelayBuffer, make_frame_codec, codec_type
+from framering import SharedFrameRing
+
+cv2 = pytest.importorskip("cv2")
+
+
+def frame(seed, width=64, height=48):
+    # 平滑渐变加少量噪声，接近摄像头画面的压缩率
+    y, x = np.mgrid[0:height, 0:width]
+    noise = np.random.default_rng(seed).normal(0, 2, (height, width, 3))
+    return np.clip(np.stack([x * 3, y * 4, (x + y) * 2 + seed], axis=-1) + noise, 0, 255).astype(np.uint8)
+
+
+def psnr(a, b):
+    mse = np.mean((a.astype(np.float32) - b.astype(np.float32)) ** 2)
+    return float("inf") if mse == 0 else 10 * np.log10(255 ** 2 / mse)
+
+
+def test_codec_type_and_factory():
+    assert codec_type(None) == "raw"
+    assert codec_type({"type": "jpeg", "quality": 80}) == "jpeg"
+    assert make_frame_codec({"type": "jpeg", "quality": 80}).quality == 80
+    with pytest.raises(ValueError):
+        make_frame_codec("png")
+
+
+@pytest.mark.parametrize("spec, min_psnr", [("raw", float("inf")), ("yuv420", 35), ({"type": "jpeg", "quality": 90}, 30)])
+def test_codecs_round_trip(spec, min_psnr):
+    codec = make_frame_codec(spec)
+    original = frame(0)
+    decoded = codec.decode(codec.encode(original))
+    assert decoded.shape == original.shape
+    assert psnr(original, decoded) >= min_psnr
+
+
+def test_raw_codec_copies_the_frame():
+    original = frame(0)
+    data = make_frame_codec("raw").encode(original)
+    original[:] = 0
+    assert data.any()
+
+
+def test_yuv420_halves_the_frame_size():
+    data = make_frame_codec("yuv420").encode(frame(0))
+    assert data.shape == (48 * 3 // 2, 64)
+
+
+def test_delay_buffer_returns_decoded_frames_in_pts_order():
+    source = queue.Queue()
+    # PTS 留出足够的提前量，帧在呈现前全部入堆，返回顺序只取决于 PTS
+    start = time.monotonic() + 0.3
+    frames = {start + 0.01 * i: frame(i) for i in (3, 1, 2, 0)}
+    for pts, image in frames.items():
+        source.put((pts, image))
+    source.put(None)
+    buffer = CompressedDelayBuffer(source, threading.Event(), 0.15, make_frame_codec("yuv420")).start()
+    try:
+        results = []
+        while (due := buffer.next_due()) is not None:
+            results.append(due)
+    finally:
+        buffer.close()
+    assert [pts for pts, _ in results] == sorted(frames)
+    for pts, decoded in results:
+        assert psnr(frames[pts], decoded) >= 35
+    # 压缩帧全部离开堆后不再占用内存
+    assert buffer.stored_bytes == 0
+    assert buffer.encode_failures == 0 and buffer.late_decodes == 0
+
+
+def test_delay_buffer_skips_frames_overwritten_in_the_ring():
+    ring = SharedFrameRing(2, (48, 64, 3))
+    try:
+        overwritten = ring.write(frame(0))
+        ring.write(frame(1))
+        # 第三帧写回槽位 0，压缩前第一帧已被覆盖
+        kept = ring.write(frame(2))
+        source = queue.Queue()
+        start = time.monotonic() + 0.3
+        source.put((start, overwritten))
+        source.put((start + 0.01, kept))
+        source.put(None)
+        buffer = CompressedDelayBuffer(source, threading.Event(), 0.15, make_frame_codec("yuv420"), ring).start()
+        try:
+            results = []
+            while (due := buffer.next_due()) is not None:
+                results.append(due)
+        finally:
+            buffer.close()
+        assert [pts for pts, _ in results] == [start + 0.01]
+        assert psnr(frame(2), results[0][1]) >= 35
+        assert buffer.encode_failures == 1
+    finally:
+        ring.close()
@@ -0,0 +1,102 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from framering import SharedFrameRing
+
+SHAPE = (4, 6, 3)
+
+
+def frame(value):
+    return np.full(SHAPE, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(3, SHAPE)
+    yield ring
+    ring.close()
+
+
+def test_for_video_covers_delay_and_margin():
+    ring = SharedFrameRing.for_video(8, 6, 25, 2.0)
+    try:
+        assert ring.shape == (6, 8, 3)
+        # 25 fps × (2 s + 0.5 s) + 2
+        assert ring.slots == 65
+    finally:
+        ring.close()
+
+
+def test_slots_are_reused_in_order(ring):
+    written = [ring.write(frame(i)) for i in range(4)]
+    assert [slot for slot, _ in written] == [0, 1, 2, 0]
+    assert [seq for _, seq in written] == [0, 1, 2, 3]
+    np.testing.assert_array_equal(ring.read(*written[3]), frame(3))
+    np.testing.assert_array_equal(ring.read(*written[1]), frame(1))
+
+
+def test_overwritten_frame_is_not_returned(ring):
+    first = ring.write(frame(1))
+    view = ring.read(*first)
+    assert ring.is_valid(*first)
+    for i in range(3):
+        ring.write(frame(10 + i))
+    # 槽位 0 已写入 seq 3：按旧序号读取返回 None，之前取到的视图也不再有效
+    assert ring.read(*first) is None
+    assert not ring.is_valid(*first)
+    np.testing.assert_array_equal(view, frame(12))
+
+
+def test_slot_being_written_is_not_readable(ring):
+    for i in range(3):
+        ring.write(frame(i))
+    old = (0, 0)
+    slot, seq, view = ring.next_slot()
+    assert slot == 0
+    view[...] = 7
+    # 提交前旧帧和新帧都读不到
+    assert ring.read(*old) is None
+    assert ring.read(slot, seq) is None
+    ring.commit(slot, seq)
+    np.testing.assert_array_equal(ring.read(slot, seq), frame(7))
+
+
+def read_then_write(ring, slot, seq, results):
+    received = ring.read(slot, seq)
+    results.put(None if received is None else int(received[0, 0, 0]))
+    # 与采集进程一样，附加方作为写入方从序号 0 开始
+    results.put([ring.write(frame(40 + i)) for i in range(4)])
+    ring.close()
+
+
+def test_frames_are_shared_across_processes(ring):
+    # spawn 时 ring 经 pickle 传入，子进程按名称附加到同一块共享内存
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    slot, seq = ring.write(frame(5))
+    process = context.Process(target=read_then_write, args=(ring, slot, seq, results))
+    process.start()
+    assert results.get(timeout=30.0) == 5
+    written = results.get(timeout=30.0)
+    process.join(30.0)
+    assert process.exitcode == 0
+    assert [tuple(item) for item in written] == [(0, 0), (1, 1), (2, 2), (0, 3)]
+    # 附加方关闭后共享内存仍在，创建方能读到子进程写入的帧，被覆盖的槽位按旧序号读不到
+    assert ring.read(0, 0) is None
+    for i, (slot, seq) in enumerate(written[1:], 1):
+        np.testing.assert_array_equal(ring.read(slot, seq), frame(40 + i))
+
+
+def test_owner_close_unlinks_shared_memory():
+    ring = SharedFrameRing(2, SHAPE)
+    name = ring.name
+    attached = SharedFrameRing(2, SHAPE, name=name)
+    attached.write(frame(3))
+    np.testing.assert_array_equal(ring.read(0, 0), frame(3))
+    attached.close()
+    ring.close()
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
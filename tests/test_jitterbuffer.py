@@ -0,0 +1,92 @@
+import numpy as np
+
+from ringbuffer import JitterBuffer
+
+RATE = 16000
+PERIOD = 160
+
+
+def ramp(n, start=0):
+    return np.arange(start, start + n, dtype=np.float32)
+
+
+def pull(buffer, play_t, n=PERIOD):
+    out = np.full(n, -1.0, dtype=np.float32)
+    delivered = buffer.pull(out, play_t)
+    return out, delivered
+
+
+def test_aligned_pulls_are_continuous():
+    buffer = JitterBuffer(RATE)
+    buffer.push(ramp(1600), 1.0)
+    first, delivered = pull(buffer, 1.0)
+    second, _ = pull(buffer, 1.0 + PERIOD / RATE)
+    assert delivered == PERIOD
+    np.testing.assert_array_equal(np.concatenate([first, second]), ramp(2 * PERIOD))
+    assert buffer.corrections == 0 and buffer.late_samples == 0
+
+
+def test_waits_with_silence_until_pts():
+    buffer = JitterBuffer(RATE)
+    buffer.push(ramp(1600), 1.0)
+    # 提前 5 ms（80 个采样）开始播放：先输出静音，不提前播放
+    out, delivered = pull(buffer, 1.0 - 80 / RATE)
+    np.testing.assert_array_equal(out[:80], 0)
+    np.testing.assert_array_equal(out[80:], ramp(80))
+    assert delivered == 80
+
+
+def test_skips_late_samples():
+    buffer = JitterBuffer(RATE)
+    buffer.push(ramp(1600), 1.0)
+    out, _ = pull(buffer, 1.0 + 160 / RATE)
+    np.testing.assert_array_equal(out, ramp(PERIOD, start=160))
+    assert buffer.late_samples == 160
+
+
+def test_small_drift_is_corrected_one_sample_per_period():
+    buffer = JitterBuffer(RATE)
+    buffer.push(ramp(16000), 1.0)
+    pull(buffer, 1.0)
+    # 输出落后 3 ms：超过修正阈值但小于 max_error，每个周期只丢弃一个采样
+    out, _ = pull(buffer, 1.0 + PERIOD / RATE + 0.003)
+    assert buffer.corrections == 1
+    np.testing.assert_array_equal(out, ramp(PERIOD, start=PERIOD + 1))
+
+
+def test_blocks_with_pts_gap_are_aligned_separately():
+    buffer = JitterBuffer(RATE)
+    buffer.push(ramp(PERIOD), 1.0)
+    # 第二块的 PTS 比首尾相接晚 50 ms（超过 max_error），等到其 PTS 再播放
+    gap = 800
+    buffer.push(ramp(PERIOD, start=1000), 1.0 + (PERIOD + gap) / RATE)
+    pull(buffer, 1.0)
+    for period in range(1, gap // PERIOD + 1):
+        out, delivered = pull(buffer, 1.0 + period * PERIOD / RATE)
+        assert delivered == 0 and not out.any()
+    out, _ = pull(buffer, 1.0 + (PERIOD + gap) / RATE)
+    np.testing.assert_array_equal(out, ramp(PERIOD, start=1000))
+    assert buffer.underruns == 0
+
+
+def test_underruns_only_count_while_stream_is_active():
+    buffer = JitterBuffer(RATE)
+    pull(buffer, 0.0)
+    assert buffer.underruns == 0
+    buffer.push(ramp(PERIOD), 1.0)
+    pull(buffer, 1.0)
+    out, delivered = pull(buffer, 1.0 + PERIOD / RATE)
+    assert delivered == 0 and not out.any()
+    assert buffer.underruns == 1 and buffer.underrun_samples == PERIOD
+    buffer.finish()
+    pull(buffer, 1.0 + 2 * PERIOD / RATE)
+    assert buffer.underruns == 1
+
+
+def test_overflow_drops_oldest_samples():
+    buffer = JitterBuffer(RATE, capacity_seconds=0.1)
+    buffer.push(ramp(1600), 1.0)
+    buffer.push(ramp(800, start=1600), 1.1)
+    assert buffer.overflows == 800 and buffer.available() == 1600
+    out, _ = pull(buffer, 1.0 + 800 / RATE)
+    np.testing.assert_array_equal(out, ramp(PERIOD, start=800))
@@ -0,0 +1,108 @@
+from types import SimpleNamespace
+
+import pytest
+
+import util
+from util import CallsiteLimiter, format_with_suppressed
+
+INFO = 20
+DEBUG = 10
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(util.time, "monotonic", clock)
+    return clock
+
+
+def limiter(rate=1.0, burst=3, level=INFO):
+    return CallsiteLimiter(SimpleNamespace(level=SimpleNamespace(value=level)), rate, burst)
+
+
+def record(line=10, level=INFO, **extra):
+    return {"file": SimpleNamespace(path="filterprocess.py"), "line": line, "level": SimpleNamespace(no=level),
+            "extra": dict(extra)}
+
+
+def test_level_below_channel_is_dropped(clock):
+    assert not limiter()._decide(record(level=DEBUG))
+    assert limiter(level=DEBUG)._decide(record(level=DEBUG))
+
+
+def test_token_bucket_limits_each_callsite(clock):
+    filter_ = limiter(rate=2.0, burst=3)
+    assert [filter_._decide(record()) for _ in range(5)] == [True, True, True, False, False]
+    # 其他调用点有各自的令牌桶
+    assert filter_._decide(record(line=11))
+    # 0.5 s 补充 1 个令牌
+    clock.now += 0.5
+    assert [filter_._decide(record()) for _ in range(2)] == [True, False]
+    # 长时间空闲后最多积累 burst 个令牌
+    clock.now += 60.0
+    assert [filter_._decide(record()) for _ in range(4)] == [True, True, True, False]
+
+
+def test_suppressed_count_is_carried_to_next_record(clock):
+    filter_ = limiter(rate=1.0, burst=1)
+    first = record()
+    assert filter_._decide(first)
+    assert "_suppressed" not in first["extra"]
+    assert not filter_._decide(record())
+    assert not filter_._decide(record())
+    clock.now += 1.0
+    passed = record()
+    assert filter_._decide(passed)
+    assert passed["extra"]["_suppressed"] == 2
+    # 计数只附加一次
+    clock.now += 1.0
+    again = record()
+    assert filter_._decide(again)
+    assert "_suppressed" not in again["extra"]
+
+
+def test_sample_outputs_one_in_n(clock):
+    filter_ = limiter(rate=1000.0, burst=1000)
+    results = [filter_._decide(record(sample=3)) for _ in range(7)]
+    assert results == [True, False, False, True, False, False, True]
+
+
+def test_sampled_out_records_do_not_count_as_suppressed(clock):
+    filter_ = limiter(rate=1.0, burst=1)
+    assert filter_._decide(record(sample=2))
+    assert not filter_._decide(record(sample=2))
+    # 采样丢弃不消耗令牌，第 3 次因令牌用尽被限流
+    assert not filter_._decide(record(sample=2))
+    clock.now += 1.0
+    assert not filter_._decide(record(sample=2))
+    passed = record(sample=2)
+    assert filter_._decide(passed)
+    assert passed["extra"]["_suppressed"] == 1
+
+
+def test_call_decides_once_for_all_sinks(clock):
+    filter_ = limiter(rate=1.0, burst=1)
+    first = record()
+    # 控制台和文件两个 sink 对同一条日志的判定一致
+    assert filter_(first) and filter_(first)
+    second = record()
+    assert not filter_(second) and not filter_(second)
+    clock.now += 1.0
+    third = record()
+    assert filter_(third) and filter_(third)
+    assert third["extra"]["_suppressed"] == 1
+
+
+def test_format_appends_suppressed_count():
+    format_record = format_with_suppressed("{message}")
+    assert format_record(record()) == "{message}\n{exception}"
+    suffixed = format_record(record(_suppressed=4))
+    assert suffixed == "{message} (suppressed {extra[_suppressed]} similar messages)\n{exception}"
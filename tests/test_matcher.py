@@ -0,0 +1,106 @@
+import importlib.util
+import pickle
+
+import pytest
+
+from matcher import SensitiveMatcher, IncrementalMatcher, PhoneticMatcher
+
+
+def test_find_all_returns_words_in_first_occurrence_order():
+    matcher = SensitiveMatcher(["最便宜", "第一", "便宜"])
+    assert matcher.find_all("全网第一，最便宜，第一") == ["第一", "最便宜", "便宜"]
+
+
+def test_iter_matches_reports_overlapping_hits_with_exclusive_end():
+    matcher = SensitiveMatcher(["ab", "bc", "abcd"])
+    assert sorted(matcher.iter_matches("xabcd")) == [(1, 3, "ab"), (1, 5, "abcd"), (2, 4, "bc")]
+
+
+def test_fail_links_recover_after_partial_match():
+    # "最便" 失配后应从 "便宜" 的前缀继续匹配
+    matcher = SensitiveMatcher(["最便宜", "便宜货"])
+    assert matcher.find_all("最便宜货") == ["最便宜", "便宜货"]
+    assert matcher.find_all("最便便宜货") == ["便宜货"]
+
+
+def test_no_match_and_empty_input():
+    matcher = SensitiveMatcher(["敏感"])
+    assert matcher.find_all("") == []
+    assert matcher.find_all("正常的句子") == []
+    assert list(SensitiveMatcher().iter_matches("任何文本")) == []
+
+
+def test_empty_words_are_ignored():
+    matcher = SensitiveMatcher(["", "词"])
+    assert len(matcher) == 1
+    assert "词" in matcher and "" not in matcher
+
+
+def test_matcher_survives_pickle():
+    matcher = pickle.loads(pickle.dumps(SensitiveMatcher(["最便宜"])))
+    assert matcher.find_all("这个最便宜") == ["最便宜"]
+
+
+def test_incremental_update_adds_and_removes_words():
+    matcher = IncrementalMatcher(SensitiveMatcher(["最便宜", "第一"]))
+    updated, added, removed = matcher.updated({"第一", "超值"})
+    assert added == {"超值"} and removed == {"最便宜"}
+    # 差异很小时沿用基础自动机，只重建增量部分
+    assert updated.base is matcher.base
+    assert updated.find_all("最便宜又超值，全网第一") == ["第一", "超值"]
+    assert set(updated) == {"第一", "超值"}
+
+
+def test_incremental_update_restores_removed_base_word():
+    matcher = IncrementalMatcher(SensitiveMatcher(["最便宜"]))
+    matcher, _, _ = matcher.updated(set())
+    assert matcher.find_all("最便宜") == []
+    matcher, added, _ = matcher.updated({"最便宜"})
+    assert added == {"最便宜"}
+    assert matcher.find_all("最便宜") == ["最便宜"]
+    assert list(matcher.iter_matches("最便宜")) == [(0, 3, "最便宜")]
+
+
+def test_incremental_update_without_changes_returns_same_matcher():
+    matcher = IncrementalMatcher(SensitiveMatcher(["词"]))
+    assert matcher.updated({"词"}) == (matcher, frozenset(), frozenset())
+
+
+def test_incremental_update_compacts_large_differences():
+    base = SensitiveMatcher(f"词{i}" for i in range(10))
+    matcher = IncrementalMatcher(base)
+    words = {f"新{i}" for i in range(IncrementalMatcher.COMPACT_MIN_WORDS + 1)}
+    updated, _, _ = matcher.updated(words)
+    assert updated.base is not base
+    assert updated.base.words == words and not updated.removed and not updated.delta.words
+
+
+# 谐音匹配依赖可选的 pypinyin
+requires_pypinyin = pytest.mark.skipif(importlib.util.find_spec("pypinyin") is None, reason="pypinyin is not installed")
+
+
+@requires_pypinyin
+def test_phonetic_matcher_hits_homophones():
+    matcher = PhoneticMatcher(["最便宜"])
+    assert matcher.find_all("这款醉便宜了") == ["最便宜"]
+    assert list(matcher.iter_matches("这款醉便宜了")) == [(2, 5, "最便宜")]
+
+
+@requires_pypinyin
+def test_phonetic_matcher_expands_polyphones_in_words():
+    # "便" 有 bian/pian 两个读音，词库一侧展开后两种读音都能命中
+    matcher = PhoneticMatcher(["便宜"])
+    assert matcher.find_all("偏移") == ["便宜"]
+    assert matcher.find_all("变异") == ["便宜"]
+
+
+@requires_pypinyin
+def test_phonetic_matcher_matches_latin_case_insensitively():
+    matcher = PhoneticMatcher(["VIP"])
+    assert matcher.find_all("开通vip会员") == ["VIP"]
+
+
+@requires_pypinyin
+def test_phonetic_matcher_survives_pickle():
+    matcher = pickle.loads(pickle.dumps(PhoneticMatcher(["最便宜"])))
+    assert matcher.find_all("醉便宜") == ["最便宜"]
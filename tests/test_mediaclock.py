@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from mediaclock import SampleClock
+
+RATE = 16000
+PERIOD = 160
+
+
+class Device:
+    """按 ppm 频偏产生采样的模拟声卡，回调只会因调度抖动变晚"""
+
+    def __init__(self, ppm=0.0, jitter=0.0, seed=0):
+        self.now = 100.0
+        self.samples = 0
+        self.ppm = ppm
+        self.jitter = jitter
+        self.origin = self.now
+        self._random = random.Random(seed)
+
+    def true_time(self, sample):
+        # ppm 为正表示设备比标称采样率慢，每个采样占用的时间更长
+        return self.origin + sample / RATE * (1 + self.ppm * 1e-6)
+
+    def run(self, sample_clock, seconds):
+        for _ in range(int(seconds * RATE / PERIOD)):
+            self.samples += PERIOD
+            delay = self._random.expovariate(1 / self.jitter) if self.jitter else 0.0
+            self.now = self.true_time(self.samples) + delay
+            sample_clock.observe(self.samples, self.now)
+            sample_clock.time_at(self.samples)
+
+
+def make_clock(device):
+    return SampleClock(RATE, clock=lambda: device.now)
+
+
+def test_estimates_drift_of_skewed_device():
+    device = Device(ppm=80)
+    sample_clock = make_clock(device)
+    device.run(sample_clock, 120)
+    assert sample_clock.drift_ppm == pytest.approx(80, abs=2)
+    assert sample_clock.time_at(device.samples) == pytest.approx(device.true_time(device.samples), abs=1e-4)
+    assert sample_clock.resyncs == 0
+
+
+def test_rejects_callback_jitter():
+    # 回调平均晚 3 ms、偶尔晚十几毫秒，映射仍贴着真实时刻
+    device = Device(ppm=-50, jitter=0.003, seed=1)
+    sample_clock = make_clock(device)
+    device.run(sample_clock, 120)
+    errors = [abs(sample_clock.time_at(s) - device.true_time(s))
+              for s in range(device.samples - 10 * RATE, device.samples, RATE)]
+    assert max(errors) < 0.001
+    assert sample_clock.drift_ppm == pytest.approx(-50, abs=5)
+    assert sample_clock.resyncs == 0
+
+
+def test_resyncs_after_timeline_jump():
+    device = Device(ppm=20)
+    sample_clock = make_clock(device)
+    device.run(sample_clock, 30)
+    # 系统休眠或驱动丢采样：之后的采样整体晚到 200 ms
+    device.origin += 0.2
+    device.run(sample_clock, 10)
+    assert sample_clock.resyncs == 1
+    assert sample_clock.time_at(device.samples) == pytest.approx(device.true_time(device.samples), abs=0.002)
+
+
+def test_no_samples_yet():
+    assert SampleClock(RATE).time_at(0) is None
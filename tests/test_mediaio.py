@@ -0,0 +1,45 @@
+import json
+
+import numpy as np
+import pytest
+
+from mediaio import make_video_source
+from headless import load_config
+
+cv2 = pytest.importorskip("cv2")
+
+
+@pytest.fixture
+def video_25fps(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    for i in range(5):
+        writer.write(np.full((48, 64, 3), i * 40, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def test_video_file_uses_its_own_frame_rate(video_25fps):
+    source = make_video_source({"type": "file", "path": video_25fps}, fps=30)
+    try:
+        assert source.fps == 25
+    finally:
+        source.release()
+
+
+def test_video_file_fps_can_be_overridden_in_spec(video_25fps):
+    source = make_video_source({"type": "file", "path": video_25fps, "fps": 30}, fps=30)
+    try:
+        assert source.fps == 30
+    finally:
+        source.release()
+
+
+def test_headless_passes_only_explicit_fps_to_file_source(tmp_path):
+    def load(video):
+        path = tmp_path / "config.json"
+        path.write_text(json.dumps({"video": video}), encoding="utf-8")
+        return load_config(str(path))["video"]["source"]
+
+    assert "fps" not in load({"source": {"type": "file", "path": "clip.avi"}})
+    assert load({"source": {"type": "file", "path": "clip.avi"}, "fps": 25})["fps"] == 25
@@ -0,0 +1,74 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from mediaqueue import BoundedQueue
+from metrics import get_registry
+
+
+def test_drop_oldest_keeps_newest_items():
+    q = BoundedQueue(2, "drop_oldest", "test_drop_queue")
+    for i in range(5):
+        q.put(i)
+    assert [q.get(timeout=1.0) for _ in range(2)] == [3, 4]
+    assert q.dropped == 3
+    assert get_registry().counter("test_drop_queue_dropped_total").value == 3
+
+
+def test_block_raises_full_after_timeout():
+    q = BoundedQueue(1, "block", "test_block_queue", alarm_after=0.05)
+    q.put("a")
+    start = time.monotonic()
+    with pytest.raises(queue.Full):
+        q.put("b", timeout=0.2)
+    assert time.monotonic() - start >= 0.2
+    assert get_registry().counter("test_block_queue_blocked_total").value == 1
+    assert q.dropped == 0
+
+
+def test_block_waits_for_consumer():
+    q = BoundedQueue(1, "block", "test_unblock_queue", alarm_after=0.05)
+    q.put("a")
+    consumed = []
+    threading.Timer(0.1, lambda: consumed.append(q.get(timeout=1.0))).start()
+    q.put("b", timeout=2.0)
+    assert consumed == ["a"]
+    assert q.get(timeout=1.0) == "b"
+
+
+def test_coalesce_merges_events_by_key_until_there_is_room():
+    q = BoundedQueue(1, "coalesce", "test_coalesce_queue", coalesce_key="word")
+    q.put({"word": "最便宜", "sentence": "1"})
+    for _ in range(3):
+        q.put({"word": "第一", "sentence": "2"})
+    q.put({"word": "超值", "sentence": "3"})
+    assert get_registry().counter("test_coalesce_queue_coalesced_total").value == 4
+    assert q.get(timeout=1.0) == {"word": "最便宜", "sentence": "1"}
+    # 腾出空位后按合并顺序补发，count 为合并的事件数
+    assert q.flush() == 1
+    assert q.get(timeout=1.0) == {"word": "第一", "sentence": "2", "count": 3}
+    assert q.flush() == 0
+    assert q.get(timeout=1.0) == {"word": "超值", "sentence": "3", "count": 1}
+
+
+def test_end_of_stream_is_never_coalesced():
+    q = BoundedQueue(1, "coalesce", "test_coalesce_eos_queue", alarm_after=0.05)
+    q.put({"word": "a"})
+    with pytest.raises(queue.Full):
+        q.put(None, timeout=0.1)
+
+
+def test_high_water_tracks_deepest_queue():
+    q = BoundedQueue(8, "block", "test_high_water_queue")
+    for i in range(3):
+        q.put(i)
+    q.get(timeout=1.0)
+    q.put(3)
+    assert q.high_water == 3
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        BoundedQueue(1, "drop_newest")
@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from resampler import StreamResampler
+
+
+def tone(freq, rate, seconds):
+    t = np.arange(int(rate * seconds)) / rate
+    return (0.5 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def resample_in_chunks(resampler, samples, sizes):
+    out = []
+    start = 0
+    sizes = itertools.cycle(sizes)
+    while start < len(samples):
+        size = next(sizes)
+        # process 返回的缓冲区下次调用时会被覆盖
+        out.append(resampler.process(samples[start:start + size]).copy())
+        start += size
+    return np.concatenate(out)
+
+
+@pytest.mark.parametrize("input_rate, output_rate", [(16000, 48000), (16000, 44100), (48000, 16000)])
+def test_chunked_output_matches_one_shot(input_rate, output_rate):
+    samples = tone(440, input_rate, 1.0)
+    whole = StreamResampler(input_rate, output_rate).process(samples).copy()
+    # 块长不固定、且不是 down 的整数倍时，块边界处的相位和历史也要衔接
+    chunked = resample_in_chunks(StreamResampler(input_rate, output_rate), samples, [1600, 333, 4801])
+    assert len(chunked) == len(whole)
+    np.testing.assert_allclose(chunked, whole, atol=1e-5)
+
+
+@pytest.mark.parametrize("input_rate, output_rate", [(16000, 48000), (16000, 44100), (48000, 16000)])
+def test_output_length_follows_rate_ratio(input_rate, output_rate):
+    resampler = StreamResampler(input_rate, output_rate)
+    total = sum(len(resampler.process(np.zeros(1000, dtype=np.float32))) for _ in range(48))
+    assert abs(total - 48000 * output_rate / input_rate) <= 1
+
+
+def test_same_rate_passes_samples_through():
+    samples = tone(440, 16000, 0.1)
+    np.testing.assert_array_equal(StreamResampler(16000, 16000).process(samples), samples)
+
+
+def test_tone_keeps_frequency_and_level():
+    out = StreamResampler(16000, 48000).process(tone(1000, 16000, 1.0))
+    # 跳过滤波器启动段
+    steady = out[1000:]
+    spectrum = np.abs(np.fft.rfft(steady * np.hanning(len(steady))))
+    peak_hz = np.argmax(spectrum) * 48000 / len(steady)
+    assert abs(peak_hz - 1000) < 5
+    assert np.sqrt(np.mean(np.square(steady))) == pytest.approx(0.5 / np.sqrt(2), rel=0.02)
+
+
+def test_upsampling_suppresses_images():
+    # 上采样后 8 kHz 以上只有镜像频率，语音频段内信号的镜像应被滤掉
+    out = StreamResampler(16000, 48000).process(tone(5000, 16000, 1.0))[1000:]
+    power = np.abs(np.fft.rfft(out * np.hanning(len(out)))) ** 2
+    hz = np.arange(len(power)) * 48000 / len(out)
+    assert 10 * np.log10(power[hz > 8200].sum() / power[hz < 7800].sum()) < -60
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import numpy as np
+
+from ringbuffer import AudioRingBuffer
+
+
+def ramp(n, start=0):
+    return np.arange(start, start + n, dtype=np.float32)
+
+
+def read(buffer, n, timeout=1.0):
+    out = np.full(n, -1.0, dtype=np.float32)
+    return buffer.read_into(out, timeout), out
+
+
+def test_reads_across_wraparound():
+    buffer = AudioRingBuffer(10)
+    buffer.write(ramp(7))
+    ok, out = read(buffer, 7)
+    assert ok
+    np.testing.assert_array_equal(out, ramp(7))
+    # 第二次写入跨过环尾
+    buffer.write(ramp(6, 7))
+    ok, out = read(buffer, 6)
+    assert ok
+    np.testing.assert_array_equal(out, ramp(6, 7))
+    assert buffer.samples_written == buffer.samples_read == 13
+    assert buffer.overflows == 0 and buffer.underruns == 0
+
+
+def test_overflow_drops_oldest_samples():
+    buffer = AudioRingBuffer(10)
+    buffer.write(ramp(8))
+    buffer.write(ramp(8, 8))
+    assert buffer.overflows == 6
+    assert buffer.available() == 10
+    ok, out = read(buffer, 10)
+    assert ok
+    np.testing.assert_array_equal(out, ramp(10, 6))
+
+
+def test_oversized_write_keeps_newest_samples():
+    buffer = AudioRingBuffer(10)
+    buffer.write(ramp(25))
+    assert buffer.overflows == 15
+    ok, out = read(buffer, 10)
+    assert ok
+    np.testing.assert_array_equal(out, ramp(10, 15))
+
+
+def test_read_past_write_times_out_as_underrun():
+    buffer = AudioRingBuffer(10)
+    buffer.write(ramp(4))
+    start = time.monotonic()
+    ok, out = read(buffer, 6, timeout=0.05)
+    assert not ok
+    assert time.monotonic() - start >= 0.05
+    assert buffer.underruns == 1
+    # 超时不消耗已有的采样，也不写 out
+    assert buffer.available() == 4
+    assert np.all(out == -1.0)
+
+
+def test_read_waits_for_producer():
+    buffer = AudioRingBuffer(10)
+    buffer.write(ramp(4))
+    threading.Timer(0.05, buffer.write, args=(ramp(4, 4),)).start()
+    ok, out = read(buffer, 6, timeout=2.0)
+    assert ok
+    np.testing.assert_array_equal(out, ramp(6))
+    assert buffer.underruns == 0
+
+
+def test_clock_observes_cumulative_samples():
+    class Clock:
+        def __init__(self):
+            self.observed = []
+
+        def observe(self, samples):
+            self.observed.append(samples)
+
+    clock = Clock()
+    buffer = AudioRingBuffer(10, clock=clock)
+    buffer.write(ramp(8))
+    buffer.write(ramp(8))
+    # 溢出丢弃的采样也计入采样时钟
+    assert clock.observed == [8, 16]
@@ -0,0 +1,74 @@
+import queue
+import threading
+import time
+
+from scheduler import PresentationScheduler
+
+
+def make_source(items, eos=True):
+    source = queue.Queue()
+    for item in items:
+        source.put(item)
+    if eos:
+        source.put(None)
+    return source
+
+
+def drain(scheduler):
+    items = []
+    while True:
+        item = scheduler.next_due()
+        if item is None:
+            return items
+        items.append(item)
+
+
+def test_frames_are_returned_in_pts_order():
+    source = make_source([(3.0, "c"), (1.0, "a"), (2.0, "b"), (1.0, "a2")])
+    scheduler = PresentationScheduler(source, threading.Event(), 0.15, paced=False).start()
+    # 等后台线程读完整个队列，返回顺序只取决于堆
+    scheduler._feeder.join(1.0)
+    # PTS 相同的帧保持入队顺序
+    assert [name for _, name in drain(scheduler)] == ["a", "a2", "b", "c"]
+    assert scheduler.presented == 4
+
+
+def test_late_frames_are_dropped_and_released():
+    now = [10.0]
+    dropped = []
+    source = make_source([(9.0, "late"), (9.9, "within threshold"), (10.0, "on time")])
+    scheduler = PresentationScheduler(source, threading.Event(), 0.15, clock=lambda: now[0],
+                                      on_drop=dropped.append).start()
+    scheduler._feeder.join(1.0)
+    assert [name for _, name in drain(scheduler)] == ["within threshold", "on time"]
+    assert dropped == [(9.0, "late")]
+    assert scheduler.late_drops == 1
+
+
+def test_next_due_waits_until_pts_minus_lead():
+    start = time.monotonic()
+    source = make_source([(start + 0.2, "frame")])
+    scheduler = PresentationScheduler(source, threading.Event(), 0.15, lead=0.1).start()
+    assert scheduler.next_due() == (start + 0.2, "frame")
+    elapsed = time.monotonic() - start
+    # 提前 lead 返回，不等到 PTS
+    assert 0.1 <= elapsed < 0.2
+
+
+def test_max_pending_leaves_backlog_in_source_queue():
+    source = make_source([(float(i), i) for i in range(5)])
+    scheduler = PresentationScheduler(source, threading.Event(), 0.15, paced=False, max_pending=2).start()
+    deadline = time.monotonic() + 1.0
+    while scheduler.pending() < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.1)
+    assert scheduler.pending() == 2
+    assert source.qsize() == 4  # 3 帧 + 流结束标记
+    assert [i for _, i in drain(scheduler)] == [0, 1, 2, 3, 4]
+
+
+def test_stop_event_ends_next_due():
+    stop_event = threading.Event()
+    scheduler = PresentationScheduler(make_source([], eos=False), stop_event, 0.15).start()
+    threading.Timer(0.05, stop_event.set).start()
+    assert scheduler.next_due() is None
@@ -0,0 +1,103 @@
+import time
+from multiprocessing import Event, Process, Queue
+
+import startgate
+from startgate import StartGate, wait_for_start
+
+
+def participant(gate, results, stop_event=None, delay=0.0):
+    time.sleep(delay)
+    start_time = wait_for_start(gate, stop_event)
+    results.put((start_time, time.time()))
+
+
+def crash(delay):
+    time.sleep(delay)
+    raise SystemExit(1)
+
+
+def start(target, *args):
+    process = Process(target=target, args=args)
+    process.start()
+    return process
+
+
+def test_all_participants_start_together():
+    gate = StartGate(3, margin=0.05)
+    results = Queue()
+    processes = [start(participant, gate, results, None, delay) for delay in (0.0, 0.1, 0.2)]
+    opened = time.time()
+    start_time = gate.open(timeout=10.0, processes=processes)
+    # 等最慢的参与者就绪，而不是立即或等满超时
+    assert 0.15 < time.time() - opened < 5.0
+    assert gate.ready_count == 3
+    for _ in processes:
+        reported, woke = results.get(timeout=5.0)
+        assert reported == start_time
+        assert woke >= start_time
+    for process in processes:
+        process.join(5.0)
+
+
+def test_failed_participant_does_not_block_the_others():
+    gate = StartGate(2, margin=0.05)
+    results = Queue()
+    processes = [start(participant, gate, results), start(crash, 0.1)]
+    opened = time.time()
+    start_time = gate.open(timeout=10.0, processes=processes)
+    assert time.time() - opened < 5.0
+    assert gate.ready_count == 1
+    assert results.get(timeout=5.0)[0] == start_time
+    for process in processes:
+        process.join(5.0)
+
+
+def test_missing_participant_times_out():
+    gate = StartGate(2, margin=0.05)
+    results = Queue()
+    process = start(participant, gate, results)
+    opened = time.time()
+    start_time = gate.open(timeout=0.3, processes=[process])
+    assert 0.3 <= time.time() - opened < 5.0
+    assert gate.ready_count == 1
+    assert results.get(timeout=5.0)[0] == start_time
+    process.join(5.0)
+
+
+def test_stop_event_releases_open_and_waiters():
+    gate = StartGate(2)
+    stop_event = Event()
+    results = Queue()
+    process = start(participant, gate, results, stop_event)
+    time.sleep(0.1)
+    stop_event.set()
+    # 主进程尚未公布开始时刻，参与者也因 stop_event 返回
+    assert results.get(timeout=5.0) is not None
+    opened = time.time()
+    gate.open(timeout=10.0, stop_event=stop_event)
+    assert time.time() - opened < 1.0
+    process.join(5.0)
+
+
+def test_restart_uses_a_fresh_gate(monkeypatch):
+    monkeypatch.setattr(startgate, "poll_interval", 0.005)
+    first = StartGate(1, margin=0.0)
+    results = Queue()
+    process = start(participant, first, results)
+    first_start = first.open(timeout=5.0, processes=[process])
+    assert results.get(timeout=5.0)[0] == first_start
+    process.join(5.0)
+    # 已公布的开始时刻不会让之后才就绪的参与者卡住
+    late = Queue()
+    participant(first, late)
+    assert late.get(timeout=1.0)[0] == first_start
+    # 重新开始时新建的 gate 要等这一次的 open，而不是沿用上一次的开始时刻
+    second = StartGate(1, margin=0.0)
+    assert second.start_time is None
+    process = start(participant, second, results)
+    time.sleep(0.2)
+    assert results.empty()
+    second_start = second.open(timeout=5.0, processes=[process])
+    assert second_start > first_start
+    assert results.get(timeout=5.0)[0] == second_start
+    process.join(5.0)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from vad import EnergyVAD, create_vad
+
+RATE = 16000
+WINDOW = int(0.6 * RATE)
+
+
+def silence():
+    return np.zeros(WINDOW, dtype=np.float32)
+
+
+def noise(level, seed=0):
+    return (np.random.default_rng(seed).standard_normal(WINDOW) * level).astype(np.float32)
+
+
+def voiced(level=0.2):
+    # 200 Hz 基频加谐波，近似浊音
+    t = np.arange(WINDOW) / RATE
+    return (level * (np.sin(2 * np.pi * 200 * t) + 0.5 * np.sin(2 * np.pi * 400 * t))).astype(np.float32)
+
+
+def test_silence_is_not_speech():
+    assert EnergyVAD(RATE).is_speech(silence()) is False
+
+
+def test_voiced_audio_is_speech():
+    vad = EnergyVAD(RATE)
+    # 噪声底取自各窗口最安静的帧，先送入一个安静窗口
+    vad.is_speech(noise(0.002))
+    assert vad.is_speech(voiced() + noise(0.002, seed=1)) is True
+
+
+def test_steady_background_noise_is_not_speech():
+    vad = EnergyVAD(RATE, min_rms=0.001)
+    # 噪声底跟随安静的背景噪声后，同样电平的噪声不再判为语音
+    results = [vad.is_speech(noise(0.006, seed=i)) for i in range(5)]
+    assert results[-1] is False
+
+
+def music(seed=0):
+    # 四个和弦音，每个幅度 0.035 ~ 0.065，整体 RMS 约 0.085，音量缓慢起伏
+    t = np.arange(WINDOW) / RATE + seed * WINDOW / RATE
+    chord = sum(np.sin(2 * np.pi * f * t) for f in (220, 277, 330, 440))
+    return (0.05 * (1 + 0.3 * np.sin(2 * np.pi * 0.5 * t)) * chord).astype(np.float32)
+
+
+def speech_like(seed=0):
+    # 200 Hz 浊音按 4 Hz 音节包络起伏，峰值约 0.15
+    t = np.arange(WINDOW) / RATE
+    envelope = np.clip(np.sin(2 * np.pi * 4 * t + seed), 0, None)
+    return (0.15 * envelope * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def test_speech_over_music_is_sent_to_recognition():
+    vad = EnergyVAD(RATE)
+    # 长时间的背景音乐把噪声底抬到音乐电平
+    for i in range(50):
+        vad.is_speech(music(i))
+    # 盖在音乐上的人声必须送去识别，否则其中的敏感词会未经过滤播出
+    assert all(vad.is_speech(music(50 + i) + speech_like(i)) for i in range(20))
+
+
+def test_loud_non_speech_is_sent_to_recognition():
+    vad = EnergyVAD(RATE)
+    assert all(vad.is_speech(music(i)) for i in range(20))
+
+
+def test_hangover_keeps_speech_state_after_speech_ends():
+    vad = EnergyVAD(RATE, hangover_seconds=0.6)
+    vad.is_speech(noise(0.002))
+    assert vad.is_speech(voiced()) is True
+    # 语音在窗口末尾结束，下一窗口仍在 hangover 内
+    assert vad.is_speech(silence()) is True
+    assert vad.is_speech(silence()) is False
+
+
+def test_create_vad_modes():
+    assert create_vad("off") is None
+    assert create_vad(None) is None
+    assert isinstance(create_vad("energy", RATE), EnergyVAD)
+    with pytest.raises(ValueError):
+        create_vad("unknown")
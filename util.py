@@ -1,7 +1,13 @@
 import sys
 import os
+import queue
+import threading
+import time
+import multiprocessing
+from collections import deque
 from enum import Enum
 from loguru import logger
+from matcher import SensitiveMatcher, PhoneticMatcher, IncrementalMatcher
 
 _logger = None
 class AuthState(Enum):
@@ -15,6 +21,10 @@ class AudioReplaceType(Enum):
     SILENCE = 0
     BEEP = 1
 
+class MatchMode(Enum):
+    EXACT = 0
+    PHONETIC = 1
+
 
 def resource_path(relative_path):
     if getattr(sys, 'frozen', False):
@@ -26,14 +36,144 @@ def resource_path(relative_path):
         base_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
     
         return os.path.join(base_dir, relative_path)
-def setup_logging():
-    """从配置文件中读取日志配置，并设置日志输出格式和级别"""
- 
-    log_format_file = "{time:YYYY-MM-DD HH:mm:ss}  - {name} - {level}  - {message}"
-    log_level= "DEBUG"
-    log_file = "server.log"
-    # 输出到文件
-    logger.add(resource_path(log_file), format=log_format_file, level=log_level)
+log_format_file = "{time:YYYY-MM-DD HH:mm:ss}  - {name} - {level}  - {message}"
+# 与 loguru 默认的控制台格式相同
+log_format_console = ("<green>{time:YYYY-MM-DD HH:mm:ss.SSS}</green> | <level>{level: <8}</level> | "
+                      "<cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>")
+log_file = "server.log"
+# 每个日志调用点每秒最多输出的条数和突发上限，超出部分被丢弃并在下一条中注明
+log_rate_per_callsite = 20
+log_burst_per_callsite = 50
+_log_channel = None
+
+
+class LogChannel:
+    """
+    把各进程的日志转发给主进程中唯一的写文件线程
+
+    子进程的 loguru sink 只把格式化好的日志行 put_nowait 到队列中，不做任何文件 I/O；
+    队列满时直接丢弃并计数。日志级别保存在共享的 multiprocessing.Value 中，
+    主进程修改后所有进程立即生效。对象可以直接作为 Process 参数传递。
+    """
+
+    def __init__(self, level="DEBUG", maxsize=10000):
+        self.queue = multiprocessing.Queue(maxsize)
+        self.level = multiprocessing.Value('i', logger.level(level).no, lock=False)
+        # 各进程都会累加，需要带锁
+        self.dropped = multiprocessing.Value('i', 0)
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(str(message))
+        except Exception:
+            with self.dropped.get_lock():
+                self.dropped.value += 1
+
+
+class CallsiteLimiter:
+    """
+    loguru filter：运行时日志级别 + 按调用点的采样和限流
+
+    - record 的 level 低于 channel.level 时丢弃
+    - 通过 logger.bind(sample=N) 调用的日志每 N 次只输出 1 次
+    - 每个调用点（文件 + 行号）按令牌桶限流，被丢弃的条数记在该调用点下一条输出的
+      extra["_suppressed"] 中，由 format_with_suppressed 在输出时附加，不修改 record["message"]
+
+    同一进程中的多个线程会同时记录日志，调用点状态由锁保护。
+    """
+
+    def __init__(self, channel, rate=None, burst=None):
+        self.channel = channel
+        self.rate = rate or log_rate_per_callsite
+        self.burst = burst or log_burst_per_callsite
+        # (file, line) -> [tokens, last_time, sample_count, suppressed]
+        self._callsites = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        # 同一条日志会依次经过控制台和文件两个 sink，只判定一次
+        decision = record["extra"].get("_log_pass")
+        if decision is None:
+            decision = record["extra"]["_log_pass"] = self._decide(record)
+        return decision
+
+    def _decide(self, record):
+        if record["level"].no < self.channel.level.value:
+            return False
+        key = (record["file"].path, record["line"])
+        sample = record["extra"].get("sample")
+        with self._lock:
+            state = self._callsites.get(key)
+            now = time.monotonic()
+            if state is None:
+                state = self._callsites[key] = [self.burst, now, 0, 0]
+            if sample:
+                state[2] += 1
+                if state[2] % sample != 1 % sample:
+                    return False
+            state[0] = min(self.burst, state[0] + (now - state[1]) * self.rate)
+            state[1] = now
+            if state[0] < 1:
+                state[3] += 1
+                return False
+            state[0] -= 1
+            suppressed, state[3] = state[3], 0
+        if suppressed:
+            record["extra"]["_suppressed"] = suppressed
+        return True
+
+
+def format_with_suppressed(fmt):
+    """返回 loguru 的 format 函数：在 fmt 之后附加 CallsiteLimiter 记录的被抑制条数"""
+    suffixed = fmt + " (suppressed {extra[_suppressed]} similar messages)\n{exception}"
+    plain = fmt + "\n{exception}"
+
+    def format_record(record):
+        return suffixed if record["extra"].get("_suppressed") else plain
+
+    return format_record
+
+
+def _write_log_lines(channel, file_path):
+    """主进程中的写日志线程，批量写入后在队列空闲时刷新"""
+    with open(file_path, "a", encoding="utf-8") as f:
+        while True:
+            try:
+                line = channel.queue.get(timeout=0.5)
+            except queue.Empty:
+                f.flush()
+                continue
+            except (EOFError, OSError):
+                break
+            f.write(line)
+
+
+def setup_logging(channel=None):
+    """
+    设置日志输出
+
+    主进程中创建 LogChannel 并启动唯一的写文件线程；子进程中传入主进程的
+    channel，日志经队列转发给主进程写入 server.log，热路径上没有文件 I/O。
+    """
+    global _log_channel
+    is_child = multiprocessing.parent_process() is not None
+    logger.remove()
+    if channel is None and is_child:
+        # 子进程在 init_process_logging 收到主进程的 channel 之前只输出到控制台
+        if sys.stderr is not None:
+            logger.add(sys.stderr, level="INFO", enqueue=True)
+        return logger
+    if channel is None:
+        channel = LogChannel()
+        threading.Thread(target=_write_log_lines, args=(channel, resource_path(log_file)),
+                         name="LogWriter", daemon=True).start()
+    _log_channel = channel
+    limiter = CallsiteLimiter(channel)
+    if sys.stderr is not None:
+        logger.add(sys.stderr, format=format_with_suppressed(log_format_console), level="DEBUG", filter=limiter,
+                   enqueue=True)
+    # 输出到文件（经主进程的写日志线程）
+    logger.add(channel.put, format=format_with_suppressed(log_format_file), level="DEBUG", filter=limiter)
 
     return logger
 
@@ -46,20 +186,75 @@ def get_logger():
         _logger = setup_logging()
     return _logger
 
-def load_sensitive_words():
-    """Load sensitive words from file"""
-    log = get_logger()
+def get_log_channel():
+    """主进程的 LogChannel，创建子进程时传入以便转发日志"""
+    get_logger()
+    return _log_channel
+
+def init_process_logging(channel):
+    """子进程入口处调用，把日志接入主进程的 LogChannel"""
+    global _logger
+    if channel is not None:
+        _logger = setup_logging(channel)
+
+def set_log_level(level):
+    """运行时修改所有进程的日志级别，level 为 "DEBUG"/"INFO" 等名称"""
+    channel = get_log_channel()
+    if channel is not None:
+        channel.level.value = logger.level(level).no
+        logger.info(f"Log level set to {level}")
+
+class RollingStats:
+    """保留最近 size 个样本，用于计算耗时等指标的均值和分位数"""
+
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def add(self, value):
+        self._samples.append(value)
+
+    def mean(self):
+        return sum(self._samples) / len(self._samples) if self._samples else 0.0
+
+    def percentile(self, q):
+        """q 取 0~100，样本为空时返回 0"""
+        if not self._samples:
+            return 0.0
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+def sensitive_words_path():
+    return resource_path("config/sensitive_words.txt")
+
+def read_sensitive_words(file_path):
+    """读取敏感词文件，每行一个词，忽略空行"""
     sensitive_set = set()
-    sen_words_file_path = resource_path("config/sensitive_words.txt")
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            word = line.strip()
+            if word:  # Ignore empty lines
+                sensitive_set.add(word)
+    return sensitive_set
+
+def load_sensitive_words(match_mode=MatchMode.EXACT.value, file_path=None):
+    """Load sensitive words from file and compile them into a matcher for the given MatchMode"""
+    log = get_logger()
+    sen_words_file_path = file_path or sensitive_words_path()
     print(f"sen_words_file_path==>{sen_words_file_path}")
     try:
         # Try to load sensitive words from external file
-        with open(sen_words_file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                word = line.strip()
-                if word:  # Ignore empty lines
-                    sensitive_set.add(word)
+        sensitive_set = read_sensitive_words(sen_words_file_path)
         log.info(f"Loaded {len(sensitive_set)} sensitive words from file: {sen_words_file_path}")
+        if match_mode == MatchMode.PHONETIC.value:
+            try:
+                return PhoneticMatcher(sensitive_set)
+            except ImportError as e:
+                log.error(f"pypinyin is not available, falling back to exact matching: {e}")
+        return SensitiveMatcher(sensitive_set)
     except FileNotFoundError:
         # If file doesn't exist, use default sensitive words
         log.error("sensitive_words.txt not found, using default sensitive words")
@@ -68,4 +263,61 @@ def load_sensitive_words():
         log.error(f"Error loading sensitive words: {e}")
         # Use default sensitive words in case of error
         return None
-    return sensitive_set
+
+
+class SensitiveWordWatcher(threading.Thread):
+    """
+    敏感词文件热加载线程
+
+    定期检查敏感词文件的修改时间和大小，文件稳定后在后台按新增/删除的差异
+    增量更新匹配器，并通过一次引用赋值原子地替换 `matcher`。识别循环每次
+    只需读取 `watcher.matcher`，不会被重建过程阻塞。
+
+    Args:
+        matcher: 初始匹配器
+        file_path: 敏感词文件路径，默认为 config/sensitive_words.txt
+        interval: 检查间隔（秒）
+    """
+
+    def __init__(self, matcher, file_path=None, interval=1.0):
+        super().__init__(name="SensitiveWordWatcher", daemon=True)
+        if matcher is None:
+            # 词库加载失败时从空词库开始，文件恢复后会被自动加载
+            matcher = SensitiveMatcher()
+        if not isinstance(matcher, IncrementalMatcher):
+            matcher = IncrementalMatcher(matcher, factory=type(matcher))
+        self.matcher = matcher
+        self.file_path = file_path or sensitive_words_path()
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._last_stat = self._stat()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.file_path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        log = get_logger()
+        while not self._stopped.wait(self.interval):
+            stat = self._stat()
+            if stat is None or stat == self._last_stat:
+                continue
+            # 编辑器保存时可能分多次写入，等文件稳定一个周期后再读取
+            if self._stopped.wait(self.interval) or self._stat() != stat:
+                continue
+            self._last_stat = stat
+            try:
+                words = read_sensitive_words(self.file_path)
+                matcher, added, removed = self.matcher.updated(words)
+            except Exception as e:
+                log.error(f"Failed to reload sensitive words: {e}")
+                continue
+            self.matcher = matcher
+            if added or removed:
+                log.info(f"Reloaded sensitive words: +{len(added)} -{len(removed)}, total {len(matcher)}")
@@ -0,0 +1,136 @@
+"""
+语音活动检测（VAD）
+
+在识别前判断一个音频窗口是否含有语音，非语音窗口不送入识别模型。
+
+- EnergyVAD: 按 30 ms 帧的能量和过零率判断，噪声底随静音自适应，开销可以忽略
+- FSMNVAD: FunASR 的 fsmn-vad 流式模型，能区分背景音乐等非语音声音，需要加载额外模型
+
+两者都在语音结束后保持 hangover 时长的“语音”状态，避免截断句尾和短停顿。
+"""
+import numpy as np
+from util import get_logger
+
+logger = get_logger()
+
+
+class EnergyVAD:
+    """
+    能量 + 过零率 VAD
+
+    帧能量高于 max(min_rms, 噪声底 × snr) 视为语音帧；能量只略高于阈值且过零率很高的帧
+    （嘶声、风噪）不算语音。噪声底由各窗口中最安静的帧估计，只会缓慢上升。
+
+    跳过识别的窗口不经过敏感词检查，因此只有绝对意义上安静的窗口才会被判为非语音：
+    帧能量超过 max_skip_rms 时一律视为语音帧。持续的背景音乐会抬高噪声底，使盖在音乐上的
+    人声低于相对阈值，这类窗口仍要送去识别，宁可多识别也不漏掉敏感词。
+
+    Args:
+        sample_rate: 采样率
+        frame_seconds: 帧长
+        min_rms: 能量阈值的下限
+        snr: 语音帧能量相对噪声底的倍数
+        max_zcr: 低能量帧允许的最大过零率（每采样）
+        min_speech_seconds: 窗口中语音帧累计超过该时长才判为语音
+        hangover_seconds: 最后一个语音帧之后仍视为语音的时长
+        noise_alpha: 噪声底每个窗口向上跟随的比例
+        max_skip_rms: 帧能量超过该值时不论噪声底如何都视为语音帧
+    """
+
+    def __init__(self, sample_rate=16000, frame_seconds=0.03, min_rms=0.005, snr=3.0, max_zcr=0.35,
+                 min_speech_seconds=0.09, hangover_seconds=0.6, noise_alpha=0.05, max_skip_rms=0.02):
+        self.frame = int(frame_seconds * sample_rate)
+        self.min_rms = min_rms
+        self.snr = snr
+        self.max_zcr = max_zcr
+        self.min_speech_frames = max(1, int(round(min_speech_seconds / frame_seconds)))
+        self.hangover_samples = int(hangover_seconds * sample_rate)
+        self.noise_alpha = noise_alpha
+        self.max_skip_rms = max_skip_rms
+        self.noise_floor = None
+        self._since_speech = self.hangover_samples
+
+    def is_speech(self, samples):
+        n = len(samples) // self.frame
+        if n == 0:
+            return bool(self._since_speech < self.hangover_samples)
+        frames = np.asarray(samples[:n * self.frame], dtype=np.float32).reshape(n, self.frame)
+        rms = np.sqrt(np.mean(np.square(frames), axis=1))
+        zcr = np.count_nonzero(np.diff(np.signbit(frames), axis=1), axis=1) / self.frame
+        # 噪声底取各窗口最安静帧（10% 分位）的能量：下降时立即跟随，上升时按 EMA 缓慢跟随
+        quiet = float(np.percentile(rms, 10))
+        if self.noise_floor is None or quiet < self.noise_floor:
+            self.noise_floor = quiet
+        else:
+            self.noise_floor += self.noise_alpha * (quiet - self.noise_floor)
+        threshold = max(self.min_rms, self.noise_floor * self.snr)
+        speech = ((rms > threshold) & ((rms > threshold * 2) | (zcr < self.max_zcr))) | (rms > self.max_skip_rms)
+        if np.count_nonzero(speech) >= self.min_speech_frames:
+            last = np.flatnonzero(speech)[-1]
+            self._since_speech = (n - 1 - last) * self.frame + len(samples) - n * self.frame
+            return True
+        self._since_speech += len(samples)
+        # 上一窗口末尾的语音在 hangover 内延续到本窗口
+        return bool(self._since_speech - len(samples) < self.hangover_samples)
+
+
+class FSMNVAD:
+    """
+    FunASR fsmn-vad 流式 VAD
+
+    每个窗口送入模型并保留 cache，根据输出的语音段起止（-1 表示尚未结束/开始）
+    维护当前是否处于语音段中。
+
+    Args:
+        model_dir: fsmn-vad 模型目录或模型名
+        device: 推理设备
+        sample_rate: 采样率
+        hangover_seconds: 语音段结束后仍视为语音的时长
+    """
+
+    def __init__(self, model_dir="fsmn-vad", device="cpu", sample_rate=16000, hangover_seconds=0.3):
+        from funasr import AutoModel
+        self.model = AutoModel(model=model_dir, disable_update=True, device=device, disable_pbar=True)
+        self.sample_rate = sample_rate
+        self.hangover_samples = int(hangover_seconds * sample_rate)
+        self.cache = {}
+        self._in_segment = False
+        self._since_speech = self.hangover_samples
+
+    def is_speech(self, samples):
+        chunk_ms = int(len(samples) * 1000 / self.sample_rate)
+        res = self.model.generate(input=samples, cache=self.cache, is_final=False, chunk_size=chunk_ms)
+        segments = res[0].get("value", []) if res else []
+        # 本窗口中有语音段的开始或结束即为语音；最后一段没有结束时仍处于语音段中
+        speech = self._in_segment or bool(segments)
+        if segments:
+            self._in_segment = segments[-1][1] == -1
+        if speech:
+            self._since_speech = 0
+            return True
+        self._since_speech += len(samples)
+        return bool(self._since_speech - len(samples) < self.hangover_samples)
+
+
+def create_vad(mode, sample_rate=16000, **options):
+    """
+    按名称创建 VAD
+
+    Args:
+        mode: "energy"、"fsmn"，为 None 或 "off" 时不使用 VAD
+        options: 传给对应 VAD 的参数
+
+    Returns:
+        带 is_speech(samples) 方法的对象，或 None；fsmn 加载失败时退回 energy
+    """
+    if mode in (None, "off"):
+        return None
+    if mode == "fsmn":
+        try:
+            return FSMNVAD(sample_rate=sample_rate, **options)
+        except Exception as e:
+            logger.error(f"Failed to load FSMN-VAD, falling back to energy VAD: {e}")
+            options = {}
+    elif mode != "energy":
+        raise ValueError(f"Unknown VAD mode: {mode}")
+    return EnergyVAD(sample_rate=sample_rate, **options)
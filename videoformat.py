@@ -0,0 +1,78 @@
+import cv2
+import pyvirtualcam
+from pyvirtualcam import PixelFormat
+import numpy as np
+from util import get_logger
+
+logger = get_logger()
+
+# 按优先级尝试的虚拟摄像头像素格式：BGR 与 OpenCV 采集格式一致，无需转换
+PREFERRED_FORMATS = (PixelFormat.BGR, PixelFormat.RGB)
+
+
+def open_virtual_camera(width, height, fps, formats=PREFERRED_FORMATS):
+    """
+    依次尝试 formats 中的像素格式打开虚拟摄像头，返回第一个后端支持的
+
+    Returns:
+        pyvirtualcam.Camera
+    """
+    last_error = None
+    for fmt in formats:
+        try:
+            cam = pyvirtualcam.Camera(width=width, height=height, fps=fps, fmt=fmt)
+            logger.info(f"Virtual camera opened: backend={cam.backend}, {width}x{height}@{fps}, fmt={fmt.name}")
+            return cam
+        except Exception as e:
+            logger.info(f"Virtual camera does not accept fmt={fmt.name}: {e}")
+            last_error = e
+    raise last_error
+
+
+class FrameConverter:
+    """
+    把采集到的 BGR 帧转换为虚拟摄像头协商好的尺寸和像素格式
+
+    尺寸一致时跳过缩放，格式为 BGR 时直接透传；不可避免的缩放和颜色转换
+    都写入预分配的目标缓冲区，每帧不再分配新数组。
+
+    Args:
+        width, height: 虚拟摄像头分辨率
+        fmt: 虚拟摄像头像素格式（pyvirtualcam.PixelFormat）
+    """
+    _COLOR_CONVERSIONS = {
+        PixelFormat.RGB: (cv2.COLOR_BGR2RGB, 3),
+        PixelFormat.RGBA: (cv2.COLOR_BGR2RGBA, 4),
+        PixelFormat.GRAY: (cv2.COLOR_BGR2GRAY, None),
+        PixelFormat.I420: (cv2.COLOR_BGR2YUV_I420, None),
+    }
+
+    def __init__(self, width, height, fmt):
+        if fmt != PixelFormat.BGR and fmt not in self._COLOR_CONVERSIONS:
+            raise ValueError(f"Unsupported virtual camera format: {fmt}")
+        self.width = width
+        self.height = height
+        self.fmt = fmt
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._converted = None
+        if fmt in self._COLOR_CONVERSIONS:
+            code, channels = self._COLOR_CONVERSIONS[fmt]
+            if fmt == PixelFormat.I420:
+                shape = (height * 3 // 2, width)
+            elif channels is None:
+                shape = (height, width)
+            else:
+                shape = (height, width, channels)
+            self._code = code
+            self._converted = np.empty(shape, dtype=np.uint8)
+
+    def convert(self, frame):
+        """
+        Returns:
+            可直接传给 cam.send 的数组；可能是输入帧本身或内部缓冲区，下一帧会被覆盖
+        """
+        if frame.shape[0] != self.height or frame.shape[1] != self.width:
+            frame = cv2.resize(frame, (self.width, self.height), dst=self._resized)
+        if self._converted is None:
+            return frame
+        return cv2.cvtColor(frame, self._code, dst=self._converted)